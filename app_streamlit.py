@@ -1,5 +1,6 @@
 import os
 import sys
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -13,15 +14,22 @@ import streamlit as st
 
 from assessment.neuroticism import score_neuroticism
 from assessment.ai_anxiety import score_dimension
-from interventions.loader import load_interventions
+from interventions.loader import get_library
+from outcomes.store import Outcome, get_outcome_store
+from session.store import SessionSync, get_session_backend, new_token, owner_proof, valid_token
 from routing.personalize import route
+from routing.bandit import get_route_policy
 
 # NEW: LLM chat modules
-from ai.llm_client import LLMClient
+from ai.llm_client import get_client
 from ai.prompts import SYSTEM_CHAT_STYLE
-from ai.analyzer import analyze_chat
+from ai.context import context_from_env
+from ai.metrics import metric_labels
+from ai.speculative import SummaryPrefetcher
+from profiler.rerun import begin_rerun, end_rerun, lap, section
 
-LIB_PATH = "src/interventions/library.json"
+# library.json, or a SQLite store built with src/interventions/store.py
+LIB_PATH = os.getenv("INTERVENTION_LIBRARY", "src/interventions/library.json")
 
 st.set_page_config(page_title="AI焦虑多维度干预系统", layout="centered")
 
@@ -30,7 +38,16 @@ load_dotenv()
 APP_USERNAME = os.getenv("APP_USERNAME", "admin")
 APP_PASSWORD = os.getenv("APP_PASSWORD", "admin123")
 
+# ---------- Profiling (optional) ----------
+# Every session with PROFILE_RERUNS=1, or the admin's own session with ?profile=1.
+begin_rerun(
+    requested=st.query_params.get("profile") == "1"
+    and st.session_state.get("logged_in", False)
+    and st.session_state.get("username") == APP_USERNAME
+)
+
 # ---------- Theme ----------
+lap("theme")
 st.markdown(
     """
     <style>
@@ -151,10 +168,52 @@ def likert(label: str, key: str) -> int:
     return st.radio(label, [1, 2, 3, 4, 5], horizontal=True, key=key)
 
 def reset_session():
+    prefetcher = st.session_state.get("summary_prefetch")
+    if prefetcher is not None:
+        prefetcher.cancel()
+    if session_sync is not None and session_token is not None:
+        session_sync.clear(session_token)
     for k in list(st.session_state.keys()):
         del st.session_state[k]
 
+# ---------- Session persistence (optional, SESSION_BACKEND) ----------
+# Flow state mirrored outside the process so a session can resume on another
+# replica or after a restart (the token travels in the ?sid= URL parameter).
+# The token is claimed at login with the credentials used, and state is only
+# restored after logging in again with the same ones: the URL alone never
+# authenticates. Not persisted: the login flag, the in-session `users` dict
+# (plain-text passwords) and live objects (prefetcher, context window, action cards).
+PERSISTED_KEYS = (
+    "step", "session_id",
+    "neuro_total", "neuro_band", "dim_scores", "role_clean", "dim_pick",
+    "chat_messages", "chat_done", "request_counter", "last_processed_request_id",
+    "pending_user_input", "pending_request_id",
+    "summary", "llm_error", "driver", "dim_intensity_confirm",
+    "outcome_request_id", "submitted_outcomes",
+)
+lap("session")
+session_backend = get_session_backend()
+session_sync = SessionSync(session_backend, PERSISTED_KEYS) if session_backend is not None else None
+session_token = None
+if session_sync is not None and st.session_state.get("logged_in"):
+    session_token = session_sync.attached_token(st.session_state)
+    if session_token is not None:
+        if st.query_params.get("sid") != session_token:
+            st.query_params["sid"] = session_token
+        # also catches changes from a previous run that ended in st.rerun()/st.stop()
+        session_sync.persist(st.session_state, session_token)
+
+def claim_session(username: str, password: str) -> str:
+    """Resume ?sid= if these credentials claimed it before, else start a new token."""
+    token = st.query_params.get("sid")
+    if not (valid_token(token) and session_sync.claim(st.session_state, token, owner_proof(token, username, password))):
+        token = new_token()
+        session_sync.claim(st.session_state, token, owner_proof(token, username, password))
+    st.query_params["sid"] = token
+    return token
+
 # ---------- Login ----------
+lap("login")
 if "logged_in" not in st.session_state:
     st.session_state["logged_in"] = False
 if "users" not in st.session_state:
@@ -166,6 +225,7 @@ if st.session_state["logged_in"]:
         st.caption("已登录")
         if st.button("退出登录"):
             st.session_state["logged_in"] = False
+            end_rerun()
             st.rerun()
 else:
     st.markdown("## 用户登录")
@@ -181,6 +241,10 @@ else:
         if submitted:
             if st.session_state["users"].get(username) == password:
                 st.session_state["logged_in"] = True
+                st.session_state["username"] = username
+                if session_sync is not None:
+                    claim_session(username, password)
+                end_rerun()
                 st.rerun()
             else:
                 st.error("用户名或密码错误。")
@@ -202,18 +266,17 @@ else:
             else:
                 st.session_state["users"][new_user] = new_pass
                 st.success("注册成功，请在“登录”页签登录。")
+    end_rerun()
     st.stop()
 
 # ---------- Header ----------
+lap("header")
 st.title("AI焦虑干预系统")
 st.caption("说明：这是一个自我反思与行动支持工具，不提供诊断或职业预测。")
 
-# ---------- Load library once ----------
-if "library" not in st.session_state:
-    st.session_state["library"] = load_interventions(LIB_PATH)
-
 # ---------- State machine ----------
 step = st.session_state.get("step", "A")  # A -> B -> C -> D
+lap(f"screen {step}")
 
 # =========================
 # Screen A: Intro
@@ -231,6 +294,7 @@ if step == "A":
 
     if st.button("开始"):
         st.session_state["step"] = "B"
+        end_rerun()
         st.rerun()
 
 # =========================
@@ -314,6 +378,7 @@ elif step == "B":
         st.session_state["role_clean"] = st.session_state.get("role", "").strip()
 
         st.session_state["step"] = "C"
+        end_rerun()
         st.rerun()
 
 
@@ -377,12 +442,32 @@ elif step == "C":
         st.session_state["last_processed_request_id"] = 0
     if "llm_error" not in st.session_state:
         st.session_state["llm_error"] = None
+    if "summary_prefetch" not in st.session_state:
+        st.session_state["summary_prefetch"] = SummaryPrefetcher()
+    if "chat_context" not in st.session_state:
+        st.session_state["chat_context"] = context_from_env()
 
-    llm_client = LLMClient()
+    with section("llm client"):
+        llm_client = get_client()
     llm_mode = "Real" if llm_client.enabled() else "Mock"
     llm_model = llm_client.model
+    if len(llm_client.providers) > 1:
+        llm_model = f"{llm_model} 等 {len(llm_client.providers)} 个服务，自动择优与故障切换"
     if llm_mode == "Real":
-        st.caption(f"LLM 模式：Real（{llm_model}）")
+        breaker = llm_client.breaker()
+        if breaker.state == "open":
+            st.caption(f"LLM 模式：Real（{llm_model}）｜服务异常已熔断，暂用 Mock，约 {int(breaker.retry_in()) + 1} 秒后重试")
+        elif breaker.state == "half_open":
+            st.caption(f"LLM 模式：Real（{llm_model}）｜熔断恢复探测中")
+        else:
+            st.caption(f"LLM 模式：Real（{llm_model}）")
+        ctx_stats = st.session_state.get("context_stats")
+        if ctx_stats and ctx_stats.get("tokens_saved"):
+            st.caption(
+                f"上下文：本轮发送约 {ctx_stats['tokens_sent']} tokens，"
+                f"较完整记录节省约 {ctx_stats['tokens_saved']} tokens"
+                f"（{ctx_stats['summarized_messages']} 条早期消息已压缩为摘要）"
+            )
     else:
         st.caption("LLM 模式：Mock（未配置 LLM_* 或 DEEPSEEK_*）")
 
@@ -412,6 +497,7 @@ elif step == "C":
         st.session_state["request_counter"] += 1
         st.session_state["pending_request_id"] = st.session_state["request_counter"]
         st.session_state["pending_user_input"] = user_input.strip()
+        end_rerun()
         st.rerun()
 
     pending_id = st.session_state.get("pending_request_id")
@@ -421,14 +507,30 @@ elif step == "C":
         st.session_state["chat_messages"].append({"role": "user", "content": pending_text})
 
         sys_prompt = SYSTEM_CHAT_STYLE[band]
-        client = LLMClient()
+        client = llm_client
         msgs = [{"role": "system", "content": sys_prompt}] + st.session_state["chat_messages"]
-        reply = client.chat(msgs, temperature=0.4)
+
+        # Stream the reply into the chat block so the first tokens show up immediately
+        with chat_block:
+            with st.chat_message("user"):
+                st.write(pending_text)
+            with st.chat_message("assistant"), metric_labels(band=band), section("chat call"):
+                reply = st.write_stream(
+                    client.chat_stream(msgs, temperature=0.4, context=st.session_state["chat_context"])
+                )
+        if not isinstance(reply, str):
+            reply = "".join(str(x) for x in reply)
         st.session_state["llm_error"] = client.last_error
+        if st.session_state["chat_context"] is not None:
+            st.session_state["context_stats"] = dict(st.session_state["chat_context"].last_stats)
 
         st.session_state["chat_messages"].append({"role": "assistant", "content": reply})
+        # Start the summary now so it is ready (or in flight) when the user asks for it
+        with metric_labels(band=band):
+            st.session_state["summary_prefetch"].schedule(st.session_state["chat_messages"])
         st.session_state["pending_user_input"] = None
         st.session_state["pending_request_id"] = None
+        end_rerun()
         st.rerun()
 
     if "chat_done" not in st.session_state:
@@ -444,7 +546,8 @@ elif step == "C":
         j_confirm = st.slider("J 强度", 0, 10, int(j0), key="j_confirm")
 
         if st.button("生成总结（焦虑情况 + 干预建议）"):
-            summary = analyze_chat(st.session_state["chat_messages"])
+            with metric_labels(band=band), section("analyze"):
+                summary = st.session_state["summary_prefetch"].result(st.session_state["chat_messages"])
             st.session_state["summary"] = summary
             st.session_state["llm_error"] = summary.get("_llm_error")
 
@@ -455,6 +558,7 @@ elif step == "C":
             st.session_state["dim_intensity_confirm"] = int(j_confirm)
 
             st.session_state["step"] = "D"
+            end_rerun()
             st.rerun()
 
 # =========================
@@ -464,6 +568,7 @@ elif step == "D":
     summary = st.session_state.get("summary")
     if st.button("重置（重新开始）"):
         reset_session()
+        end_rerun()
         st.rerun()
     if st.session_state.get("llm_error"):
         st.error(f"LLM 调用失败：{st.session_state['llm_error']}")
@@ -485,14 +590,26 @@ elif step == "D":
     dim_scores = st.session_state.get("dim_scores", {})
     dim_baseline = int(dim_scores.get(dim_pick, {}).get("intensity", 0))
     j_before = st.session_state.get("dim_intensity_confirm", dim_baseline)
-    lib = st.session_state["library"]
+    # shared across sessions; reloads by itself when library.json changes
+    with section("library"):
+        lib = get_library(LIB_PATH)
 
     st.write(f"个性化参数：神经质风格 **{band}** ｜担忧类型 **{driver}**")
     st.info("我们不解决未来，只做一件小事来恢复控制感。完成即可算成功。")
 
-    actions = route(driver=driver, band=band, library_data=lib)
+    policy = get_route_policy()
+    with section("route"):
+        if policy is None:
+            actions = route(driver=driver, band=band, library_data=lib)
+        else:
+            # sampled picks: keep them fixed for this session so reruns don't reshuffle the options
+            if st.session_state.get("actions_key") != (driver, band):
+                st.session_state["actions"] = route(driver=driver, band=band, library_data=lib, policy=policy)
+                st.session_state["actions_key"] = (driver, band)
+            actions = st.session_state["actions"]
     if not actions:
         st.error("未找到匹配的行动卡。请检查 library.json 是否包含对应项。")
+        end_rerun()
         st.stop()
 
     st.markdown("### 选择一个你愿意现在就做的行动：")
@@ -517,11 +634,39 @@ elif step == "D":
     j_after = st.slider("J 强度（后测）", 0, 10, int(j_before), key="j_after")
 
     if st.button("提交本次结果"):
-        st.success("已记录（MVP 默认仅本地会话，不上传）。谢谢你完成一次行动。")
-        st.write(f"- 前测：{j_before}")
-        st.write(f"- 后测：{j_after}")
-        st.write(f"- 变化：{j_after - j_before:+d}")
-
-        if j_after <= j_before - 1:
+        # one record per (session, card, request): repeated clicks or reruns
+        # show the stored result instead of counting it again
+        action_id = str(a.get("id", ""))
+        submitted = st.session_state.setdefault("submitted_outcomes", {})
+        if action_id in submitted:
+            st.info("这次结果已经记录过了，不会重复计入。")
+        else:
+            get_outcome_store().record(Outcome(
+                session_id=st.session_state.setdefault("session_id", uuid.uuid4().hex),
+                action_id=action_id,
+                driver=driver,
+                band=band,
+                dimension=dim_pick,
+                pre=int(j_before),
+                post=int(j_after),
+                completed=bool(done),
+                role=st.session_state.get("role_clean", ""),
+                request_id=st.session_state.setdefault("outcome_request_id", uuid.uuid4().hex),
+            ))
+            if policy is not None:
+                policy.observe(driver, band, action_id, int(j_after) - int(j_before))
+            submitted[action_id] = [int(j_before), int(j_after)]
+            st.success("已记录（仅保存在本机数据库，不上传）。谢谢你完成一次行动。")
+        pre, post = submitted[action_id]
+        st.write(f"- 前测：{pre}")
+        st.write(f"- 后测：{post}")
+        st.write(f"- 变化：{post - pre:+d}")
+
+        if post <= pre - 1:
             st.write("✅ 本次达到 MVP 成功标准之一：焦虑强度下降 ≥ 1")
         st.write("你可以点上方“重置”开始下一次，或换一个行动再做一轮。")
+
+lap("persist")
+if session_sync is not None and session_token is not None:
+    session_sync.persist(st.session_state, session_token)
+end_rerun()
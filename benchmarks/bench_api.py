@@ -0,0 +1,134 @@
+"""
+Throughput of the full flow (assess -> 3 chat turns -> summary -> route):
+headless JSON API vs driving the Streamlit script.
+
+The API runs in-process on a free port and is hit by `--clients` threads
+over keep-alive connections. The Streamlit side uses AppTest, which executes
+the same script reruns a browser session triggers (without the websocket
+and rendering). Runs in mock LLM mode so it measures app overhead, not the
+model.
+
+    python benchmarks/bench_api.py --clients 8 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+for _k in list(os.environ):
+    if _k.startswith(("LLM_", "DEEPSEEK_")):
+        os.environ.pop(_k)
+
+from api.server import serve_in_thread  # noqa: E402
+
+TURNS = ["我担心AI会取代我", "失业", "我最怕被裁员以后找不到工作"]
+ASSESS = {
+    "neuroticism": [3, 4, 3, 4, 3, 4],
+    "dimensions": {"L": [3] * 8, "J": [4] * 6, "S": [2] * 4, "C": [3] * 3},
+}
+
+
+def _post(conn: http.client.HTTPConnection, path: str, body: dict) -> dict:
+    conn.request("POST", path, body=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                 headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    if resp.status != 200:
+        raise RuntimeError(f"{path}: {resp.status} {data}")
+    return data
+
+
+def api_flow(conn: http.client.HTTPConnection) -> int:
+    band = _post(conn, "/v1/assess", ASSESS)["neuroticism"]["band"]
+    messages = []
+    for text in TURNS:
+        messages.append({"role": "user", "content": text})
+        reply = _post(conn, "/v1/chat", {"band": band, "messages": messages})["reply"]
+        messages.append({"role": "assistant", "content": reply})
+    driver = _post(conn, "/v1/summary", {"messages": messages}).get("driver", "value_threat")
+    _post(conn, "/v1/route", {"driver": driver, "band": band})
+    return 6  # requests per flow
+
+
+def bench_api(clients: int, seconds: float) -> tuple:
+    server, _ = serve_in_thread()
+    host, port = server.server_address
+    flows = [0] * clients
+    requests = [0] * clients
+    stop = time.perf_counter() + seconds
+
+    def worker(i: int) -> None:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        while time.perf_counter() < stop:
+            requests[i] += api_flow(conn)
+            flows[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+    server.server_close()
+    return sum(flows) / elapsed, sum(requests) / elapsed
+
+
+def streamlit_flow() -> int:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app_streamlit.py"), default_timeout=30).run()
+    reruns = 1
+    at.text_input(key="login_user").input("admin")
+    at.text_input(key="login_pass").input("admin123")
+    at.button[0].click().run()
+    reruns += 2
+    [b for b in at.button if b.label == "开始"][0].click().run()
+    [b for b in at.button if b.label.startswith("继续")][0].click().run()
+    reruns += 4
+    for text in TURNS:
+        at.text_area(key="chat_input").input(text)
+        [b for b in at.button if b.label == "发送"][0].click().run()
+        reruns += 2
+    [b for b in at.button if b.label == "结束对话"][0].click().run()
+    [b for b in at.button if b.label.startswith("生成总结")][0].click().run()
+    reruns += 3
+    if at.exception or at.session_state["step"] != "D":
+        raise RuntimeError(f"streamlit flow failed: {at.exception}")
+    return reruns
+
+
+def bench_streamlit(seconds: float) -> tuple:
+    os.chdir(ROOT)
+    flows = reruns = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        reruns += streamlit_flow()
+        flows += 1
+    elapsed = time.perf_counter() - t0
+    return flows / elapsed, reruns / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    flows, rps = bench_api(args.clients, args.seconds)
+    print(f"      api: {flows:8.1f} flows/s  {rps:8.1f} requests/s  ({args.clients} clients)")
+    flows, reruns = bench_streamlit(args.seconds)
+    print(f"streamlit: {flows:8.1f} flows/s  {reruns:8.1f} reruns/s   (AppTest, one session at a time)")
+
+
+if __name__ == "__main__":
+    main()
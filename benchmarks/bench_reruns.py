@@ -0,0 +1,225 @@
+"""
+Wall time and CPU per Streamlit rerun of the full A -> D flow, per screen.
+
+Scripts one session through AppTest the way a browser drives it: login,
+start, one rerun per answered Likert item on screen B (every widget change
+reruns the script), continue, --turns chat turns, summary, then picking an
+action and submitting the result. Every script execution is timed from the
+script thread itself, so st.rerun() hops are counted as separate reruns and
+CPU is the script thread's own time (time.thread_time).
+
+    python benchmarks/bench_reruns.py --flows 5
+    python benchmarks/bench_reruns.py --flows 5 --save /tmp/before.json
+    python benchmarks/bench_reruns.py --flows 5 --compare /tmp/before.json
+    python benchmarks/bench_reruns.py --spawn-fake --latency fixed:200    # local LLM instead of mock
+
+Runs in mock LLM mode unless --base-url or --spawn-fake is given (the fake
+server is tools/fake_openai.py; its options are accepted here). Outcomes go
+to a temporary database.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tools"))
+
+for _k in list(os.environ):
+    if _k.startswith(("LLM_", "DEEPSEEK_", "SESSION_")):
+        os.environ.pop(_k)
+
+from fake_openai import add_arguments, config_from_args, start_in_thread  # noqa: E402
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import local_script_runner  # noqa: E402
+
+TURNS = ["我担心AI会取代我", "失业", "我最怕被裁员以后找不到工作", "最近公司在讨论裁员", "我觉得自己越来越不重要了"]
+LIKERT_PREFIXES = ("N", "L", "J", "S", "C")
+
+
+class RerunLog:
+    """Collects one record per script execution, written from the script thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: List[Dict[str, object]] = []
+        self.phase = ""
+        self._open: Dict[int, tuple] = {}
+
+    def on_event(self, sender, event, **kwargs) -> None:
+        tid = threading.get_ident()
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            self._open[tid] = (time.perf_counter(), time.thread_time(), _screen(sender))
+        elif event.name.startswith("SCRIPT_STOPPED") and tid in self._open:
+            wall0, cpu0, screen = self._open.pop(tid)
+            with self._lock:
+                self.records.append({
+                    "screen": screen,
+                    "phase": self.phase,
+                    "wall": time.perf_counter() - wall0,
+                    "cpu": time.thread_time() - cpu0,
+                    "hop": event == ScriptRunnerEvent.SCRIPT_STOPPED_FOR_RERUN,
+                })
+
+
+def _screen(runner) -> str:
+    # the screen a rerun renders is decided by the state it starts with
+    state = runner._session_state
+    try:
+        if not state["logged_in"]:
+            return "login"
+    except KeyError:
+        return "login"
+    try:
+        return state["step"]
+    except KeyError:
+        return "A"
+
+
+def install(log: RerunLog) -> None:
+    original = local_script_runner.LocalScriptRunner.__init__
+
+    def __init__(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        self.on_event.connect(log.on_event, weak=False)
+
+    local_script_runner.LocalScriptRunner.__init__ = __init__
+
+
+def _button(at: AppTest, label: str, prefix: bool = False):
+    for b in at.button:
+        if b.label == label or (prefix and b.label.startswith(label)):
+            return b
+    raise RuntimeError(f"button not found: {label} ({at.exception})")
+
+
+def run_flow(log: RerunLog, turns: int) -> None:
+    log.phase = "load"
+    at = AppTest.from_file(str(ROOT / "app_streamlit.py"), default_timeout=60).run()
+
+    log.phase = "login"
+    at.text_input(key="login_user").input("admin")
+    at.text_input(key="login_pass").input("admin123")
+    at.button[0].click().run()
+    _button(at, "开始").click().run()
+
+    log.phase = "answer"
+    for i, radio in enumerate([r for r in at.radio if str(r.key or "").startswith(LIKERT_PREFIXES)]):
+        at.radio(key=radio.key).set_value(1 + (i * 3) % 5).run()
+    log.phase = "continue"
+    _button(at, "继续", prefix=True).click().run()
+
+    log.phase = "chat"
+    for i in range(turns):
+        at.text_area(key="chat_input").input(TURNS[i % len(TURNS)])
+        _button(at, "发送").click().run()
+    log.phase = "summary"
+    _button(at, "结束对话").click().run()
+    _button(at, "生成总结", prefix=True).click().run()
+
+    log.phase = "act"
+    at.checkbox(key="done_check").check().run()
+    at.slider(key="j_after").set_value(3).run()
+    _button(at, "提交本次结果").click().run()
+    if at.exception or at.session_state["step"] != "D":
+        raise RuntimeError(f"flow failed: {at.exception}")
+
+
+def summarize(records: List[Dict[str, object]], flows: int) -> Dict[str, Dict[str, float]]:
+    groups: Dict[str, List[Dict[str, object]]] = defaultdict(list)
+    for r in records:
+        groups[f"screen {r['screen']}"].append(r)
+        groups[f"phase {r['phase']}"].append(r)
+        groups["all"].append(r)
+    out = {}
+    for name, rs in sorted(groups.items()):
+        walls = sorted(float(r["wall"]) for r in rs)
+        cpus = sorted(float(r["cpu"]) for r in rs)
+        out[name] = {
+            "reruns_per_flow": len(rs) / flows,
+            "hops_per_flow": sum(1 for r in rs if r["hop"]) / flows,
+            "wall_ms_p50": walls[len(walls) // 2] * 1000,
+            "wall_ms_p90": walls[min(len(walls) - 1, int(0.9 * len(walls)))] * 1000,
+            "cpu_ms_mean": sum(cpus) / len(cpus) * 1000,
+            "wall_ms_per_flow": sum(walls) / flows * 1000,
+            "cpu_ms_per_flow": sum(cpus) / flows * 1000,
+        }
+    return out
+
+
+def print_table(stats: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+    print(f"{'':<16}{'reruns':>8}{'hops':>6}{'wall p50':>10}{'wall p90':>10}{'cpu mean':>10}{'wall/flow':>11}{'cpu/flow':>10}")
+    for name, s in stats.items():
+        line = (
+            f"{name:<16}{s['reruns_per_flow']:>8.1f}{s['hops_per_flow']:>6.1f}"
+            f"{s['wall_ms_p50']:>8.1f}ms{s['wall_ms_p90']:>8.1f}ms{s['cpu_ms_mean']:>8.1f}ms"
+            f"{s['wall_ms_per_flow']:>9.0f}ms{s['cpu_ms_per_flow']:>8.0f}ms"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get("cpu_ms_per_flow"):
+            line += f"   cpu/flow x{s['cpu_ms_per_flow'] / base['cpu_ms_per_flow']:.2f}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=3, help="sessions to script, one after another")
+    parser.add_argument("--turns", type=int, default=3, help="chat turns per session")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed flows first (imports, caches)")
+    parser.add_argument("--base-url", help="OpenAI-compatible LLM to use instead of the mock")
+    parser.add_argument("--spawn-fake", action="store_true", help="start tools/fake_openai.py in-process as the LLM")
+    parser.add_argument("--save", help="write per-screen results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to compare against")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    tmp = tempfile.mkdtemp(prefix="bench_reruns_")
+    os.environ["OUTCOMES_DB"] = os.path.join(tmp, "outcomes.db")
+    if args.spawn_fake:
+        args.base_url = start_in_thread(config_from_args(args)).base_url
+    if args.base_url:
+        os.environ.update(LLM_BASE_URL=args.base_url, LLM_API_KEY="bench", LLM_MODEL="fake")
+
+    log = RerunLog()
+    install(log)
+    for _ in range(args.warmup):
+        run_flow(log, args.turns)
+    log.records.clear()
+    for _ in range(args.flows):
+        run_flow(log, args.turns)
+
+    stats = summarize(log.records, args.flows)
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["stats"]
+    mode = f"LLM {args.base_url}" if args.base_url else "mock LLM"
+    print(f"{args.flows} flows x {args.turns} chat turns, {mode}")
+    print_table(stats, baseline)
+
+    if args.save:
+        payload = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "flows": args.flows,
+                "turns": args.turns,
+                "llm": mode,
+            },
+            "stats": stats,
+        }
+        Path(args.save).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
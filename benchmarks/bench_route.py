@@ -0,0 +1,103 @@
+"""
+route() latency on a large synthetic library: JSON (indexed, in memory) vs the SQLite store.
+
+Cards are spread over every (driver, band) with role/dimension variants, like
+the planned content set. Reports cold start (open + first route) and warm
+per-call latency.
+
+    python benchmarks/bench_route.py --cards 10000
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from interventions.loader import get_library  # noqa: E402
+from interventions.store import build_store  # noqa: E402
+from routing.personalize import BANDS, DRIVERS, route  # noqa: E402
+
+ROLES = ("engineer", "designer", "writer", "analyst", "teacher")
+DIMENSIONS = ("L", "J", "S", "C")
+
+
+def make_library(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    tags = ["control", "clarity", "boundary", "values", "skills", "connection", "rest", "reframe"]
+    cards = []
+    for i in range(n):
+        driver = DRIVERS[i % len(DRIVERS)]
+        band = BANDS[(i // len(DRIVERS)) % len(BANDS)]
+        cards.append({
+            "id": f"X_{driver}_{band}_{i:05d}",
+            "driver": driver,
+            "neuroticism_band": band,
+            "role": rng.choice(ROLES),
+            "dimension": rng.choice(DIMENSIONS),
+            "title": f"练习 {i}",
+            "goal": "把一个模糊的担心变成一个可以执行的小步骤。" * 2,
+            "time_minutes": rng.choice((5, 10, 15)),
+            "steps": [f"第{k}步：写下你现在能做的一件小事。" for k in range(1, 4)],
+            "success_criteria": "你写下了至少一条具体行动。",
+            "fallback_if_stuck": "先只写一个词。",
+            "tags": rng.sample(tags, 3),
+        })
+    return {"version": "bench", "interventions": cards}
+
+
+def bench(path: str, calls: int) -> dict:
+    keys = [(d, b) for d in DRIVERS for b in BANDS]
+    t0 = time.perf_counter()
+    lib = get_library(path)
+    route(*keys[0], library_data=lib)
+    cold = time.perf_counter() - t0
+
+    samples = []
+    for i in range(calls):
+        driver, band = keys[i % len(keys)]
+        t = time.perf_counter()
+        actions = route(driver, band, lib)
+        samples.append(time.perf_counter() - t)
+    # reading a body (first access per card hits the store)
+    t = time.perf_counter()
+    _ = [a["steps"] for a in actions]
+    body = time.perf_counter() - t
+    samples.sort()
+    return {
+        "cold_ms": cold * 1000,
+        "p50_us": statistics.median(samples) * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99) - 1] * 1e6,
+        "body_us": body * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    data = make_library(args.cards)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = str(Path(tmp) / "library.json")
+        db_path = str(Path(tmp) / "library.db")
+        Path(json_path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        build_store(data, db_path)
+
+        print(f"{args.cards} cards, {args.calls} route() calls")
+        for name, path in (("json", json_path), ("sqlite", db_path)):
+            r = bench(path, args.calls)
+            print(
+                f"{name:>7}: cold {r['cold_ms']:.1f} ms, warm p50 {r['p50_us']:.1f} us, "
+                f"p99 {r['p99_us']:.1f} us, first body read {r['body_us']:.0f} us"
+            )
+        get_library(db_path).close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Rescoring exported sheets: per-respondent scalar scorers vs assessment.batch.
+
+Generates random 27-item sheets (6 N + 21 L/J/S/C), with a share of
+out-of-range answers, checks that both paths agree row for row, and reports
+the time of each.
+
+    python benchmarks/bench_scoring.py --respondents 50000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from assessment.ai_anxiety import score_dimension  # noqa: E402
+from assessment.batch import DIMENSION_LAYOUT, N_ITEMS, SHEET_ITEMS, score_sheets  # noqa: E402
+from assessment.neuroticism import score_neuroticism  # noqa: E402
+
+
+def score_scalar(sheets):
+    out = []
+    for row in sheets:
+        try:
+            n = score_neuroticism(row[:N_ITEMS])
+            start = N_ITEMS
+            dims = {}
+            for code, k in DIMENSION_LAYOUT:
+                dims[code] = score_dimension(row[start:start + k])
+                start += k
+        except ValueError as e:
+            out.append(str(e))
+            continue
+        out.append((n, dims))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--respondents", type=int, default=50000)
+    parser.add_argument("--invalid-share", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    matrix = rng.integers(1, 6, size=(args.respondents, SHEET_ITEMS))
+    bad = rng.random(args.respondents) < args.invalid_share
+    matrix[bad, rng.integers(0, SHEET_ITEMS, size=int(bad.sum()))] = 6
+    sheets = matrix.tolist()
+
+    t = time.perf_counter()
+    scalar = score_scalar(sheets)
+    t_scalar = time.perf_counter() - t
+
+    t = time.perf_counter()
+    batch = score_sheets(matrix)
+    t_batch = time.perf_counter() - t
+
+    for i, expected in enumerate(scalar):
+        if isinstance(expected, str):
+            assert not batch.valid[i] and batch.errors[i] == expected, i
+            continue
+        n, dims = expected
+        assert batch.neuroticism.result(i) == n, i
+        for code, res in dims.items():
+            assert batch.dimensions[code].result(i) == res, (i, code)
+
+    print(f"{args.respondents} sheets, {len(batch.errors)} invalid; results identical")
+    print(f"  scalar: {t_scalar * 1000:.1f} ms")
+    print(f"   batch: {t_batch * 1000:.1f} ms ({t_scalar / t_batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
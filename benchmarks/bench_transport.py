@@ -0,0 +1,103 @@
+"""
+Per-turn latency: one urlopen connection per call vs the pooled keep-alive transport.
+
+Runs against a local stand-in server. `--connect-delay-ms` adds a delay to every
+new connection to stand in for the DNS/TCP/TLS setup paid against a remote API.
+
+    python benchmarks/bench_transport.py --turns 30 --connect-delay-ms 40
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ai.transport import HTTPTransport  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        body = json.dumps({"choices": [{"message": {"content": "好的，我们继续。"}}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    connect_delay = 0.0
+
+    def get_request(self):
+        conn = super().get_request()
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        return conn
+
+
+def _transcript(turns: int):
+    msgs = [{"role": "system", "content": "system prompt " * 40}]
+    for i in range(turns):
+        msgs.append({"role": "user", "content": f"第{i}轮：我担心 AI 会取代我的工作。" * 3})
+        msgs.append({"role": "assistant", "content": "我听到了你的担心，我们先把它具体化。" * 3})
+    return msgs
+
+
+def _urlopen_call(url: str, payload) -> None:
+    req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    req.add_header("Content-Type", "application/json")
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        resp.read()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--connect-delay-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.connect_delay = args.connect_delay_ms / 1000.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+    transport = HTTPTransport()
+    results = {}
+    for name, call in (
+        ("urlopen", lambda p: _urlopen_call(url, p)),
+        ("pooled", lambda p: transport.post_json(url, p, {}, timeout=30)),
+    ):
+        samples = []
+        for turn in range(1, args.turns + 1):
+            payload = {"model": "bench", "messages": _transcript(turn)}
+            t0 = time.perf_counter()
+            call(payload)
+            samples.append((time.perf_counter() - t0) * 1000)
+        results[name] = samples
+
+    for name, samples in results.items():
+        print(
+            f"{name:8s} turns={len(samples)} mean={statistics.mean(samples):.2f}ms "
+            f"median={statistics.median(samples):.2f}ms max={max(samples):.2f}ms"
+        )
+    server.shutdown()
+    transport.close()
+
+
+if __name__ == "__main__":
+    main()
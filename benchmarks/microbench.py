@@ -0,0 +1,330 @@
+"""
+Micro-benchmarks for the hot pure-Python paths, with committed baselines.
+
+    python benchmarks/microbench.py                         # run and print
+    python benchmarks/microbench.py --save benchmarks/baselines/microbench.json
+    python benchmarks/microbench.py --compare benchmarks/baselines/microbench.json
+    python benchmarks/microbench.py --filter route
+
+Each case reports the median per-call time over --repeat rounds (each round
+auto-sized to at least --min-time seconds) together with its run-to-run
+spread (1.4826 x the median absolute deviation, a robust stdev). --compare
+flags a case as a regression only when the slowdown exceeds --sigmas times
+the combined spread of the baseline and the current run, and at least
+--min-tolerance (0.05 = 5%), so noisy cases get a wider band than stable
+ones. Baselines are machine-specific: refresh them with --save on the
+machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+for _k in list(os.environ):
+    if _k.startswith(("LLM_", "DEEPSEEK_")):
+        os.environ.pop(_k)
+
+from ai.analyzer import _extract_json, _heuristic_driver, _normalize, _parse_analysis  # noqa: E402
+from ai.llm_client import get_client  # noqa: E402
+from assessment.ai_anxiety import score_dimension  # noqa: E402
+from assessment.neuroticism import score_neuroticism  # noqa: E402
+from interventions.loader import InterventionLibrary, filter_interventions, load_interventions  # noqa: E402
+from routing.personalize import route  # noqa: E402
+
+LIB_PATH = str(ROOT / "src" / "interventions" / "library.json")
+
+# name -> setup; setup returns the zero-argument function to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+USER_LINES = [
+    "我担心AI会取代我，觉得很不安。",
+    "最近公司在讨论裁员，我怕自己的岗位消失。",
+    "我觉得自己越来越不重要了，好像没人需要我。",
+    "用AI写东西太方便了，我担心自己会变笨。",
+    "今天开会的时候又想到这些事情，整个人都很焦虑。",
+]
+ASSISTANT_LINES = [
+    "我听到你在担心 AI 会影响你的工作，这种不安很真实。",
+    "谢谢你愿意说出来。我们一起把它拆小一点。",
+    "你提到的这种感受很常见，我们先看看哪些部分是你能掌控的。",
+]
+
+
+def transcript(turns: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(turns):
+        out.append({"role": "user", "content": rng.choice(USER_LINES)})
+        out.append({"role": "assistant", "content": rng.choice(ASSISTANT_LINES)})
+    return out[:-1]  # ends on a user turn, like a pending chat request
+
+
+# ---------- scoring ----------
+
+@case("score_dimension/8_items")
+def _():
+    items = [3, 4, 2, 5, 1, 3, 4, 2]
+    return lambda: score_dimension(items)
+
+
+@case("score_neuroticism/6_items")
+def _():
+    items = [3, 4, 2, 5, 1, 3]
+    return lambda: score_neuroticism(items)
+
+
+# ---------- library + routing ----------
+
+@case("load_interventions/library.json")
+def _():
+    return lambda: load_interventions(LIB_PATH)
+
+
+@case("filter_interventions/dict")
+def _():
+    data = load_interventions(LIB_PATH)
+    return lambda: filter_interventions(data, "job_loss", "mid")
+
+
+@case("route/dict")
+def _():
+    data = load_interventions(LIB_PATH)
+    return lambda: route("skill_erosion", "high", data)
+
+
+@case("route/indexed_library")
+def _():
+    lib = InterventionLibrary(load_interventions(LIB_PATH))
+    return lambda: route("skill_erosion", "high", lib)
+
+
+@case("route/indexed_10k_cards")
+def _():
+    base = load_interventions(LIB_PATH)["interventions"]
+    cards = []
+    for i in range(10000):
+        card = dict(base[i % len(base)])
+        card["id"] = f"{card['id']}_{i}"
+        cards.append(card)
+    lib = InterventionLibrary({"version": "bench", "interventions": cards})
+    return lambda: route("skill_erosion", "high", lib)
+
+
+# ---------- mock chat ----------
+
+def _mock_chat_case(turns: int):
+    client = get_client()
+    base = transcript(turns)
+    system = {"role": "system", "content": "system"}
+
+    def run():
+        # a fresh first message per call: measures a full scan, not the per-session cache
+        client._mock_chat([system, dict(base[0])] + base[1:], show_prefix=False)
+
+    return run
+
+
+def _mock_chat_incremental_case(turns: int):
+    client = get_client()
+    messages = [{"role": "system", "content": "system"}] + transcript(turns)
+    client._mock_chat(messages, show_prefix=False)
+    return lambda: client._mock_chat(messages, show_prefix=False)
+
+
+for _turns in (5, 50, 500):
+    CASES[f"mock_chat/{_turns}_turns"] = (lambda t: lambda: _mock_chat_case(t))(_turns)
+    CASES[f"mock_chat/{_turns}_turns_cached"] = (lambda t: lambda: _mock_chat_incremental_case(t))(_turns)
+
+
+# ---------- analyzer ----------
+
+@case("heuristic_driver/long_transcript")
+def _():
+    text = "\n".join(m["content"] for m in transcript(500) if m["role"] == "user")
+    # no keyword until the very end: worst case for the scan
+    text = text.replace("裁员", "").replace("岗位消失", "").replace("取代", "").replace("不重要", "")
+    text = text.replace("没人需要", "").replace("变笨", "") + "\n我怕自己慢慢退化。"
+    return lambda: _heuristic_driver(text)
+
+
+def _analysis(n_items: int, field_chars: int) -> Dict[str, object]:
+    return {
+        "driver": "job_loss",
+        "intensity_guess_0_10": 7,
+        "unhelpful_thoughts": ["我一定会被取代" + "。" * field_chars for _ in range(n_items)],
+        "reframe": "能力可以迁移" * field_chars,
+        "suggested_actions": ["列出三个难替代的环节" * 4 for _ in range(n_items)],
+    }
+
+
+@case("extract_normalize/large_fenced")
+def _():
+    raw = "```json\n" + json.dumps(_analysis(200, 50), ensure_ascii=False, indent=2) + "\n```"
+    user_text = "我担心AI会取代我"
+    return lambda: _normalize(_extract_json(raw), user_text, None)
+
+
+@case("extract_normalize/prose_wrapped")
+def _():
+    raw = "好的，这是分析结果：\n" + json.dumps(_analysis(5, 10), ensure_ascii=False) + "\n希望对你有帮助。"
+    user_text = "我担心AI会取代我"
+    return lambda: _normalize(_extract_json(raw), user_text, None)
+
+
+@case("parse_analysis/malformed_truncated")
+def _():
+    raw = json.dumps(_analysis(200, 50), ensure_ascii=False)[:-4000]
+    user_text = "\n".join(m["content"] for m in transcript(50) if m["role"] == "user")
+    return lambda: _parse_analysis(raw, user_text, None)
+
+
+@case("parse_analysis/malformed_not_json")
+def _():
+    raw = "抱歉，我无法按照要求输出 JSON。" * 200
+    user_text = "\n".join(m["content"] for m in transcript(50) if m["role"] == "user")
+    return lambda: _parse_analysis(raw, user_text, None)
+
+
+# ---------- runner ----------
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> List[float]:
+    """Seconds per call for each of `repeat` rounds of an auto-sized loop."""
+    fn()  # warm up caches and lazy imports
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - t) / number)
+    return rounds
+
+
+def summarize(rounds: List[float]) -> Tuple[float, float]:
+    """(median, robust stdev) of the per-round timings."""
+    median = statistics.median(rounds)
+    mad = statistics.median(abs(r - median) for r in rounds)
+    return median, 1.4826 * mad
+
+
+def run(names: List[str], repeat: int, min_time: float) -> Dict[str, Tuple[float, float]]:
+    results = {}
+    for name in names:
+        median, spread = summarize([r * 1e9 for r in measure(CASES[name](), repeat, min_time)])
+        results[name] = (median, spread)
+        print(f"{name:<42} {_fmt_ns(median):>12} ±{spread / median:>6.1%}", flush=True)
+    return results
+
+
+def _fmt_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def tolerance(ns: float, spread: float, base: float, base_spread: Optional[float], sigmas: float, floor: float) -> float:
+    """Allowed relative slowdown: `sigmas` combined spreads, never below `floor`."""
+    if base_spread is None:
+        # baselines saved before spreads were recorded: assume the current run's noise
+        base_spread = spread / ns * base
+    combined = (spread ** 2 + base_spread ** 2) ** 0.5
+    return max(floor, sigmas * combined / base)
+
+
+def compare(
+    results: Dict[str, Tuple[float, float]], baseline: Dict, sigmas: float, floor: float
+) -> Tuple[List[str], List[str]]:
+    base_ns = baseline.get("ns_per_call", {})
+    base_spread = baseline.get("spread_ns", {})
+    regressions, lines = [], []
+    for name, (ns, spread) in results.items():
+        base = base_ns.get(name)
+        if base is None:
+            lines.append(f"{name:<42} {_fmt_ns(ns):>12}   (no baseline)")
+            continue
+        ratio = ns / base
+        tol = tolerance(ns, spread, base, base_spread.get(name), sigmas, floor)
+        flag = ""
+        if ratio > 1 + tol:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tol:
+            flag = "  faster"
+        lines.append(f"{name:<42} {_fmt_ns(ns):>12} vs {_fmt_ns(base):>12}  x{ratio:.2f} (±{tol:.0%}){flag}")
+    return regressions, lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=9, help="rounds per case (the median is reported)")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--sigmas", type=float, default=3.0, help="allowed slowdown in combined run-to-run spreads")
+    parser.add_argument("--min-tolerance", type=float, default=0.05, help="smallest slowdown ever flagged (0.05 = 5%%)")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    results = run(names, args.repeat, args.min_time)
+
+    if args.save:
+        payload = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "repeat": args.repeat,
+                "min_time": args.min_time,
+            },
+            "ns_per_call": {k: round(v[0], 1) for k, v in results.items()},
+            "spread_ns": {k: round(v[1], 1) for k, v in results.items()},
+        }
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions, lines = compare(results, baseline, args.sigmas, args.min_tolerance)
+        print(f"\ncompared with {args.compare} ({args.sigmas:g} sigma, at least {args.min_tolerance:.0%}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
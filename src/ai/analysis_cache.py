@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from ai.providers import ProviderConfig
+from ai.prompts import SYSTEM_ANALYZER, ANALYZER_SCHEMA_HINT
+
+# Changes whenever the analyzer prompt changes, so old entries stop matching.
+PROMPT_VERSION = hashlib.sha256((SYSTEM_ANALYZER + ANALYZER_SCHEMA_HINT).encode("utf-8")).hexdigest()[:12]
+
+
+def analysis_key(messages: List[Dict[str, str]], providers: Sequence[ProviderConfig]) -> str:
+    """Stable hash of transcript + configured providers and models + analyzer prompt version."""
+    transcript = [{"role": m.get("role", ""), "content": m.get("content", "")} for m in messages]
+    models = [[p.name, p.base_url, p.model] for p in providers]
+    raw = json.dumps(
+        {"prompt": PROMPT_VERSION, "models": models, "messages": transcript},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    def load(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]: ...
+
+    def store(self, key: str, stored_at: float, value: Dict[str, Any]) -> None: ...
+
+
+class DiskBackend:
+    """One JSON file per key; writes are atomic (tmp file + rename)."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        try:
+            obj = json.loads(self._path(key).read_text(encoding="utf-8"))
+            return float(obj["stored_at"]), obj["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, key: str, stored_at: float, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(json.dumps({"stored_at": stored_at, "value": value}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+
+class AnalysisCache:
+    """
+    Bounded LRU + TTL cache for normalized analyze_chat() results.
+    An optional backend is read on memory misses and written on every put.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, backend: Optional[CacheBackend] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fresh(self, stored_at: float, now: float) -> bool:
+        return now - stored_at <= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and not self._fresh(entry[0], now):
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+        entry = self.backend.load(key) if self.backend is not None else None
+        with self._lock:
+            if entry is None or not self._fresh(entry[0], now):
+                self.misses += 1
+                return None
+            self._put_locked(key, entry)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        entry = (time.time(), copy.deepcopy(value))
+        with self._lock:
+            self._put_locked(key, entry)
+        if self.backend is not None:
+            self.backend.store(key, entry[0], entry[1])
+
+    def _put_locked(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_CACHE: Optional[AnalysisCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Process-wide cache configured from ANALYSIS_CACHE_* env vars."""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                cache_dir = os.getenv("ANALYSIS_CACHE_DIR", "").strip()
+                _CACHE = AnalysisCache(
+                    max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "256")),
+                    ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL", "3600")),
+                    backend=DiskBackend(cache_dir) if cache_dir else None,
+                )
+    return _CACHE
@@ -0,0 +1,188 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.error
+import weakref
+from typing import Any, Coroutine, Dict, List, Optional, Tuple, TypeVar
+
+from ai.async_transport import get_async_transport
+from ai.context import ContextWindow
+from ai.llm_client import LLMClient, LLMConfig, ProviderFailure, get_config
+from ai.metrics import note_attempt, note_format_retry, note_provider_failure, note_usage, start_call
+from ai.providers import ProviderConfig, get_router
+from ai.resilience import acall_with_retry, get_breaker
+
+T = TypeVar("T")
+
+# Tasks get their own copy of the context, so concurrent achat() calls on one
+# loop never see each other's errors.
+_LAST_ERROR: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_last_error", default=None)
+_LAST_PROVIDER: contextvars.ContextVar[Optional[ProviderConfig]] = contextvars.ContextVar("llm_last_provider", default=None)
+
+_LIMITERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_limiter() -> asyncio.Semaphore:
+    """Bounded semaphore shared by every AsyncLLMClient call on the running loop."""
+    loop = asyncio.get_running_loop()
+    limiter = _LIMITERS.get(loop)
+    if limiter is None:
+        limiter = asyncio.BoundedSemaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "16")))
+        _LIMITERS[loop] = limiter
+    return limiter
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    asyncio variant of LLMClient with the same fallbacks (mock, dedupe,
+    retry without response_format). last_error and last_provider are tracked
+    per task; read them in the same task that awaited achat().
+    """
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return _LAST_ERROR.get()
+
+    @last_error.setter
+    def last_error(self, value: Optional[str]) -> None:
+        _LAST_ERROR.set(value)
+
+    @property
+    def last_provider(self) -> Optional[ProviderConfig]:
+        return _LAST_PROVIDER.get()
+
+    @last_provider.setter
+    def last_provider(self, value: Optional[ProviderConfig]) -> None:
+        _LAST_PROVIDER.set(value)
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.4,
+        force_json: bool = False,
+        context: Optional[ContextWindow] = None,
+    ) -> str:
+        if not self.enabled():
+            # mock path does no I/O
+            return self.chat(messages, temperature=temperature, force_json=force_json)
+
+        call = start_call(self.model, "analyzer" if force_json else "chat")
+        self.last_provider = None
+        request_messages = context.fit(messages) if context is not None else messages
+        router = get_router()
+        failures: List[Tuple[ProviderConfig, str]] = []
+        for provider in router.rank(self.providers):
+            if not get_breaker(provider.base_url).allow():
+                continue
+            started = time.monotonic()
+            try:
+                reply = await self._aattempt(provider, request_messages, temperature, force_json)
+            except ProviderFailure as e:
+                router.record_failure(provider)
+                note_provider_failure(provider.name)
+                failures.append((provider, str(e)))
+                continue
+            router.record_success(provider, time.monotonic() - started)
+            self.last_error = None
+            self.last_provider = provider
+            reply = self._dedupe_or_fallback(messages, reply)
+            call.finish("ok")
+            return reply
+
+        self.last_error = self._failure_text(failures)
+        call.finish("provider_error" if failures else "breaker_open")
+        return self._mock_chat(messages, error=self.last_error, show_prefix=False)
+
+    async def _aattempt(
+        self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+    ) -> str:
+        breaker = get_breaker(provider.base_url)
+        try:
+            return await acall_with_retry(
+                lambda: self._acall_chat(provider, messages, temperature=temperature, force_json=force_json, response_format_enabled=True),
+                breaker,
+                self.retry_policy,
+            )
+        except urllib.error.HTTPError as e:
+            body = self._read_http_error_body(e)
+            err_text = self._format_http_error(e, body)
+            if not (force_json and self._should_retry_without_response_format(e, body)):
+                raise ProviderFailure(err_text)
+            note_format_retry()
+        except (urllib.error.URLError, OSError, KeyError, json.JSONDecodeError) as e:
+            raise ProviderFailure(str(e))
+
+        try:
+            return await acall_with_retry(
+                lambda: self._acall_chat(provider, messages, temperature=temperature, force_json=True, response_format_enabled=False),
+                breaker,
+                self.retry_policy,
+            )
+        except (urllib.error.URLError, urllib.error.HTTPError, OSError, KeyError, json.JSONDecodeError) as e2:
+            raise ProviderFailure(str(e2))
+
+    async def _acall_chat(
+        self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+        response_format_enabled: bool,
+    ) -> str:
+        payload = self._build_payload(provider, messages, temperature, force_json, response_format_enabled)
+        note_attempt(provider.name)
+        async with get_limiter():
+            raw = await get_async_transport().post_json(
+                self._chat_url(provider), payload, self._auth_headers(provider), timeout=self.timeout
+            )
+        obj = json.loads(raw.decode("utf-8"))
+        note_usage(obj.get("usage"))
+        return obj["choices"][0]["message"]["content"]
+
+
+_ASYNC_CLIENT: Optional[AsyncLLMClient] = None
+
+
+def get_async_client() -> AsyncLLMClient:
+    """Shared async client; rebuilt when reset_config() has dropped the cached config."""
+    global _ASYNC_CLIENT
+    cfg: LLMConfig = get_config()
+    client = _ASYNC_CLIENT
+    if client is None or client.config is not cfg:
+        client = AsyncLLMClient(cfg)
+        _ASYNC_CLIENT = client
+    return client
+
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop on a daemon thread, shared by all sessions."""
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the shared loop from a sync thread (e.g. a Streamlit script)."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+    """Schedule a coroutine on the shared loop without waiting; returns a concurrent future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import io
+import os
+import ssl
+import urllib.error
+import weakref
+from email.message import Message
+from typing import Dict, List, Optional, Tuple
+
+from ai.transport import Route, encode_json_body, gzip_requests_enabled, route_for
+
+Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _StaleConnection(Exception):
+    pass
+
+
+class AsyncHTTPTransport:
+    """
+    Minimal asyncio HTTP/1.1 client with keep-alive, for AsyncLLMClient.
+
+    Connections belong to the event loop that opened them, so use one instance
+    per loop (see get_async_transport()). Errors are raised as
+    urllib.error.HTTPError / URLError and proxies are resolved the same way as
+    in the sync HTTPTransport.
+    """
+
+    def __init__(self, max_idle_per_host: int = 8, gzip_requests: bool = False, gzip_min_bytes: int = 1024):
+        self.max_idle_per_host = max_idle_per_host
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self._idle: Dict[Route, List[Conn]] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+
+    def _context(self) -> ssl.SSLContext:
+        if self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        return self._ssl
+
+    async def _open(self, route: Route) -> Conn:
+        (scheme, host, port), proxy = route
+        if proxy is None:
+            if scheme == "https":
+                return await asyncio.open_connection(host, port, ssl=self._context(), server_hostname=host)
+            return await asyncio.open_connection(host, port)
+        proxy_host, proxy_port, auth = proxy
+        reader, writer = await asyncio.open_connection(proxy_host, proxy_port)
+        if scheme == "https":
+            try:
+                await self._tunnel(reader, writer, host, port, auth)
+            except BaseException:
+                writer.close()
+                raise
+        return reader, writer
+
+    async def _tunnel(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, port: int, auth: Optional[str]
+    ) -> None:
+        head = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+        if auth:
+            head.append(f"Proxy-Authorization: {auth}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        status_line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or parts[1] != "200":
+            raise OSError(f"Tunnel connection failed: {status_line or 'no response'}")
+        await writer.start_tls(self._context(), server_hostname=host)
+
+    def _pop_idle(self, route: Route) -> Optional[Conn]:
+        idle = self._idle.get(route) or []
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _release(self, route: Route, conn: Conn) -> None:
+        idle = self._idle.setdefault(route, [])
+        if len(idle) < self.max_idle_per_host:
+            idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def aclose(self) -> None:
+        conns = [c for idle in self._idle.values() for c in idle]
+        self._idle.clear()
+        for _, writer in conns:
+            writer.close()
+
+    async def post_json(self, url: str, payload: Dict, headers: Dict[str, str], timeout: float) -> bytes:
+        body, req_headers = encode_json_body(payload, headers, False, self.gzip_requests, self.gzip_min_bytes)
+        try:
+            return await asyncio.wait_for(self._request(url, body, req_headers), timeout)
+        except asyncio.TimeoutError:
+            raise urllib.error.URLError("timed out")
+
+    async def _request(self, url: str, body: bytes, headers: Dict[str, str]) -> bytes:
+        route, path = route_for(url)
+        (scheme, host, _), proxy = route
+        head = [f"POST {path} HTTP/1.1", f"Host: {host}"]
+        if scheme == "http" and proxy is not None and proxy[2]:
+            head.append(f"Proxy-Authorization: {proxy[2]}")
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        raw = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        for attempt in range(2):
+            conn = self._pop_idle(route)
+            reused = conn is not None
+            try:
+                if conn is None:
+                    conn = await self._open(route)
+                reader, writer = conn
+                writer.write(raw)
+                await writer.drain()
+                status, reason, resp_headers, data, keep_alive = await self._read_response(reader)
+            except _StaleConnection as e:
+                if conn is not None:
+                    conn[1].close()
+                if reused and attempt == 0:
+                    continue
+                raise urllib.error.URLError(e)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                if conn is not None:
+                    conn[1].close()
+                if reused and attempt == 0 and isinstance(e, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise urllib.error.URLError(e)
+            except BaseException:
+                # cancelled mid-response: the connection state is unknown
+                if conn is not None:
+                    conn[1].close()
+                raise
+
+            if keep_alive:
+                self._release(route, conn)
+            else:
+                writer.close()
+            if (resp_headers.get("Content-Encoding") or "").lower() == "gzip":
+                data = gzip.decompress(data)
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, resp_headers, io.BytesIO(data))
+            return data
+        raise urllib.error.URLError("connection failed")
+
+    async def _read_response(self, reader: asyncio.StreamReader) -> Tuple[int, str, Message, bytes, bool]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise _StaleConnection("server closed the connection")
+        version, status, *rest = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        reason = rest[0] if rest else ""
+
+        headers = Message()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and (headers.get("Connection") or "").lower() != "close"
+        if (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                if size == 0:
+                    # trailers end with an empty line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif headers.get("Content-Length") is not None:
+            data = await reader.readexactly(int(headers["Content-Length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), reason, headers, data, keep_alive
+
+
+_TRANSPORTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+
+
+def get_async_transport() -> AsyncHTTPTransport:
+    """Shared transport for the running event loop."""
+    loop = asyncio.get_running_loop()
+    transport = _TRANSPORTS.get(loop)
+    if transport is None:
+        transport = AsyncHTTPTransport(
+            max_idle_per_host=int(os.getenv("LLM_POOL_SIZE", "8")),
+            gzip_requests=gzip_requests_enabled(),
+        )
+        _TRANSPORTS[loop] = transport
+    return transport
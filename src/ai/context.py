@@ -0,0 +1,139 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_SPACES = re.compile(r"\s+")
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    CJK-aware token estimate: ~1 token per CJK character or full-width
+    punctuation, ~1 token per 4 other characters. Errs on the high side.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+def _compact(message: Dict[str, str], max_chars: int) -> str:
+    role = "用户" if message.get("role") == "user" else "助手"
+    text = _SPACES.sub(" ", message.get("content", "")).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars] + "…"
+    return f"{role}：{text}"
+
+
+class ContextWindow:
+    """
+    Fits a chat transcript into a per-request token budget.
+
+    Leading system messages and the most recent messages are sent verbatim;
+    older messages are replaced by a compact extractive summary appended to
+    the system prompt. The summary is rolling: each call only compacts the
+    messages that newly fell out of the window. Keep one instance per chat
+    session.
+    """
+
+    SUMMARY_HEADER = "以下是较早对话的要点摘要（仅供参考）："
+
+    def __init__(
+        self,
+        budget_tokens: int = 3000,
+        min_recent: int = 4,
+        summary_share: float = 0.25,
+        line_chars: int = 60,
+    ):
+        self.budget_tokens = budget_tokens
+        self.min_recent = min_recent
+        self.summary_budget = int(budget_tokens * summary_share)
+        self.line_chars = line_chars
+        self.last_stats: Dict[str, int] = {}
+        self._lines: List[Tuple[int, str]] = []
+        self._summarized: List[Dict[str, str]] = []
+
+    def _sync_summary(self, older: List[Dict[str, str]]) -> None:
+        done = len(self._summarized)
+        if older[:done] != self._summarized:
+            # transcript was edited or replaced: start the summary over
+            self._lines = []
+            self._summarized = []
+            done = 0
+        for m in older[done:]:
+            line = _compact(m, self.line_chars)
+            self._lines.append((estimate_tokens(line) + 1, line))
+            self._summarized.append(m)
+        # keep the newest lines that fit the summary budget
+        used = estimate_tokens(self.SUMMARY_HEADER)
+        keep = 0
+        for tokens, _ in reversed(self._lines):
+            if used + tokens > self.summary_budget:
+                break
+            used += tokens
+            keep += 1
+        if keep < len(self._lines):
+            self._lines = self._lines[len(self._lines) - keep:]
+
+    def _summary_text(self) -> str:
+        return "\n".join([self.SUMMARY_HEADER] + [line for _, line in self._lines])
+
+    def fit(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        n_sys = 0
+        while n_sys < len(messages) and messages[n_sys].get("role") == "system":
+            n_sys += 1
+        system, conv = messages[:n_sys], messages[n_sys:]
+
+        sizes = [message_tokens(m) for m in conv]
+        sys_tokens = sum(message_tokens(m) for m in system)
+        full = sys_tokens + sum(sizes)
+        if full <= self.budget_tokens:
+            self.last_stats = {"tokens_full": full, "tokens_sent": full, "tokens_saved": 0, "summarized_messages": 0}
+            return messages
+
+        # newest messages first, leaving room for the summary
+        room = self.budget_tokens - sys_tokens - self.summary_budget
+        cut = len(conv)
+        used = 0
+        while cut > 0:
+            size = sizes[cut - 1]
+            if used + size > room and len(conv) - cut >= self.min_recent:
+                break
+            used += size
+            cut -= 1
+        if cut == 0:
+            self.last_stats = {"tokens_full": full, "tokens_sent": full, "tokens_saved": 0, "summarized_messages": 0}
+            return messages
+
+        self._sync_summary(conv[:cut])
+        summary = self._summary_text()
+        if system:
+            head = [dict(system[0], content=system[0].get("content", "") + "\n\n" + summary)] + system[1:]
+        else:
+            head = [{"role": "system", "content": summary}]
+        fitted = head + conv[cut:]
+
+        sent = sum(message_tokens(m) for m in fitted)
+        self.last_stats = {
+            "tokens_full": full,
+            "tokens_sent": sent,
+            "tokens_saved": max(0, full - sent),
+            "summarized_messages": cut,
+        }
+        return fitted
+
+
+def context_from_env() -> Optional[ContextWindow]:
+    """ContextWindow sized by LLM_CONTEXT_BUDGET (tokens); 0 disables windowing."""
+    budget = int(os.getenv("LLM_CONTEXT_BUDGET", "3000"))
+    if budget <= 0:
+        return None
+    return ContextWindow(budget_tokens=budget)
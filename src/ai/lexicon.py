@@ -0,0 +1,192 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Ordered by priority: when keywords of several drivers appear, the first wins.
+DRIVER_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("job_loss", ("裁员", "失业", "岗位消失", "取代", "替代", "失去工作")),
+    ("value_threat", ("不重要", "没价值", "无用", "没人需要", "被边缘")),
+    ("skill_erosion", ("依赖", "退化", "变笨", "不用脑", "思考能力下降")),
+)
+DEFAULT_DRIVER = "value_threat"
+
+# Phrases the mock assistant uses to remember which questions it already asked.
+MOCK_MARKERS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("asked_worst", ("最害怕的结果是什么",)),
+    ("asked_driver", ("更像哪一种", "岗位消失/不重要/退化")),
+)
+
+_SEP = "\x00"
+
+
+def _partial_overlap(owners: Dict[str, Set[str]]) -> bool:
+    # a keyword ending where a keyword of another group starts ("ab" + "bc"):
+    # non-overlapping matching would find only one of them in "abc"
+    for a, a_labels in owners.items():
+        for b, b_labels in owners.items():
+            if a_labels == b_labels:
+                continue
+            if any(a.endswith(b[:k]) for k in range(1, min(len(a), len(b)))):
+                return True
+    return False
+
+
+class Lexicon:
+    """
+    Keyword groups. Single texts are checked with plain substring tests,
+    which beat any regex at this size; match_many() runs one compiled
+    alternation (longest keyword first) over all texts. A match counts for
+    every keyword it contains. If keywords of different groups can partly
+    overlap, the pattern becomes a lookahead that tries every position.
+    """
+
+    def __init__(self, groups: Sequence[Tuple[str, Sequence[str]]]):
+        self.labels = tuple(label for label, _ in groups)
+        self._groups = tuple((label, tuple(w.lower() for w in words)) for label, words in groups)
+        owners: Dict[str, Set[str]] = {}
+        for label, words in self._groups:
+            for w in words:
+                owners.setdefault(w, set()).add(label)
+        self._hits: Dict[str, FrozenSet[str]] = {}
+        for w in owners:
+            labels: Set[str] = set()
+            for other, other_labels in owners.items():
+                if other in w:
+                    labels |= other_labels
+            self._hits[w] = frozenset(labels)
+        words = sorted(owners, key=len, reverse=True)
+        alternation = "|".join(re.escape(w) for w in words)
+        if _partial_overlap(owners):
+            self._pattern = re.compile("(?=(" + alternation + "))")
+        else:
+            self._pattern = re.compile("(" + alternation + ")")
+
+    def match(self, text: str) -> Set[str]:
+        t = text.lower()
+        found: Set[str] = set()
+        for label, words in self._groups:
+            for w in words:
+                if w in t:
+                    found.add(label)
+                    break
+        return found
+
+    def classify(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """The highest-priority label found in `text`; stops at the first group that hits."""
+        t = text.lower()
+        for label, words in self._groups:
+            for w in words:
+                if w in t:
+                    return label
+        return default
+
+    def match_many(self, texts: Sequence[str]) -> List[Set[str]]:
+        """Batch form of match(): one regex pass over all texts."""
+        if not texts:
+            return []
+        # lowercase before measuring: lower() can change a string's length ("İ")
+        lowered = [t.lower() for t in texts]
+        starts: List[int] = []
+        pos = 0
+        for t in lowered:
+            starts.append(pos)
+            pos += len(t) + len(_SEP)
+        out: List[Set[str]] = [set() for _ in texts]
+        for m in self._pattern.finditer(_SEP.join(lowered)):
+            out[bisect.bisect_right(starts, m.start()) - 1] |= self._hits[m.group(1)]
+        return out
+
+    def first(self, found: Iterable[str], default: Optional[str] = None) -> Optional[str]:
+        found = set(found)
+        for label in self.labels:
+            if label in found:
+                return label
+        return default
+
+
+DRIVER_LEXICON = Lexicon(DRIVER_KEYWORDS)
+MARKER_LEXICON = Lexicon(MOCK_MARKERS)
+
+
+def classify_driver(text: str) -> str:
+    return DRIVER_LEXICON.classify(text, DEFAULT_DRIVER)
+
+
+def classify_drivers(texts: Sequence[str]) -> List[str]:
+    """Classify many texts at once (e.g. offline relabeling of exported chats)."""
+    return [DRIVER_LEXICON.first(found, DEFAULT_DRIVER) for found in DRIVER_LEXICON.match_many(texts)]
+
+
+class TranscriptScan:
+    """Keyword state of one transcript: drivers seen in user turns, markers in assistant turns."""
+
+    __slots__ = ("user_drivers", "assistant_markers", "count", "first", "last")
+
+    def __init__(self):
+        self.user_drivers: Set[str] = set()
+        self.assistant_markers: Set[str] = set()
+        self.count = 0
+        self.first: Optional[Dict[str, str]] = None
+        self.last: Optional[Dict[str, str]] = None
+
+    @property
+    def driver(self) -> str:
+        return DRIVER_LEXICON.first(self.user_drivers, DEFAULT_DRIVER)
+
+    def add(self, messages: Sequence[Dict[str, str]]) -> None:
+        for m in messages:
+            role = m.get("role")
+            if role == "user":
+                self.user_drivers |= DRIVER_LEXICON.match(m.get("content", ""))
+            elif role == "assistant":
+                self.assistant_markers |= MARKER_LEXICON.match(m.get("content", ""))
+        if messages:
+            if self.first is None:
+                self.first = messages[0]
+            self.last = messages[-1]
+            self.count += len(messages)
+
+
+class ScanCache:
+    """
+    Incremental scans per chat session. A session is recognized by its first
+    non-system message object, which stays the same as the transcript grows
+    (Screen C appends to one list). The cache holds references to the
+    first/last message it saw, so it can verify the transcript was only
+    appended to and then scan just the new messages; anything else is
+    rescanned from scratch.
+    """
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._scans: "OrderedDict[int, TranscriptScan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scan(self, messages: Sequence[Dict[str, str]]) -> TranscriptScan:
+        start = 0
+        while start < len(messages) and messages[start].get("role") == "system":
+            start += 1
+        conv = messages[start:]
+        if not conv:
+            return TranscriptScan()
+
+        key = id(conv[0])
+        with self._lock:
+            state = self._scans.get(key)
+            if state is None or state.first is not conv[0] or state.count > len(conv) or conv[state.count - 1] is not state.last:
+                state = TranscriptScan()
+            self._scans[key] = state
+            self._scans.move_to_end(key)
+            while len(self._scans) > self.max_sessions:
+                self._scans.popitem(last=False)
+            state.add(conv[state.count:])
+            return state
+
+
+_SCANS = ScanCache()
+
+
+def scan_transcript(messages: Sequence[Dict[str, str]]) -> TranscriptScan:
+    return _SCANS.scan(messages)
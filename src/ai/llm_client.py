@@ -1,104 +1,256 @@
 import json
 import os
-import urllib.request
+import threading
+import time
 import urllib.error
-from typing import List, Dict, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from ai.context import ContextWindow
+from ai.lexicon import scan_transcript
+from ai.metrics import note_attempt, note_dedupe, note_format_retry, note_provider_failure, note_usage, start_call
+from ai.providers import ProviderConfig, get_router, normalize_base_url, parse_providers
+from ai.resilience import CircuitBreaker, call_with_retry, get_breaker, policy_from_env, stream_with_retry
+from ai.transport import get_transport
 
-class LLMClient:
-    def __init__(self):
-        cfg = self._load_config()
-        self.base_url = cfg["base_url"].rstrip("/")
-        if self.base_url.endswith("/v1"):
-            self.base_url = self.base_url[:-3]
-        self.api_key = cfg["api_key"]
-        self.model = cfg["model"].strip()
-        self.timeout = int(os.getenv("LLM_TIMEOUT", "30"))
-        self.last_error: Optional[str] = None
+
+@dataclass(frozen=True)
+class LLMConfig:
+    base_url: str
+    api_key: str
+    model: str
+    timeout: int
+    # every endpoint to route between, preferred first; the fields above
+    # mirror providers[0]
+    providers: Tuple[ProviderConfig, ...] = ()
 
     def enabled(self) -> bool:
         return bool(self.base_url and self.api_key and self.model)
 
-    def _load_config(self) -> Dict[str, str]:
-        # Priority: standard LLM_* env -> Streamlit secrets -> DeepSeek-style env
-        base_url = os.getenv("LLM_BASE_URL", "").strip()
-        api_key = os.getenv("LLM_API_KEY", "").strip()
-        model = os.getenv("LLM_MODEL", "").strip()
-        secret_vals: Dict[str, str] = {}
-
-        if not (base_url and api_key and model):
-            secret_vals = self._load_streamlit_secrets()
-            base_url = base_url or secret_vals.get("LLM_BASE_URL", "")
-            api_key = api_key or secret_vals.get("LLM_API_KEY", "")
-            model = model or secret_vals.get("LLM_MODEL", "")
-
-        if not api_key:
-            api_key = os.getenv("DEEPSEEK_API_KEY", "").strip() or secret_vals.get("DEEPSEEK_API_KEY", "")
-        if not model:
-            model = os.getenv("DEEPSEEK_MODEL", "").strip() or secret_vals.get("DEEPSEEK_MODEL", "") or "deepseek-chat"
-        if not base_url and api_key:
-            base_url = os.getenv("DEEPSEEK_BASE_URL", "").strip() or secret_vals.get("DEEPSEEK_BASE_URL", "") or "https://api.deepseek.com"
-
-        return {
-            "base_url": base_url,
-            "api_key": api_key,
-            "model": model,
-        }
 
-    def _load_streamlit_secrets(self) -> Dict[str, str]:
-        try:
-            import streamlit as st  # lazy import to avoid hard dependency at module import time
-        except Exception:
-            return {}
+def _resolve_config() -> Dict[str, str]:
+    # Priority: standard LLM_* env -> Streamlit secrets -> DeepSeek-style env
+    base_url = os.getenv("LLM_BASE_URL", "").strip()
+    api_key = os.getenv("LLM_API_KEY", "").strip()
+    model = os.getenv("LLM_MODEL", "").strip()
+    secret_vals: Dict[str, str] = {}
+
+    if not (base_url and api_key and model):
+        secret_vals = _load_streamlit_secrets()
+        base_url = base_url or secret_vals.get("LLM_BASE_URL", "")
+        api_key = api_key or secret_vals.get("LLM_API_KEY", "")
+        model = model or secret_vals.get("LLM_MODEL", "")
+
+    if not api_key:
+        api_key = os.getenv("DEEPSEEK_API_KEY", "").strip() or secret_vals.get("DEEPSEEK_API_KEY", "")
+    if not model:
+        model = os.getenv("DEEPSEEK_MODEL", "").strip() or secret_vals.get("DEEPSEEK_MODEL", "") or "deepseek-chat"
+    if not base_url and api_key:
+        base_url = os.getenv("DEEPSEEK_BASE_URL", "").strip() or secret_vals.get("DEEPSEEK_BASE_URL", "") or "https://api.deepseek.com"
 
+    return {
+        "base_url": base_url,
+        "api_key": api_key,
+        "model": model,
+    }
+
+
+def _load_streamlit_secrets() -> Dict[str, str]:
+    try:
+        import streamlit as st  # lazy import to avoid hard dependency at module import time
+    except Exception:
+        return {}
+
+    try:
+        secrets_obj = st.secrets
+    except Exception:
+        return {}
+
+    out: Dict[str, str] = {}
+    keys = (
+        "LLM_BASE_URL",
+        "LLM_API_KEY",
+        "LLM_MODEL",
+        "DEEPSEEK_BASE_URL",
+        "DEEPSEEK_API_KEY",
+        "DEEPSEEK_MODEL",
+    )
+    for key in keys:
         try:
-            secrets_obj = st.secrets
+            val = secrets_obj.get(key, "")
         except Exception:
             return {}
+        if isinstance(val, str) and val.strip():
+            out[key] = val.strip()
 
-        out: Dict[str, str] = {}
-        keys = (
-            "LLM_BASE_URL",
-            "LLM_API_KEY",
-            "LLM_MODEL",
-            "DEEPSEEK_BASE_URL",
-            "DEEPSEEK_API_KEY",
-            "DEEPSEEK_MODEL",
-        )
+    # Also support nested style:
+    # [secrets]
+    # DEEPSEEK_API_KEY = "..."
+    try:
+        nested = secrets_obj.get("secrets", {})
+    except Exception:
+        nested = {}
+    if isinstance(nested, dict):
         for key in keys:
-            try:
-                val = secrets_obj.get(key, "")
-            except Exception:
-                return {}
+            if key in out:
+                continue
+            val = nested.get(key, "")
             if isinstance(val, str) and val.strip():
                 out[key] = val.strip()
+    return out
+
+
+def _load_secret_providers() -> Any:
+    try:
+        import streamlit as st  # lazy import to avoid hard dependency at module import time
+        return st.secrets.get("LLM_PROVIDERS", None)
+    except Exception:
+        return None
+
+
+def load_config() -> LLMConfig:
+    """Resolve LLM settings from env vars and Streamlit secrets (uncached)."""
+    timeout = int(os.getenv("LLM_TIMEOUT", "30"))
+
+    # Multi-provider setup: LLM_PROVIDERS (JSON env) or [[LLM_PROVIDERS]] in secrets
+    providers = parse_providers(os.getenv("LLM_PROVIDERS", "")) or parse_providers(_load_secret_providers())
+    if providers:
+        primary = providers[0]
+        return LLMConfig(
+            base_url=primary.base_url,
+            api_key=primary.api_key,
+            model=primary.model,
+            timeout=timeout,
+            providers=providers,
+        )
+
+    cfg = _resolve_config()
+    single = ProviderConfig(
+        name="default",
+        base_url=normalize_base_url(cfg["base_url"]),
+        api_key=cfg["api_key"],
+        model=cfg["model"].strip(),
+    )
+    return LLMConfig(
+        base_url=single.base_url,
+        api_key=single.api_key,
+        model=single.model,
+        timeout=timeout,
+        providers=(single,) if single.enabled() else (),
+    )
+
+
+_CONFIG: Optional[LLMConfig] = None
+_CLIENT: Optional["LLMClient"] = None
+_CONFIG_LOCK = threading.Lock()
+_SECRETS_HOOKED = False
+
+
+def _watch_secrets() -> None:
+    # Drop the cached config when Streamlit reloads secrets.toml.
+    global _SECRETS_HOOKED
+    if _SECRETS_HOOKED:
+        return
+    _SECRETS_HOOKED = True
+    try:
+        import streamlit as st
+        st.secrets.file_change_listener.connect(lambda *_, **__: reset_config(), weak=False)
+    except Exception:
+        pass
+
+
+def get_config() -> LLMConfig:
+    """Process-wide resolved config; call reset_config() after changing env/secrets."""
+    global _CONFIG
+    cfg = _CONFIG
+    if cfg is None:
+        with _CONFIG_LOCK:
+            if _CONFIG is None:
+                _CONFIG = load_config()
+                _watch_secrets()
+            cfg = _CONFIG
+    return cfg
 
-        # Also support nested style:
-        # [secrets]
-        # DEEPSEEK_API_KEY = "..."
-        try:
-            nested = secrets_obj.get("secrets", {})
-        except Exception:
-            nested = {}
-        if isinstance(nested, dict):
-            for key in keys:
-                if key in out:
-                    continue
-                val = nested.get(key, "")
-                if isinstance(val, str) and val.strip():
-                    out[key] = val.strip()
-        return out
+
+def get_client() -> "LLMClient":
+    """Process-wide client built from get_config(); last_error is per thread."""
+    global _CLIENT
+    client = _CLIENT
+    if client is None:
+        cfg = get_config()
+        with _CONFIG_LOCK:
+            if _CLIENT is None:
+                _CLIENT = LLMClient(cfg)
+            client = _CLIENT
+    return client
+
+
+def reset_config() -> None:
+    global _CONFIG, _CLIENT
+    with _CONFIG_LOCK:
+        _CONFIG = None
+        _CLIENT = None
+
+
+class ProviderFailure(Exception):
+    """One provider could not produce a reply; the message is user-facing."""
+
+
+class LLMClient:
+    def __init__(self, config: Optional[LLMConfig] = None):
+        cfg = config or get_config()
+        self.config = cfg
+        self.base_url = cfg.base_url
+        self.api_key = cfg.api_key
+        self.model = cfg.model
+        self.timeout = cfg.timeout
+        self.providers = cfg.providers
+        self.retry_policy = policy_from_env()
+        # A shared client serves several Streamlit script threads at once,
+        # so the error of the last call is kept per thread.
+        self._local = threading.local()
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return getattr(self._local, "last_error", None)
+
+    @last_error.setter
+    def last_error(self, value: Optional[str]) -> None:
+        self._local.last_error = value
+
+    @property
+    def last_provider(self) -> Optional[ProviderConfig]:
+        """Provider that answered this thread's last call; None when none did."""
+        return getattr(self._local, "last_provider", None)
+
+    @last_provider.setter
+    def last_provider(self, value: Optional[ProviderConfig]) -> None:
+        self._local.last_provider = value
+
+    def enabled(self) -> bool:
+        return bool(self.base_url and self.api_key and self.model)
+
+    def breaker(self) -> CircuitBreaker:
+        return get_breaker(self.base_url)
+
+    def _breaker_error(self, breaker: CircuitBreaker) -> str:
+        return f"服务暂不可用，已熔断（约 {int(breaker.retry_in()) + 1} 秒后重试）"
 
     def chat(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.4,
         force_json: bool = False,
+        context: Optional[ContextWindow] = None,
     ) -> str:
         """
         messages: [{"role":"system|user|assistant","content":"..."}]
         Uses OpenAI-compatible /v1/chat/completions.
+        context: optional ContextWindow; only the request payload is windowed,
+        the mock fallback and dedupe still see the full transcript.
         """
+        call = start_call(self.model, "analyzer" if force_json else "chat")
+        self.last_provider = None
         if not self.enabled():
             missing = []
             if not self.base_url:
@@ -109,61 +261,288 @@ class LLMClient:
                 missing.append("LLM_MODEL")
             if missing and any([self.base_url, self.api_key, self.model]):
                 self.last_error = f"缺少环境变量: {', '.join(missing)}"
+                call.finish("not_configured")
                 return self._mock_chat(messages, error=self.last_error, show_prefix=False)
             self.last_error = None
+            call.finish("mock")
             return self._mock_chat(messages, show_prefix=True)
 
-        try:
+        request_messages = context.fit(messages) if context is not None else messages
+        router = get_router()
+        failures: List[Tuple[ProviderConfig, str]] = []
+        for provider in router.rank(self.providers):
+            if not get_breaker(provider.base_url).allow():
+                continue
+            started = time.monotonic()
+            try:
+                reply = self._attempt(provider, request_messages, temperature, force_json)
+            except ProviderFailure as e:
+                # fail over to the next provider before dropping to the mock
+                router.record_failure(provider)
+                note_provider_failure(provider.name)
+                failures.append((provider, str(e)))
+                continue
+            router.record_success(provider, time.monotonic() - started)
             self.last_error = None
-            reply = self._call_chat(messages, temperature=temperature, force_json=force_json, response_format_enabled=True)
-            return self._dedupe_or_fallback(messages, reply)
+            self.last_provider = provider
+            reply = self._dedupe_or_fallback(messages, reply)
+            call.finish("ok")
+            return reply
+
+        # every provider failed or is cut off by its breaker: fail closed to mock to keep MVP usable
+        self.last_error = self._failure_text(failures)
+        call.finish("provider_error" if failures else "breaker_open")
+        return self._mock_chat(messages, error=self.last_error, show_prefix=False)
+
+    def _attempt(
+        self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+    ) -> str:
+        breaker = get_breaker(provider.base_url)
+        try:
+            return call_with_retry(
+                lambda: self._call_chat(provider, messages, temperature=temperature, force_json=force_json, response_format_enabled=True),
+                breaker,
+                self.retry_policy,
+            )
         except urllib.error.HTTPError as e:
             body = self._read_http_error_body(e)
             err_text = self._format_http_error(e, body)
-            self.last_error = err_text
-            if force_json and self._should_retry_without_response_format(e, body):
-                try:
-                    reply = self._call_chat(messages, temperature=temperature, force_json=True, response_format_enabled=False)
-                    return self._dedupe_or_fallback(messages, reply)
-                except (urllib.error.URLError, urllib.error.HTTPError, KeyError, json.JSONDecodeError) as e2:
-                    self.last_error = str(e2)
-                    return self._mock_chat(messages, error=self.last_error, show_prefix=False)
-            return self._mock_chat(messages, error=err_text, show_prefix=False)
-        except (urllib.error.URLError, KeyError, json.JSONDecodeError) as e:
-            # fail closed to mock to keep MVP usable
-            self.last_error = str(e)
-            return self._mock_chat(messages, error=self.last_error, show_prefix=False)
+            if not (force_json and self._should_retry_without_response_format(e, body)):
+                raise ProviderFailure(err_text)
+            note_format_retry()
+        except (urllib.error.URLError, OSError, KeyError, json.JSONDecodeError) as e:
+            raise ProviderFailure(str(e))
 
-    def _call_chat(
+        try:
+            return call_with_retry(
+                lambda: self._call_chat(provider, messages, temperature=temperature, force_json=True, response_format_enabled=False),
+                breaker,
+                self.retry_policy,
+            )
+        except (urllib.error.URLError, urllib.error.HTTPError, OSError, KeyError, json.JSONDecodeError) as e2:
+            raise ProviderFailure(str(e2))
+
+    def _failure_text(self, failures: List[Tuple[ProviderConfig, str]]) -> str:
+        if not failures:
+            return self._breaker_error(self.breaker())
+        if len(failures) == 1:
+            return failures[0][1]
+        return "；".join(f"{p.name}: {err}" for p, err in failures)
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.4,
+        force_json: bool = False,
+        context: Optional[ContextWindow] = None,
+    ) -> Iterator[str]:
+        """
+        Streaming variant of chat(): yields reply text as it arrives (SSE).
+        Same fallbacks as chat(); a fallback reply is yielded as one chunk.
+        Fails over to the next provider only before any text was yielded;
+        if the stream breaks later, it stops there and last_error is set.
+        """
+        if not self.enabled():
+            yield self.chat(messages, temperature=temperature, force_json=force_json)
+            return
+
+        call = start_call(self.model, "analyzer" if force_json else "chat")
+        request_messages = context.fit(messages) if context is not None else messages
+        router = get_router()
+        failures: List[Tuple[ProviderConfig, str]] = []
+        self.last_error = None
+        self.last_provider = None
+        for provider in router.rank(self.providers):
+            if not get_breaker(provider.base_url).allow():
+                continue
+            started = time.monotonic()
+            emitted = False
+            try:
+                for piece in self._dedupe_stream(messages, self._attempt_stream(provider, request_messages, temperature, force_json)):
+                    if not emitted:
+                        # route on time to first token
+                        router.record_success(provider, time.monotonic() - started)
+                        call.first_token()
+                        emitted = True
+                    yield piece
+            except ProviderFailure as e:
+                router.record_failure(provider)
+                note_provider_failure(provider.name)
+                failures.append((provider, str(e)))
+                if emitted:
+                    self.last_error = str(e)
+                    call.finish("stream_error")
+                    return
+                continue
+            if not emitted:
+                router.record_success(provider, time.monotonic() - started)
+            self.last_provider = provider
+            call.finish("ok")
+            return
+
+        self.last_error = self._failure_text(failures)
+        call.finish("provider_error" if failures else "breaker_open")
+        yield self._mock_chat(messages, error=self.last_error, show_prefix=False)
+
+    def _attempt_stream(
         self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+    ) -> Iterator[str]:
+        breaker = get_breaker(provider.base_url)
+        try:
+            yield from stream_with_retry(
+                lambda: self._call_chat_stream(provider, messages, temperature=temperature, force_json=force_json, response_format_enabled=True),
+                breaker,
+                self.retry_policy,
+            )
+            return
+        except urllib.error.HTTPError as e:
+            # status errors arrive before any text
+            body = self._read_http_error_body(e)
+            err_text = self._format_http_error(e, body)
+            if not (force_json and self._should_retry_without_response_format(e, body)):
+                raise ProviderFailure(err_text)
+            note_format_retry()
+        except (urllib.error.URLError, OSError, KeyError, json.JSONDecodeError) as e:
+            raise ProviderFailure(str(e))
+
+        try:
+            yield from stream_with_retry(
+                lambda: self._call_chat_stream(provider, messages, temperature=temperature, force_json=True, response_format_enabled=False),
+                breaker,
+                self.retry_policy,
+            )
+        except (urllib.error.URLError, urllib.error.HTTPError, OSError, KeyError, json.JSONDecodeError) as e2:
+            raise ProviderFailure(str(e2))
+
+    def _build_payload(
+        self,
+        provider: ProviderConfig,
         messages: List[Dict[str, str]],
         temperature: float,
         force_json: bool,
         response_format_enabled: bool,
-    ) -> str:
-        url = f"{self.base_url}/v1/chat/completions"
+    ) -> Dict:
         payload_messages = messages
         if force_json and not response_format_enabled:
             payload_messages = [
                 {"role": "system", "content": "Return ONLY valid JSON, no markdown or code fences."}
             ] + messages
         payload = {
-            "model": self.model,
+            "model": provider.model,
             "messages": payload_messages,
             "temperature": temperature,
         }
         if force_json and response_format_enabled:
             payload["response_format"] = {"type": "json_object"}
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, method="POST")
-        req.add_header("Content-Type", "application/json")
-        req.add_header("Authorization", f"Bearer {self.api_key}")
-
-        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-            body = resp.read().decode("utf-8")
-        obj = json.loads(body)
+        return payload
+
+    def _chat_url(self, provider: ProviderConfig) -> str:
+        return f"{provider.base_url}/v1/chat/completions"
+
+    def _auth_headers(self, provider: ProviderConfig) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {provider.api_key}"}
+
+    def _call_chat(
+        self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+        response_format_enabled: bool,
+    ) -> str:
+        payload = self._build_payload(provider, messages, temperature, force_json, response_format_enabled)
+        note_attempt(provider.name)
+        raw = get_transport().post_json(self._chat_url(provider), payload, self._auth_headers(provider), timeout=self.timeout)
+        obj = json.loads(raw.decode("utf-8"))
+        note_usage(obj.get("usage"))
         return obj["choices"][0]["message"]["content"]
 
+    def _call_chat_stream(
+        self,
+        provider: ProviderConfig,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        force_json: bool,
+        response_format_enabled: bool,
+    ) -> Iterator[str]:
+        payload = self._build_payload(provider, messages, temperature, force_json, response_format_enabled)
+        payload["stream"] = True
+        # ask for the usage chunk OpenAI-compatible servers send before [DONE]
+        payload["stream_options"] = {"include_usage": True}
+        headers = self._auth_headers(provider)
+        headers["Accept"] = "text/event-stream"
+
+        note_attempt(provider.name)
+        saw_done = False
+        usage: Dict[str, Any] = {}
+        with get_transport().stream_lines(self._chat_url(provider), payload, headers, timeout=self.timeout) as lines:
+            for raw_line in lines:
+                if saw_done:
+                    # drain to the end so the connection can be reused
+                    continue
+                piece = self._parse_sse_line(raw_line, usage)
+                if piece is None:
+                    saw_done = True
+                elif piece:
+                    yield piece
+        if not saw_done:
+            # a reply cut short is a provider failure, not a finished answer
+            raise urllib.error.URLError("stream ended before [DONE]")
+        note_usage(usage)
+
+    def _parse_sse_line(self, raw_line: bytes, usage: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        # Returns "" for lines without text, None at the [DONE] sentinel.
+        # A usage report is copied into `usage`; the last one wins, since some
+        # servers repeat running totals on every chunk.
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            return ""
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return None
+        obj = json.loads(data)
+        if usage is not None and isinstance(obj.get("usage"), dict):
+            usage.update(obj["usage"])
+        choices = obj.get("choices") or []
+        if not choices:
+            return ""
+        delta = choices[0].get("delta") or {}
+        return delta.get("content") or ""
+
+    def _dedupe_stream(self, messages: List[Dict[str, str]], pieces: Iterator[str]) -> Iterator[str]:
+        # Streaming counterpart of _dedupe_or_fallback: hold text back only while
+        # it is still a prefix of the last assistant reply, so TTFT is unaffected
+        # for normal replies.
+        last_assistant = ""
+        for m in reversed(messages):
+            if m.get("role") == "assistant":
+                last_assistant = m.get("content", "").strip()
+                break
+        if not last_assistant:
+            yield from pieces
+            return
+
+        held = ""
+        diverged = False
+        for piece in pieces:
+            if diverged:
+                yield piece
+                continue
+            held += piece
+            if not last_assistant.startswith(held.lstrip()):
+                diverged = True
+                yield held
+        if not diverged:
+            yield self._dedupe_or_fallback(messages, held)
+
     def _should_retry_without_response_format(self, error: urllib.error.HTTPError, body: Optional[str]) -> bool:
         if error.code in (400, 404, 422):
             return True
@@ -207,6 +586,7 @@ class LLMClient:
                 last_assistant = m.get("content", "")
                 break
         if last_assistant and reply.strip() == last_assistant.strip():
+            note_dedupe()
             return self._mock_chat(messages, error="LLM重复回复")
         return reply
 
@@ -216,23 +596,11 @@ class LLMClient:
         if error:
             prefix += f"（LLM调用失败：{error[:80]}）"
 
-        user_texts = [m.get("content", "") for m in messages if m.get("role") == "user"]
-        assistant_texts = [m.get("content", "") for m in messages if m.get("role") == "assistant"]
-        all_user = "\n".join(user_texts)
-
-        asked_worst = any("最害怕的结果是什么" in t for t in assistant_texts)
-        asked_driver = any("更像哪一种" in t or "岗位消失/不重要/退化" in t for t in assistant_texts)
-
-        def driver_of(text: str) -> str:
-            if any(k in text for k in ["裁员", "失业", "岗位消失", "取代", "替代", "失去工作"]):
-                return "job_loss"
-            if any(k in text for k in ["不重要", "没价值", "无用", "没人需要", "被边缘"]):
-                return "value_threat"
-            if any(k in text for k in ["依赖", "退化", "变笨", "不用脑", "思考能力下降"]):
-                return "skill_erosion"
-            return "value_threat"
-
-        drv = driver_of(all_user)
+        # incremental keyword scan: only messages added since the last turn are read
+        scan = scan_transcript(messages)
+        asked_worst = "asked_worst" in scan.assistant_markers
+        asked_driver = "asked_driver" in scan.assistant_markers
+        drv = scan.driver
 
         if not asked_worst:
             return (
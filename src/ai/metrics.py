@@ -0,0 +1,364 @@
+"""
+In-process metrics for LLM calls: latency and time-to-first-token
+histograms, token usage, retries, and how each call ended (real reply,
+duplicate-reply fallback, provider error, breaker open, mock mode).
+
+Every LLMClient call opens a CallRecord; the client notes attempts (per
+provider, so retries and failovers are counted apart), usage
+and fallbacks on it as they happen and closes it with an outcome. Labels are
+model, purpose ("chat" or "analyzer", from force_json) and band, which the
+caller sets with `metric_labels(band=...)` around the call. Recording is a
+few dict updates under one lock, so it stays on in production.
+
+Export is opt-in:
+- LLM_METRICS_PORT: serve Prometheus text at http://0.0.0.0:PORT/metrics
+  (the JSON API also serves GET /metrics)
+- LLM_METRICS_JSONL: append a snapshot as one JSON line every
+  LLM_METRICS_INTERVAL seconds (default 60) when anything changed, and at exit
+"""
+import atexit
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "llm_request_seconds": ("histogram", "Wall time of one chat()/chat_stream() call, fallbacks included."),
+    "llm_ttft_seconds": ("histogram", "Time to the first streamed chunk."),
+    "llm_tokens_total": ("counter", "Tokens reported in the response usage field."),
+    "llm_retries_total": ("counter", "HTTP attempts beyond the first to the same provider within one call."),
+    "llm_failovers_total": ("counter", "Calls moved on to another provider after one failed."),
+    "llm_response_format_retries_total": ("counter", "Calls retried without response_format."),
+    "llm_provider_failures_total": ("counter", "Provider attempts that ended in failover."),
+    "llm_analysis_total": ("counter", "analyze_chat results by how they were produced."),
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the last finite bound for +Inf)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class CallRecord:
+    __slots__ = ("labels", "started", "attempts", "prompt_tokens", "completion_tokens",
+                 "ttft", "deduped", "format_retry", "failed_providers")
+
+    def __init__(self, labels: Dict[str, str]):
+        self.labels = labels
+        self.started = time.monotonic()
+        self.attempts: Dict[str, int] = {}  # provider name -> HTTP attempts
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ttft: Optional[float] = None
+        self.deduped = False
+        self.format_retry = False
+        self.failed_providers: List[str] = []
+
+    def first_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.started
+
+    def finish(self, outcome: str) -> None:
+        if self.deduped and outcome == "ok":
+            outcome = "duplicate"
+        get_metrics().record_call(self, outcome, time.monotonic() - self.started)
+
+
+_LABELS: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("llm_metric_labels", default={})
+_CALL: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar("llm_metric_call", default=None)
+
+
+@contextlib.contextmanager
+def metric_labels(**labels: str) -> Iterator[None]:
+    """Extra labels (e.g. band) for LLM calls made inside the block."""
+    token = _LABELS.set({**_LABELS.get(), **{k: str(v) for k, v in labels.items()}})
+    try:
+        yield
+    finally:
+        _LABELS.reset(token)
+
+
+def current_labels() -> Dict[str, str]:
+    return dict(_LABELS.get())
+
+
+def start_call(model: str, purpose: str) -> CallRecord:
+    labels = {"model": model, "purpose": purpose, "band": ""}
+    labels.update(_LABELS.get())
+    rec = CallRecord(labels)
+    _CALL.set(rec)
+    return rec
+
+
+def current_call() -> Optional[CallRecord]:
+    return _CALL.get()
+
+
+def note_attempt(provider: str) -> None:
+    rec = _CALL.get()
+    if rec is not None:
+        rec.attempts[provider] = rec.attempts.get(provider, 0) + 1
+
+
+def note_usage(usage: Any) -> None:
+    rec = _CALL.get()
+    if rec is None or not isinstance(usage, dict):
+        return
+    try:
+        rec.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+        rec.completion_tokens += int(usage.get("completion_tokens") or 0)
+    except (TypeError, ValueError):
+        pass
+
+
+def note_dedupe() -> None:
+    rec = _CALL.get()
+    if rec is not None:
+        rec.deduped = True
+
+
+def note_format_retry() -> None:
+    rec = _CALL.get()
+    if rec is not None:
+        rec.format_retry = True
+
+
+def note_provider_failure(provider: str) -> None:
+    rec = _CALL.get()
+    if rec is not None:
+        rec.failed_providers.append(provider)
+
+
+def _key(labels: Dict[str, str]) -> LabelSet:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: LabelSet, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class LLMMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self.version = 0  # bumps on every update; the JSONL exporter compares it
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0) + amount
+            self.version += 1
+
+    def _observe(self, name: str, value: float, key: LabelSet) -> None:
+        series = self._histograms.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        hist.observe(value)
+
+    def _add(self, name: str, amount: float, key: LabelSet) -> None:
+        series = self._counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+    def record_call(self, rec: CallRecord, outcome: str, seconds: float) -> None:
+        base = _key(rec.labels)
+        model_purpose = _key({"model": rec.labels["model"], "purpose": rec.labels["purpose"]})
+        with self._lock:
+            self._observe("llm_request_seconds", seconds, base + (("outcome", outcome),))
+            if rec.ttft is not None:
+                self._observe("llm_ttft_seconds", rec.ttft, base)
+            if rec.prompt_tokens:
+                self._add("llm_tokens_total", rec.prompt_tokens, base + (("kind", "prompt"),))
+            if rec.completion_tokens:
+                self._add("llm_tokens_total", rec.completion_tokens, base + (("kind", "completion"),))
+            retries = sum(n - 1 for n in rec.attempts.values())
+            if retries:
+                self._add("llm_retries_total", retries, model_purpose)
+            if len(rec.attempts) > 1:
+                self._add("llm_failovers_total", len(rec.attempts) - 1, model_purpose)
+            if rec.format_retry:
+                self._add("llm_response_format_retries_total", 1, model_purpose)
+            for provider in rec.failed_providers:
+                self._add("llm_provider_failures_total", 1, (("provider", provider),))
+            self.version += 1
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Plain-JSON view: counters as values, histograms as count/sum/p50/p90/p99."""
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for name, series in self._counters.items():
+                out[name] = [{"labels": dict(k), "value": v} for k, v in series.items()]
+            for name, series in self._histograms.items():
+                out[name] = [
+                    {
+                        "labels": dict(k),
+                        "count": h.count,
+                        "sum": round(h.total, 6),
+                        "p50": h.quantile(0.5),
+                        "p90": h.quantile(0.9),
+                        "p99": h.quantile(0.99),
+                    }
+                    for k, h in series.items()
+                ]
+        return out
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name)
+                for key, value in series.items():
+                    lines.append(f"{name}{_fmt_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name)
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_fmt_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {h.total:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines: List[str], name: str) -> None:
+        kind, text = HELP.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.version += 1
+
+
+class JSONLExporter:
+    """Appends a snapshot line every `interval` seconds when the metrics changed."""
+
+    def __init__(self, metrics: LLMMetrics, path: str, interval: float = 60.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self._written_version: Optional[int] = None
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="llm-metrics-jsonl", daemon=True)
+        self._thread.start()
+
+    def write(self) -> bool:
+        with self._write_lock:
+            version = self.metrics.version
+            if version == self._written_version:
+                return False
+            line = json.dumps({"ts": round(time.time(), 3), "pid": os.getpid(), "metrics": self.metrics.snapshot()},
+                              ensure_ascii=False)
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self._written_version = version
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.write()
+
+
+def serve_metrics(metrics: LLMMetrics, host: str = "0.0.0.0", port: int = 0) -> ThreadingHTTPServer:
+    """Prometheus scrape endpoint on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-metrics-http", daemon=True).start()
+    return server
+
+
+_METRICS: Optional[LLMMetrics] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> LLMMetrics:
+    """Process-wide metrics; starts the exporters configured by env on first use."""
+    global _METRICS
+    if _METRICS is None:
+        with _METRICS_LOCK:
+            if _METRICS is None:
+                metrics = LLMMetrics()
+                jsonl = os.getenv("LLM_METRICS_JSONL", "").strip()
+                if jsonl:
+                    exporter = JSONLExporter(metrics, jsonl, float(os.getenv("LLM_METRICS_INTERVAL", "60")))
+                    atexit.register(exporter.close)
+                port = os.getenv("LLM_METRICS_PORT", "").strip()
+                if port:
+                    try:
+                        serve_metrics(metrics, port=int(port))
+                    except (OSError, ValueError):
+                        # another process on this host already serves the port; keep recording
+                        pass
+                _METRICS = metrics
+    return _METRICS
@@ -0,0 +1,176 @@
+import json
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ai.resilience import get_breaker
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    name: str
+    base_url: str
+    api_key: str
+    model: str
+    priority: int = 0  # lower is preferred
+    weight: float = 1.0  # higher gets more traffic among similar latencies
+
+    def enabled(self) -> bool:
+        return bool(self.base_url and self.api_key and self.model)
+
+
+def normalize_base_url(base_url: str) -> str:
+    base_url = base_url.strip().rstrip("/")
+    if base_url.endswith("/v1"):
+        base_url = base_url[:-3]
+    return base_url
+
+
+def parse_providers(raw: Any) -> Tuple[ProviderConfig, ...]:
+    """
+    raw: list of dicts (or a JSON string of one), e.g.
+      [{"name": "deepseek", "base_url": "https://api.deepseek.com",
+        "api_key_env": "DEEPSEEK_API_KEY", "model": "deepseek-chat",
+        "priority": 0, "weight": 2}]
+    `api_key_env` reads the key from an env var instead of inlining it.
+    Incomplete entries are skipped.
+    """
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return ()
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return ()
+    if not isinstance(raw, (list, tuple)):
+        return ()
+
+    out: List[ProviderConfig] = []
+    for i, item in enumerate(raw):
+        try:
+            item = dict(item)
+        except (TypeError, ValueError):
+            continue
+        api_key = str(item.get("api_key") or "").strip()
+        if not api_key and item.get("api_key_env"):
+            api_key = os.getenv(str(item["api_key_env"]), "").strip()
+        try:
+            priority = int(item.get("priority", 0))
+            weight = float(item.get("weight", 1.0))
+        except (TypeError, ValueError):
+            continue
+        provider = ProviderConfig(
+            name=str(item.get("name") or f"provider{i + 1}"),
+            base_url=normalize_base_url(str(item.get("base_url") or "")),
+            api_key=api_key,
+            model=str(item.get("model") or "").strip(),
+            priority=priority,
+            weight=weight if weight > 0 else 1.0,
+        )
+        if provider.enabled():
+            out.append(provider)
+    # stable: equal priorities keep their configured order
+    return tuple(sorted(out, key=lambda p: p.priority))
+
+
+class _Stats:
+    __slots__ = ("latency", "outcomes")
+
+    def __init__(self, window: int):
+        self.latency: Optional[float] = None
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+
+class ProviderRouter:
+    """
+    Tracks rolling latency (EWMA) and error rate per provider and orders the
+    candidates for each request: by priority tier, then healthy before
+    unhealthy, then latency / weight. Providers with an open breaker are left
+    out. A small share of requests explores within the first tier so that
+    latency estimates stay fresh.
+    """
+
+    def __init__(self, alpha: float = 0.3, window: int = 20, max_error_rate: float = 0.5, explore: float = 0.05):
+        self.alpha = alpha
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.explore = explore
+        self._stats: Dict[Tuple[str, str], _Stats] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, provider: ProviderConfig) -> Tuple[str, str]:
+        return provider.base_url, provider.model
+
+    def _get(self, provider: ProviderConfig) -> _Stats:
+        key = self._key(provider)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _Stats(self.window)
+        return stats
+
+    def record_success(self, provider: ProviderConfig, latency: float) -> None:
+        with self._lock:
+            stats = self._get(provider)
+            stats.latency = latency if stats.latency is None else (1 - self.alpha) * stats.latency + self.alpha * latency
+            stats.outcomes.append(True)
+
+    def record_failure(self, provider: ProviderConfig) -> None:
+        with self._lock:
+            self._get(provider).outcomes.append(False)
+
+    def _error_rate(self, stats: _Stats) -> float:
+        if not stats.outcomes:
+            return 0.0
+        return 1.0 - sum(stats.outcomes) / len(stats.outcomes)
+
+    def snapshot(self, providers: Iterable[ProviderConfig]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = []
+            for p in providers:
+                stats = self._get(p)
+                rows.append({
+                    "name": p.name,
+                    "model": p.model,
+                    "latency_s": stats.latency,
+                    "error_rate": self._error_rate(stats),
+                    "samples": len(stats.outcomes),
+                    "breaker": get_breaker(p.base_url).state,
+                })
+            return rows
+
+    def rank(self, providers: Sequence[ProviderConfig]) -> List[ProviderConfig]:
+        candidates = [p for p in providers if get_breaker(p.base_url).state != "open"]
+        with self._lock:
+            def score(p: ProviderConfig) -> Tuple[int, int, float]:
+                stats = self._get(p)
+                unhealthy = len(stats.outcomes) >= 5 and self._error_rate(stats) > self.max_error_rate
+                # unmeasured providers sort first so they get measured
+                latency = stats.latency if stats.latency is not None else 0.0
+                return p.priority, int(unhealthy), latency / p.weight
+
+            ranked = sorted(candidates, key=score)
+        if len(ranked) > 1 and self.explore > 0 and random.random() < self.explore:
+            tier = [p for p in ranked if p.priority == ranked[0].priority]
+            if len(tier) > 1:
+                pick = random.choice(tier[1:])
+                ranked.remove(pick)
+                ranked.insert(0, pick)
+        return ranked
+
+
+_ROUTER: Optional[ProviderRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> ProviderRouter:
+    """Process-wide router shared by all clients."""
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                _ROUTER = ProviderRouter(explore=float(os.getenv("LLM_ROUTER_EXPLORE", "0.05")))
+    return _ROUTER
@@ -0,0 +1,282 @@
+import asyncio
+import email.utils
+import http.client
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+_RESET_ERRORS = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError, http.client.RemoteDisconnected)
+
+
+def _reason(error: BaseException) -> BaseException:
+    if isinstance(error, urllib.error.URLError) and isinstance(error.reason, BaseException):
+        return error.reason
+    return error
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Errors that say the provider is unhealthy (counted by the circuit breaker)."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUS
+    if isinstance(error, urllib.error.URLError):
+        return True
+    return isinstance(error, (OSError, socket.timeout))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx and connection resets. Timeouts are not retried: they already cost LLM_TIMEOUT."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUS
+    return isinstance(_reason(error), _RESET_ERRORS)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    if not isinstance(error, urllib.error.HTTPError) or error.headers is None:
+        return None
+    value = error.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Jittered exponential backoff ("full jitter"), honoring Retry-After."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` (1-based), or None to give up."""
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return None
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            # a server asking for a longer pause than we are willing to wait: fail now
+            return hinted if hinted <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+def policy_from_env() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+    )
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive provider failures;
+    open -> half_open after `cooldown` seconds, letting one probe through;
+    the probe's outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """End a half-open probe without a verdict (the call was cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, error: Optional[BaseException]) -> None:
+        # Request-level errors (bad payload, auth) say nothing about provider health,
+        # but they still end a half-open probe.
+        if error is None or not is_provider_failure(error):
+            self.record_success()
+        else:
+            self.record_failure()
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(base_url: str) -> CircuitBreaker:
+    """Process-wide breaker per base_url."""
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(base_url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+            )
+            _BREAKERS[base_url] = breaker
+        return breaker
+
+
+_RETRY_ERRORS = (urllib.error.URLError, OSError)
+
+# Every attempt must leave the breaker with a verdict or a released probe:
+# a half-open probe that is never resolved would keep allow() False forever.
+# Errors outside _RETRY_ERRORS (a 200 with malformed JSON or missing fields)
+# count as provider failures but are not retried; cancellation (GeneratorExit,
+# asyncio.CancelledError, KeyboardInterrupt) releases the probe without one.
+
+
+def _sleep(seconds: float, breaker: CircuitBreaker) -> None:
+    # allow() may have handed this caller the probe for its next attempt
+    try:
+        time.sleep(seconds)
+    except BaseException:
+        breaker.release()
+        raise
+
+
+def call_with_retry(fn: Callable[[], T], breaker: CircuitBreaker, policy: RetryPolicy) -> T:
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = fn()
+        except _RETRY_ERRORS as e:
+            breaker.record(e)
+            wait = policy.delay(attempt, e)
+            if wait is None or not breaker.allow():
+                raise
+            _sleep(wait, breaker)
+            continue
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(None)
+        return result
+
+
+async def acall_with_retry(fn: Callable[[], Awaitable[T]], breaker: CircuitBreaker, policy: RetryPolicy) -> T:
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = await fn()
+        except _RETRY_ERRORS as e:
+            breaker.record(e)
+            wait = policy.delay(attempt, e)
+            if wait is None or not breaker.allow():
+                raise
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                breaker.release()
+                raise
+            continue
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(None)
+        return result
+
+
+def stream_with_retry(make: Callable[[], Iterator[T]], breaker: CircuitBreaker, policy: RetryPolicy) -> Iterator[T]:
+    """Retries only until the first item arrives; after that errors propagate."""
+    attempt = 0
+    while True:
+        attempt += 1
+        it = make()
+        try:
+            first = next(it)
+        except StopIteration:
+            breaker.record(None)
+            return
+        except _RETRY_ERRORS as e:
+            breaker.record(e)
+            wait = policy.delay(attempt, e)
+            if wait is None or not breaker.allow():
+                raise
+            _sleep(wait, breaker)
+            continue
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        break
+    breaker.record(None)
+    yield first
+    # the probe is resolved; an abandoned stream (GeneratorExit) needs no verdict
+    try:
+        yield from it
+    except _RETRY_ERRORS as e:
+        if is_provider_failure(e):
+            breaker.record_failure()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
@@ -0,0 +1,67 @@
+import concurrent.futures
+import threading
+from typing import Any, Dict, List, Optional
+
+from ai.analysis_cache import analysis_key
+from ai.analyzer import analyze_chat, analyze_chat_async
+from ai.async_client import submit
+from ai.llm_client import get_config
+from ai.metrics import current_labels, metric_labels
+
+
+async def _labeled(labels: Dict[str, str], messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    # the task runs on the loop thread; carry the caller's metric labels over
+    with metric_labels(**labels):
+        return await analyze_chat_async(messages)
+
+
+class SummaryPrefetcher:
+    """
+    Runs analyze_chat in the background for one chat session.
+
+    schedule() is called after each assistant turn and cancels the run for the
+    previous transcript; a cancelled run that held a breaker's half-open probe
+    releases it, so the provider is probed again on the next call. result() returns the finished (or in-flight) run when
+    its transcript matches, and only calls analyze_chat itself otherwise.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[str] = None
+        self._future: Optional["concurrent.futures.Future[Dict[str, Any]]"] = None
+
+    def _key_for(self, messages: List[Dict[str, str]]) -> str:
+        return analysis_key(messages, get_config().providers)
+
+    def schedule(self, messages: List[Dict[str, str]]) -> None:
+        snapshot = [dict(m) for m in messages]
+        key = self._key_for(snapshot)
+        with self._lock:
+            if key == self._key and self._future is not None and not self._future.cancelled():
+                return
+            if self._future is not None:
+                self._future.cancel()
+            self._key = key
+            self._future = submit(_labeled(current_labels(), snapshot))
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._future is not None:
+                self._future.cancel()
+            self._key = None
+            self._future = None
+
+    def result(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        key = self._key_for(messages)
+        with self._lock:
+            future = self._future if key == self._key else None
+        if future is not None:
+            if timeout is None:
+                # one try plus the retry without response_format, with some slack
+                timeout = get_config().timeout * 2 + 5
+            try:
+                return future.result(timeout)
+            except Exception:
+                # cancelled, timed out or failed: run it in the foreground instead
+                pass
+        return analyze_chat(messages)
@@ -0,0 +1,257 @@
+import gzip
+import http.client
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from base64 import b64encode
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+# Errors that mean a pooled (idle) connection was closed by the server;
+# the request is retried once on a fresh connection.
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+PoolKey = Tuple[str, str, int]
+# (host, port, Proxy-Authorization value or None)
+Proxy = Tuple[str, int, Optional[str]]
+# idle connections are pooled per origin and the proxy used to reach it
+Route = Tuple[PoolKey, Optional[Proxy]]
+
+
+def split_url(url: str) -> Tuple[PoolKey, str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme or "https"
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return (scheme, parts.hostname or "", port), path
+
+
+def proxy_for(key: PoolKey) -> Optional[Proxy]:
+    """
+    The forward proxy urllib would use for this origin (HTTP_PROXY /
+    HTTPS_PROXY, honouring NO_PROXY), or None to connect directly.
+    """
+    scheme, host, _ = key
+    url = urllib.request.getproxies().get(scheme)
+    if not url or urllib.request.proxy_bypass(host):
+        return None
+    if "://" not in url:
+        url = "http://" + url
+    parts = urlsplit(url)
+    auth = None
+    if parts.username is not None:
+        cred = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+        auth = "Basic " + b64encode(cred.encode("utf-8")).decode("ascii")
+    return parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80), auth
+
+
+def route_for(url: str) -> Tuple[Route, str]:
+    """Pool route and request target for url."""
+    key, path = split_url(url)
+    proxy = proxy_for(key)
+    if proxy is not None and key[0] == "http":
+        # a plain-http proxy takes the absolute URI
+        path = url
+    return (key, proxy), path
+
+
+def encode_json_body(
+    payload: Dict, headers: Dict[str, str], stream: bool, gzip_requests: bool, gzip_min_bytes: int
+) -> Tuple[bytes, Dict[str, str]]:
+    body = json.dumps(payload).encode("utf-8")
+    out = {"Content-Type": "application/json"}
+    out.update(headers)
+    if gzip_requests and len(body) >= gzip_min_bytes:
+        body = gzip.compress(body, compresslevel=5)
+        out["Content-Encoding"] = "gzip"
+    # SSE must not be buffered behind a compressor
+    out["Accept-Encoding"] = "identity" if stream else "gzip"
+    out["Content-Length"] = str(len(body))
+    return body, out
+
+
+def gzip_requests_enabled() -> bool:
+    return os.getenv("LLM_GZIP_REQUESTS", "").strip().lower() in ("1", "true", "yes")
+
+
+class HTTPTransport:
+    """
+    Process-wide keep-alive transport for OpenAI-compatible endpoints.
+
+    Keeps idle HTTP(S) connections per (scheme, host, port) and hands each one
+    to a single request at a time, so it is safe to share across Streamlit
+    script threads. HTTP(S)_PROXY / NO_PROXY are honoured like urlopen does:
+    https goes through a CONNECT tunnel, plain http is sent to the proxy. Errors are raised as urllib.error.HTTPError / URLError so
+    callers keep their urllib-based error handling.
+    """
+
+    def __init__(self, max_idle_per_host: int = 8, gzip_requests: bool = False, gzip_min_bytes: int = 1024):
+        self.max_idle_per_host = max_idle_per_host
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self._idle: Dict[Route, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    # ---------- pool ----------
+    def _key(self, url: str) -> Tuple[Route, str]:
+        return route_for(url)
+
+    def _acquire(self, route: Route, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(route)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        (scheme, host, port), proxy = route
+        if proxy is None:
+            if scheme == "https":
+                return http.client.HTTPSConnection(host, port, timeout=timeout), False
+            return http.client.HTTPConnection(host, port, timeout=timeout), False
+        proxy_host, proxy_port, auth = proxy
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout)
+            conn.set_tunnel(host, port, headers={"Proxy-Authorization": auth} if auth else None)
+            return conn, False
+        return http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout), False
+
+    def _release(self, route: Route, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(route, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._idle.values())
+
+    # ---------- requests ----------
+    def _encode(self, payload: Dict, headers: Dict[str, str], stream: bool) -> Tuple[bytes, Dict[str, str]]:
+        return encode_json_body(payload, headers, stream, self.gzip_requests, self.gzip_min_bytes)
+
+    def _send(
+        self, url: str, body: bytes, headers: Dict[str, str], timeout: float
+    ) -> Tuple[Route, http.client.HTTPConnection, http.client.HTTPResponse]:
+        route, path = self._key(url)
+        (scheme, _, _), proxy = route
+        if scheme == "http" and proxy is not None and proxy[2]:
+            headers = {**headers, "Proxy-Authorization": proxy[2]}
+        for attempt in range(2):
+            conn, reused = self._acquire(route, timeout)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                return route, conn, conn.getresponse()
+            except _STALE_ERRORS as e:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise urllib.error.URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+        raise urllib.error.URLError("connection failed")
+
+    def _read_body(self, resp: http.client.HTTPResponse) -> bytes:
+        data = resp.read()
+        if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+            data = gzip.decompress(data)
+        return data
+
+    def _finish(self, route: Route, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+        if resp.will_close or not resp.isclosed():
+            conn.close()
+        else:
+            self._release(route, conn)
+
+    def _raise_for_status(self, url: str, resp: http.client.HTTPResponse, body: bytes) -> None:
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+
+    def post_json(self, url: str, payload: Dict, headers: Dict[str, str], timeout: float) -> bytes:
+        body, req_headers = self._encode(payload, headers, stream=False)
+        route, conn, resp = self._send(url, body, req_headers, timeout)
+        try:
+            data = self._read_body(resp)
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise urllib.error.URLError(e)
+        self._finish(route, conn, resp)
+        self._raise_for_status(url, resp, data)
+        return data
+
+    @contextmanager
+    def stream_lines(self, url: str, payload: Dict, headers: Dict[str, str], timeout: float) -> Iterator[Iterator[bytes]]:
+        """
+        Yields an iterator over raw response lines. The connection goes back to
+        the pool only if the body was read to the end.
+        """
+        body, req_headers = self._encode(payload, headers, stream=True)
+        route, conn, resp = self._send(url, body, req_headers, timeout)
+        if resp.status >= 400:
+            try:
+                data = self._read_body(resp)
+            except (OSError, http.client.HTTPException):
+                data = b""
+            self._finish(route, conn, resp)
+            self._raise_for_status(url, resp, data)
+
+        complete = False
+
+        def _lines() -> Iterator[bytes]:
+            nonlocal complete
+            try:
+                while True:
+                    line = resp.readline()
+                    if not line:
+                        break
+                    yield line
+            except (OSError, http.client.HTTPException) as e:
+                raise urllib.error.URLError(e)
+            # http.client reports a connection dropped mid-body as a plain EOF:
+            # a cut chunked body never saw its terminating chunk (chunk_left is
+            # only reset to None by it), a short fixed-length body still owes bytes.
+            if not resp.isclosed() or resp.length or (resp.chunked and resp.chunk_left is not None):
+                raise urllib.error.URLError(http.client.IncompleteRead(b"", resp.length))
+            complete = True
+
+        try:
+            yield _lines()
+        finally:
+            if complete:
+                self._finish(route, conn, resp)
+            else:
+                conn.close()
+
+
+_TRANSPORT: Optional[HTTPTransport] = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Shared transport for this process (created on first use)."""
+    global _TRANSPORT
+    if _TRANSPORT is None:
+        with _TRANSPORT_LOCK:
+            if _TRANSPORT is None:
+                _TRANSPORT = HTTPTransport(
+                    max_idle_per_host=int(os.getenv("LLM_POOL_SIZE", "8")),
+                    gzip_requests=gzip_requests_enabled(),
+                )
+    return _TRANSPORT
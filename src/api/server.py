@@ -0,0 +1,250 @@
+"""
+Headless JSON API over the same functions the Streamlit app uses.
+
+    POST /v1/assess   {"neuroticism": [6 x 1..5], "dimensions": {"L": [...], "J": [...], ...}}
+    POST /v1/chat     {"band": "mid", "messages": [{"role": "user", "content": "..."}], "stream": false}
+    POST /v1/summary  {"messages": [...]}
+    POST /v1/route    {"driver": "job_loss", "band": "mid", "seed": null}
+    GET  /health
+    GET  /metrics     LLM call metrics, Prometheus text format
+
+/v1/chat with "stream": true answers with server-sent events: one
+`data: {"delta": "..."}` per chunk, then `data: {"done": true, "llm_error": ...}`.
+Validation errors are 400 {"error": "..."}. Each connection is served on
+its own thread (HTTP/1.1 keep-alive), so slow LLM turns do not block
+scoring or routing requests.
+
+    PYTHONPATH=src python -m api.server --port 8600
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai.analyzer import analyze_chat
+from ai.context import context_from_env
+from ai.llm_client import get_client
+from ai.metrics import get_metrics, metric_labels
+from ai.prompts import SYSTEM_CHAT_STYLE
+from assessment.ai_anxiety import score_dimension
+from assessment.neuroticism import score_neuroticism
+from interventions.loader import get_library
+from routing.personalize import BANDS, route
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+LIB_PATH = os.getenv("INTERVENTION_LIBRARY", str(ROOT / "src" / "interventions" / "library.json"))
+MAX_BODY = 1 << 20
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _items(value: Any, name: str) -> List[int]:
+    if not isinstance(value, list) or not all(isinstance(x, int) and not isinstance(x, bool) for x in value):
+        raise BadRequest(f"'{name}' must be a list of integers.")
+    return value
+
+
+def _messages(body: Dict[str, Any]) -> List[Dict[str, str]]:
+    messages = body.get("messages")
+    if not isinstance(messages, list):
+        raise BadRequest("'messages' must be a list.")
+    out = []
+    for m in messages:
+        if not isinstance(m, dict) or m.get("role") not in ("user", "assistant") or not isinstance(m.get("content"), str):
+            raise BadRequest("Each message needs role 'user' or 'assistant' and a string content.")
+        out.append({"role": m["role"], "content": m["content"]})
+    return out
+
+
+def _band(body: Dict[str, Any]) -> str:
+    band = body.get("band", "mid")
+    if band not in BANDS:
+        raise BadRequest(f"Invalid band: {band}")
+    return band
+
+
+def assess(body: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    if "neuroticism" in body:
+        n = score_neuroticism(_items(body["neuroticism"], "neuroticism"))
+        out["neuroticism"] = {"total": n.total, "band": n.band}
+    dims = body.get("dimensions") or {}
+    if not isinstance(dims, dict):
+        raise BadRequest("'dimensions' must be an object.")
+    out["dimensions"] = {}
+    for code, items in dims.items():
+        d = score_dimension(_items(items, f"dimensions.{code}"))
+        out["dimensions"][code] = {"total": d.total, "intensity": d.intensity_0_10, "count": d.count}
+    return out
+
+
+def chat_messages(body: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": SYSTEM_CHAT_STYLE[_band(body)]}] + _messages(body)
+
+
+def chat(body: Dict[str, Any]) -> Dict[str, Any]:
+    client = get_client()
+    messages = chat_messages(body)
+    with metric_labels(band=_band(body)):
+        reply = client.chat(messages, temperature=0.4, context=context_from_env())
+    return {"reply": reply, "llm_error": client.last_error}
+
+
+def summary(body: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze_chat(_messages(body))
+
+
+def route_actions(body: Dict[str, Any]) -> Dict[str, Any]:
+    seed = body.get("seed")
+    if seed is not None and not isinstance(seed, int):
+        raise BadRequest("'seed' must be an integer.")
+    actions = route(str(body.get("driver", "")), _band(body), get_library(LIB_PATH), seed=seed)
+    return {"actions": [dict(a) for a in actions]}
+
+
+ROUTES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "/v1/assess": assess,
+    "/v1/chat": chat,
+    "/v1/summary": summary,
+    "/v1/route": route_actions,
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_version = "ai-anxiety-api"
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise BadRequest("Invalid Content-Length.")
+        if length > MAX_BODY:
+            raise BadRequest("Request body too large.")
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            body = json.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise BadRequest("Body must be JSON.")
+        if not isinstance(body, dict):
+            raise BadRequest("Body must be a JSON object.")
+        return body
+
+    def do_GET(self):
+        if self.path == "/health":
+            client = get_client()
+            self._send_json(200, {"ok": True, "llm": "real" if client.enabled() else "mock"})
+        elif self.path == "/metrics":
+            body = get_metrics().render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            self._send_json(404, {"error": "Not found."})
+            return
+        try:
+            body = self._read_json()
+            if self.path == "/v1/chat" and body.get("stream"):
+                self._stream_chat(body)
+                return
+            result = handler(body)
+        except ValueError as e:  # BadRequest and the scorers' / route()'s validation errors
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:  # keep the connection usable; report like the app does
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, result)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_chat(self, body: Dict[str, Any]) -> None:
+        messages = chat_messages(body)  # validate before committing to a 200
+        client = get_client()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            with metric_labels(band=_band(body)):
+                for delta in client.chat_stream(messages, temperature=0.4, context=context_from_env()):
+                    event = json.dumps({"delta": delta}, ensure_ascii=False)
+                    self._write_chunk(f"data: {event}\n\n".encode("utf-8"))
+            done = json.dumps({"done": True, "llm_error": client.last_error}, ensure_ascii=False)
+            self._write_chunk(f"data: {done}\n\n".encode("utf-8"))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:  # headers are out: report in-band and end the stream
+            error = json.dumps({"done": True, "error": f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+            self._write_chunk(f"data: {error}\n\n".encode("utf-8"))
+            self._write_chunk(b"")
+
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], verbose: bool = False):
+        self.verbose = verbose
+        super().__init__(address, Handler)
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0) -> Tuple[APIServer, threading.Thread]:
+    """Start a server on a background thread (port 0 picks a free port); for tests and benchmarks."""
+    server = APIServer((host, port))
+    thread = threading.Thread(target=server.serve_forever, name="api-server", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Headless JSON API for the assessment -> chat -> summary -> route flow.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    server = APIServer((args.host, args.port), verbose=args.verbose)
+    print(f"listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Streaming item analysis for exported response sheets.
+
+Reads a CSV of sheets chunk by chunk and keeps only fixed-size running sums
+per scale (item sums and the item cross-product matrix, as exact int64), so
+memory stays constant however many rows there are. From those sums it
+reports, per scale (N and L/J/S/C):
+
+- Cronbach's alpha
+- corrected item-total correlations (item vs. the sum of the other items)
+- item means
+- for N: band counts under the score_neuroticism thresholds;
+  for L/J/S/C: a histogram of 0-10 intensities
+
+Input: CSV with a header naming the items N1..N6, L1..L8, J1..J6, S1..S4,
+C1..C3 (other columns are ignored; order does not matter), optionally
+gzip-compressed. Rows that score_sheets would reject, or that do not parse,
+are counted and skipped.
+
+    PYTHONPATH=src python -m assessment.analytics responses.csv.gz --json
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from assessment.batch import DIMENSION_LAYOUT, N_ITEMS, score_sheets
+
+SCALES: Tuple[Tuple[str, int], ...] = (("N", N_ITEMS),) + DIMENSION_LAYOUT
+COLUMNS: Tuple[str, ...] = tuple(f"{code}{i}" for code, k in SCALES for i in range(1, k + 1))
+
+
+class ScaleStats:
+    """Mergeable running sums for one k-item scale."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.n = 0
+        self.sums = np.zeros(k, dtype=np.int64)
+        self.cross = np.zeros((k, k), dtype=np.int64)
+
+    def update(self, items: np.ndarray) -> None:
+        self.n += items.shape[0]
+        self.sums += items.sum(axis=0)
+        self.cross += items.T @ items
+
+    def merge(self, other: "ScaleStats") -> None:
+        self.n += other.n
+        self.sums += other.sums
+        self.cross += other.cross
+
+    def covariance(self) -> np.ndarray:
+        if self.n < 2:
+            return np.full((self.k, self.k), np.nan)
+        sums = self.sums.astype(np.float64)
+        return (self.cross - np.outer(sums, sums) / self.n) / (self.n - 1)
+
+    def means(self) -> np.ndarray:
+        return self.sums / self.n if self.n else np.full(self.k, np.nan)
+
+    def alpha(self) -> float:
+        if self.k < 2:
+            return math.nan
+        cov = self.covariance()
+        total_var = cov.sum()
+        if not total_var > 0:
+            return math.nan
+        return float(self.k / (self.k - 1) * (1 - np.trace(cov) / total_var))
+
+    def item_total(self) -> np.ndarray:
+        """Correlation of each item with the sum of the remaining items."""
+        cov = self.covariance()
+        item_var = np.diag(cov)
+        with_total = cov.sum(axis=1)
+        rest_var = cov.sum() - 2 * with_total + item_var
+        denom = np.sqrt(item_var * rest_var)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(denom > 0, (with_total - item_var) / denom, np.nan)
+
+
+class SheetAnalytics:
+    """Accumulates ScaleStats, N bands and L/J/S/C intensity histograms over chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.invalid = 0
+        self.scales: Dict[str, ScaleStats] = {code: ScaleStats(k) for code, k in SCALES}
+        self.bands: Dict[str, int] = {"low": 0, "mid": 0, "high": 0}
+        self.intensity: Dict[str, np.ndarray] = {code: np.zeros(11, dtype=np.int64) for code, _ in DIMENSION_LAYOUT}
+
+    def update(self, sheets: np.ndarray) -> None:
+        """sheets: (n x 27) matrix in COLUMNS order."""
+        self.rows += sheets.shape[0]
+        scored = score_sheets(sheets)
+        valid = scored.valid
+        self.invalid += int((~valid).sum())
+        if not valid.any():
+            return
+        sheets = sheets[valid]
+        start = 0
+        for code, k in SCALES:
+            self.scales[code].update(sheets[:, start:start + k])
+            start += k
+        bands, counts = np.unique(scored.neuroticism.band[valid], return_counts=True)
+        for band, count in zip(bands, counts):
+            self.bands[str(band)] += int(count)
+        for code, dim in scored.dimensions.items():
+            self.intensity[code] += np.bincount(dim.intensity_0_10[valid], minlength=11)
+
+    def skip(self, rows: int) -> None:
+        """Count rows that could not be parsed."""
+        self.rows += rows
+        self.invalid += rows
+
+    def report(self) -> Dict[str, Any]:
+        def clean(x: float) -> Optional[float]:
+            return None if math.isnan(x) else round(float(x), 4)
+
+        scales = {}
+        for code, k in SCALES:
+            s = self.scales[code]
+            scales[code] = {
+                "items": k,
+                "alpha": clean(s.alpha()),
+                "item_means": [clean(x) for x in s.means()],
+                "item_total_r": [clean(x) for x in s.item_total()],
+            }
+            if code == "N":
+                scales[code]["bands"] = dict(self.bands)
+            else:
+                scales[code]["intensity_hist"] = self.intensity[code].tolist()
+        return {"rows": self.rows, "valid": self.rows - self.invalid, "invalid": self.invalid, "scales": scales}
+
+
+def _open(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def _parse_chunk(rows: List[List[str]]) -> Tuple[np.ndarray, int]:
+    """Rows -> int matrix, dropping rows with blank or non-integer cells."""
+    try:
+        return np.array(rows, dtype=np.int64), 0
+    except ValueError:
+        pass
+    good = []
+    for row in rows:
+        try:
+            good.append([int(x) for x in row])
+        except ValueError:
+            continue
+    return np.array(good, dtype=np.int64).reshape(len(good), len(COLUMNS)), len(rows) - len(good)
+
+
+def iter_chunks(lines: Iterable[str], chunk_size: int = 50000) -> Iterator[Tuple[np.ndarray, int]]:
+    """Yields (sheets in COLUMNS order, unparseable row count) per chunk."""
+    reader = csv.reader(lines)
+    header = [h.strip() for h in next(reader, [])]
+    missing = [c for c in COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"Missing item columns: {', '.join(missing)}")
+    index = [header.index(c) for c in COLUMNS]
+    width = max(index) + 1
+
+    chunk: List[List[str]] = []
+    short = 0
+    for row in reader:
+        if len(row) < width:
+            short += 1
+            continue
+        chunk.append([row[i] for i in index])
+        if len(chunk) >= chunk_size:
+            sheets, bad = _parse_chunk(chunk)
+            yield sheets, bad + short
+            chunk, short = [], 0
+    if chunk or short:
+        sheets, bad = _parse_chunk(chunk) if chunk else (np.zeros((0, len(COLUMNS)), dtype=np.int64), 0)
+        yield sheets, bad + short
+
+
+def analyze_file(path: str, chunk_size: int = 50000) -> SheetAnalytics:
+    stats = SheetAnalytics()
+    f = _open(path)
+    try:
+        for sheets, bad in iter_chunks(f, chunk_size):
+            stats.skip(bad)
+            if sheets.shape[0]:
+                stats.update(sheets)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return stats
+
+
+def _format(report: Dict[str, Any]) -> str:
+    out = [f"rows: {report['rows']}  valid: {report['valid']}  invalid: {report['invalid']}"]
+    for code, s in report["scales"].items():
+        alpha = "n/a" if s["alpha"] is None else f"{s['alpha']:.3f}"
+        out.append(f"\n[{code}] {s['items']} items, alpha = {alpha}")
+        for i, (mean, r) in enumerate(zip(s["item_means"], s["item_total_r"]), start=1):
+            mean_s = "n/a" if mean is None else f"{mean:.2f}"
+            r_s = "n/a" if r is None else f"{r:.3f}"
+            out.append(f"  {code}{i}: mean {mean_s}  item-total r {r_s}")
+        if "bands" in s:
+            out.append("  bands: " + "  ".join(f"{b} {c}" for b, c in s["bands"].items()))
+        else:
+            out.append("  intensity 0..10: " + " ".join(str(c) for c in s["intensity_hist"]))
+    return "\n".join(out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Streaming item analysis of exported response sheets.")
+    parser.add_argument("path", help="CSV file (.csv or .csv.gz), or - for stdin")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        report = analyze_file(args.path, args.chunk_size).report()
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else _format(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Vectorized scoring for many respondents at once (e.g. rescoring exported sheets).
+
+Each function takes an (n_respondents x items) integer matrix and returns
+array-backed results that match the scalar scorers row for row. Rows that
+the scalar scorer would reject are marked invalid (valid[i] is False,
+errors[i] holds the scalar error message) instead of aborting the batch;
+their total is 0, intensity -1 and band "".
+"""
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from assessment.ai_anxiety import DimensionResult
+from assessment.job_anxiety import JobAnxietyResult
+from assessment.neuroticism import NeuroticismResult
+
+N_ITEMS = 6
+# Column layout of the 21 AI anxiety items on an exported sheet, in order.
+DIMENSION_LAYOUT: Tuple[Tuple[str, int], ...] = (("L", 8), ("J", 6), ("S", 4), ("C", 3))
+SHEET_ITEMS = N_ITEMS + sum(k for _, k in DIMENSION_LAYOUT)
+
+BANDS = np.array(["low", "mid", "high"])
+
+
+@dataclass(frozen=True)
+class DimensionBatch:
+    total: np.ndarray
+    intensity_0_10: np.ndarray
+    count: int
+    valid: np.ndarray
+    errors: Dict[int, str]
+
+    def result(self, i: int) -> DimensionResult:
+        if not self.valid[i]:
+            raise ValueError(self.errors[i])
+        return DimensionResult(total=int(self.total[i]), intensity_0_10=int(self.intensity_0_10[i]), count=self.count)
+
+
+@dataclass(frozen=True)
+class JobAnxietyBatch:
+    total: np.ndarray
+    intensity_0_10: np.ndarray
+    valid: np.ndarray
+    errors: Dict[int, str]
+
+    def result(self, i: int) -> JobAnxietyResult:
+        if not self.valid[i]:
+            raise ValueError(self.errors[i])
+        return JobAnxietyResult(total=int(self.total[i]), intensity_0_10=int(self.intensity_0_10[i]))
+
+
+@dataclass(frozen=True)
+class NeuroticismBatch:
+    total: np.ndarray
+    band: np.ndarray
+    valid: np.ndarray
+    errors: Dict[int, str]
+
+    def result(self, i: int) -> NeuroticismResult:
+        if not self.valid[i]:
+            raise ValueError(self.errors[i])
+        return NeuroticismResult(total=int(self.total[i]), band=str(self.band[i]))
+
+
+@dataclass(frozen=True)
+class SheetBatch:
+    neuroticism: NeuroticismBatch
+    dimensions: Dict[str, DimensionBatch]
+    valid: np.ndarray
+    errors: Dict[int, str]
+
+
+def _as_matrix(items) -> np.ndarray:
+    m = np.asarray(items)
+    if m.ndim != 2:
+        raise ValueError("Items must be a 2-D (respondents x items) matrix.")
+    if m.size and not np.issubdtype(m.dtype, np.integer):
+        raise ValueError("Items must be integers.")
+    return m.astype(np.int64, copy=False)
+
+
+def _range_check(m: np.ndarray, message: str) -> Tuple[np.ndarray, Dict[int, str]]:
+    valid = ((m >= 1) & (m <= 5)).all(axis=1)
+    return valid, {int(i): message for i in np.flatnonzero(~valid)}
+
+
+def _intensity(total: np.ndarray, n: int, valid: np.ndarray) -> np.ndarray:
+    # Same float64 arithmetic as the scalar scorers; np.rint rounds half to
+    # even like round(), so results match exactly.
+    intensity = np.clip(np.rint((total - n) / (4 * n) * 10), 0, 10).astype(np.int8)
+    intensity[~valid] = -1
+    return intensity
+
+
+def score_dimension_batch(items) -> DimensionBatch:
+    """items: (n x k) Likert responses, each 1..5; see score_dimension."""
+    m = _as_matrix(items)
+    n = m.shape[1]
+    if n == 0:
+        raise ValueError("Dimension items must not be empty.")
+    valid, errors = _range_check(m, "Each dimension item must be between 1 and 5.")
+    total = np.where(valid, m.sum(axis=1), 0)
+    return DimensionBatch(total=total, intensity_0_10=_intensity(total, n, valid), count=n, valid=valid, errors=errors)
+
+
+def score_job_anxiety_batch(items) -> JobAnxietyBatch:
+    """items: (n x 4) Likert responses, each 1..5; see score_job_anxiety."""
+    m = _as_matrix(items)
+    if m.shape[1] != 4:
+        raise ValueError("Job anxiety requires exactly 4 items.")
+    valid, errors = _range_check(m, "Each job anxiety item must be between 1 and 5.")
+    total = np.where(valid, m.sum(axis=1), 0)
+    return JobAnxietyBatch(total=total, intensity_0_10=_intensity(total, 4, valid), valid=valid, errors=errors)
+
+
+def score_neuroticism_batch(items) -> NeuroticismBatch:
+    """items: (n x 6) Likert responses, each 1..5; see score_neuroticism."""
+    m = _as_matrix(items)
+    if m.shape[1] != N_ITEMS:
+        raise ValueError("Neuroticism requires exactly 6 items.")
+    valid, errors = _range_check(m, "Each neuroticism item must be between 1 and 5.")
+    total = np.where(valid, m.sum(axis=1), 0)
+    # <=14 low, <=22 mid, else high
+    band = BANDS[np.searchsorted(np.array([14, 22]), total, side="left")]
+    band[~valid] = ""
+    return NeuroticismBatch(total=total, band=band, valid=valid, errors=errors)
+
+
+def score_sheets(items, layout: Sequence[Tuple[str, int]] = DIMENSION_LAYOUT) -> SheetBatch:
+    """
+    items: (n x 27) full sheets: 6 neuroticism items, then the L/J/S/C items
+    in `layout` order. A sheet is valid only if every part is; errors[i] is
+    the first failing part's message.
+    """
+    m = _as_matrix(items)
+    expected = N_ITEMS + sum(k for _, k in layout)
+    if m.shape[1] != expected:
+        raise ValueError(f"A sheet requires exactly {expected} items.")
+
+    neuro = score_neuroticism_batch(m[:, :N_ITEMS])
+    dims: Dict[str, DimensionBatch] = {}
+    start = N_ITEMS
+    for code, k in layout:
+        dims[code] = score_dimension_batch(m[:, start:start + k])
+        start += k
+
+    valid = neuro.valid.copy()
+    errors = dict(neuro.errors)
+    for d in dims.values():
+        valid &= d.valid
+        for i, msg in d.errors.items():
+            errors.setdefault(i, msg)
+    return SheetBatch(neuroticism=neuro, dimensions=dims, valid=valid, errors=errors)
@@ -1,6 +1,11 @@
 import json
+import os
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
 def load_interventions(json_path: str) -> Dict[str, Any]:
     p = Path(json_path)
@@ -11,6 +16,115 @@ def load_interventions(json_path: str) -> Dict[str, Any]:
         raise ValueError("Invalid library.json: missing 'interventions'")
     return data
 
-def filter_interventions(data: Dict[str, Any], driver: str, band: str) -> List[Dict[str, Any]]:
+
+class InterventionLibrary:
+    """
+    Read-only, indexed view of a loaded library.json.
+
+    Indexes: (driver, neuroticism_band) -> cards, tag -> cards, id -> card.
+    Cards keep their library.json order inside every index. Treat the card
+    dicts as read-only: one instance is shared by every session.
+    """
+
+    def __init__(self, data: Dict[str, Any], source: Optional[str] = None, stamp: Optional[Tuple[int, int]] = None):
+        self.version = data.get("version")
+        self.source = source
+        self.stamp = stamp
+        self.interventions: Tuple[Dict[str, Any], ...] = tuple(data.get("interventions", []))
+
+        by_key: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        by_tag: Dict[str, List[Dict[str, Any]]] = {}
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for card in self.interventions:
+            by_key.setdefault((card.get("driver"), card.get("neuroticism_band")), []).append(card)
+            for tag in card.get("tags") or []:
+                by_tag.setdefault(tag, []).append(card)
+            if card.get("id"):
+                by_id.setdefault(card["id"], card)
+        self.by_key: Mapping[Tuple[str, str], Tuple[Dict[str, Any], ...]] = MappingProxyType({k: tuple(v) for k, v in by_key.items()})
+        self.by_tag: Mapping[str, Tuple[Dict[str, Any], ...]] = MappingProxyType({k: tuple(v) for k, v in by_tag.items()})
+        self.by_id: Mapping[str, Dict[str, Any]] = MappingProxyType(by_id)
+
+    def filter(self, driver: str, band: str) -> List[Dict[str, Any]]:
+        return list(self.by_key.get((driver, band), ()))
+
+    def with_tag(self, tag: str) -> List[Dict[str, Any]]:
+        return list(self.by_tag.get(tag, ()))
+
+
+# InterventionLibrary, interventions.store.SQLiteLibrary or a raw library.json dict
+LibraryData = Union[InterventionLibrary, Any, Dict[str, Any]]
+
+STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def filter_interventions(data: LibraryData, driver: str, band: str) -> List[Dict[str, Any]]:
+    if not isinstance(data, dict):
+        return data.filter(driver, band)
     all_items = data.get("interventions", [])
     return [x for x in all_items if x.get("driver") == driver and x.get("neuroticism_band") == band]
+
+
+def _open_library(path: str, stamp: Tuple[int, int]) -> LibraryData:
+    if path.endswith(STORE_SUFFIXES):
+        from interventions.store import SQLiteLibrary
+
+        return SQLiteLibrary(path, stamp=stamp)
+    return InterventionLibrary(load_interventions(path), source=path, stamp=stamp)
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class _LibraryCache:
+    """One library per path for the whole process, swapped atomically on change."""
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._libs: Dict[str, LibraryData] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, json_path: str) -> LibraryData:
+        path = os.path.abspath(json_path)
+        lib = self._libs.get(path)
+        now = time.monotonic()
+        if lib is not None and now - self._checked.get(path, 0.0) < self.check_interval:
+            return lib
+
+        with self._lock:
+            lib = self._libs.get(path)
+            self._checked[path] = now
+            try:
+                stamp = _stamp(path)
+            except OSError:
+                if lib is not None:
+                    # file briefly missing (e.g. being replaced): keep serving the last good copy
+                    return lib
+                raise FileNotFoundError(f"Intervention library not found: {json_path}")
+            if lib is not None and lib.stamp == stamp:
+                return lib
+            try:
+                new_lib = _open_library(path, stamp)
+            except (ValueError, OSError, sqlite3.Error):
+                if lib is not None:
+                    # half-written or invalid edit: keep the last good copy
+                    return lib
+                raise
+            self._libs[path] = new_lib
+            return new_lib
+
+
+_CACHE = _LibraryCache(check_interval=float(os.getenv("LIBRARY_CHECK_INTERVAL", "1.0")))
+
+
+def get_library(json_path: str) -> LibraryData:
+    """
+    Process-wide shared library for json_path: a library.json, or a SQLite
+    store built by interventions.store (.db/.sqlite). The file's mtime/size is
+    checked at most every LIBRARY_CHECK_INTERVAL seconds; on change it is
+    reparsed and swapped in, so edits apply without a restart.
+    """
+    return _CACHE.get(json_path)
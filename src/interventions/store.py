@@ -0,0 +1,209 @@
+"""
+SQLite-backed intervention library for large card sets.
+
+Only the small "head" of each card (id, driver, band, title, time, tags and
+any variant fields such as role/dimension) is read for routing; the body
+(goal, steps, success_criteria, fallback_if_stuck) is read from the database
+the first time a card field from it is accessed.
+
+Convert an existing library.json:
+
+    python src/interventions/store.py src/interventions/library.json src/interventions/library.db
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+BODY_FIELDS = ("goal", "steps", "success_criteria", "fallback_if_stuck")
+SCHEMA_VERSION = "1"
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE cards (
+    seq INTEGER PRIMARY KEY,  -- position in library.json
+    id TEXT,
+    driver TEXT,
+    band TEXT,
+    head TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX cards_key ON cards (driver, band, seq);
+CREATE TABLE card_tags (tag TEXT NOT NULL, seq INTEGER NOT NULL, PRIMARY KEY (tag, seq)) WITHOUT ROWID;
+"""
+
+
+class LazyCard(Mapping):
+    """Read-only card dict whose body fields are fetched on first access."""
+
+    __slots__ = ("_head", "_store", "_seq", "_body")
+
+    def __init__(self, head: Dict[str, Any], store: "SQLiteLibrary", seq: int):
+        self._head = head
+        self._store = store
+        self._seq = seq
+        self._body: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._body is None:
+            self._body = self._store._read_body(self._seq)
+        return self._body
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._head:
+            return self._head[key]
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._head
+        yield from self._load()
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self._load())
+
+    def __repr__(self) -> str:
+        return f"LazyCard({self._head.get('id')!r})"
+
+
+class SQLiteLibrary:
+    """
+    Same lookups as InterventionLibrary (filter, with_tag, interventions),
+    served from an indexed SQLite file. Candidate lists are memoized per
+    (driver, band) and tag, so repeated routing never touches the database.
+    """
+
+    def __init__(self, db_path: str, stamp: Optional[Tuple[int, int]] = None):
+        self.source = db_path
+        self.stamp = stamp
+        # one read-only connection shared by all sessions; queries are short
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._by_key: Dict[Tuple[str, str], Tuple[LazyCard, ...]] = {}
+        self._by_tag: Dict[str, Tuple[LazyCard, ...]] = {}
+        self._cards: Dict[int, LazyCard] = {}
+        self._all: Optional[Tuple[LazyCard, ...]] = None
+        meta = dict(self._query("SELECT key, value FROM meta"))
+        if meta.get("schema") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported intervention store schema: {meta.get('schema')}")
+        self.version = meta.get("version")
+
+    def _query(self, sql: str, args: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def _card(self, seq: int, head: str) -> LazyCard:
+        card = self._cards.get(seq)
+        if card is None:
+            card = self._cards.setdefault(seq, LazyCard(json.loads(head), self, seq))
+        return card
+
+    def _read_body(self, seq: int) -> Dict[str, Any]:
+        rows = self._query("SELECT body FROM cards WHERE seq = ?", (seq,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def filter(self, driver: str, band: str) -> List[Dict[str, Any]]:
+        key = (driver, band)
+        cards = self._by_key.get(key)
+        if cards is None:
+            rows = self._query("SELECT seq, head FROM cards WHERE driver = ? AND band = ? ORDER BY seq", key)
+            cards = self._by_key[key] = tuple(self._card(seq, head) for seq, head in rows)
+        return list(cards)
+
+    def with_tag(self, tag: str) -> List[Dict[str, Any]]:
+        cards = self._by_tag.get(tag)
+        if cards is None:
+            rows = self._query(
+                "SELECT c.seq, c.head FROM card_tags t JOIN cards c ON c.seq = t.seq WHERE t.tag = ? ORDER BY c.seq",
+                (tag,),
+            )
+            cards = self._by_tag[tag] = tuple(self._card(seq, head) for seq, head in rows)
+        return list(cards)
+
+    @property
+    def interventions(self) -> Tuple[LazyCard, ...]:
+        if self._all is None:
+            rows = self._query("SELECT seq, head FROM cards ORDER BY seq")
+            self._all = tuple(self._card(seq, head) for seq, head in rows)
+        return self._all
+
+    @property
+    def by_id(self) -> "_IdLookup":
+        return _IdLookup(self)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _IdLookup:
+    def __init__(self, library: SQLiteLibrary):
+        self._library = library
+
+    def get(self, card_id: str, default: Any = None) -> Any:
+        rows = self._library._query("SELECT seq, head FROM cards WHERE id = ?", (card_id,))
+        return self._library._card(*rows[0]) if rows else default
+
+    def __getitem__(self, card_id: str) -> LazyCard:
+        card = self.get(card_id)
+        if card is None:
+            raise KeyError(card_id)
+        return card
+
+
+def build_store(data: Dict[str, Any], db_path: str) -> int:
+    """
+    Write a library.json-shaped dict to db_path. The file is built next to
+    the target and renamed into place, so a running app hot-reloads it
+    without ever seeing a partial database. Returns the number of cards.
+    """
+    if "interventions" not in data:
+        raise ValueError("Invalid library.json: missing 'interventions'")
+    tmp_path = f"{db_path}.tmp{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [("schema", SCHEMA_VERSION), ("version", str(data.get("version") or ""))],
+        )
+        cards = []
+        tags = []
+        for seq, item in enumerate(data["interventions"]):
+            head = {k: v for k, v in item.items() if k not in BODY_FIELDS}
+            body = {k: v for k, v in item.items() if k in BODY_FIELDS}
+            cards.append((
+                seq,
+                item.get("id"),
+                item.get("driver"),
+                item.get("neuroticism_band"),
+                json.dumps(head, ensure_ascii=False),
+                json.dumps(body, ensure_ascii=False),
+            ))
+            tags.extend((tag, seq) for tag in set(item.get("tags") or []))
+        conn.executemany("INSERT INTO cards (seq, id, driver, band, head, body) VALUES (?, ?, ?, ?, ?, ?)", cards)
+        conn.executemany("INSERT INTO card_tags (tag, seq) VALUES (?, ?)", tags)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return len(cards)
+
+
+def convert_json(json_path: str, db_path: str) -> int:
+    from interventions.loader import load_interventions
+
+    return build_store(load_interventions(json_path), db_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python src/interventions/store.py LIBRARY_JSON OUTPUT_DB", file=sys.stderr)
+        sys.exit(2)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    n = convert_json(sys.argv[1], sys.argv[2])
+    print(f"wrote {n} cards to {sys.argv[2]}")
@@ -0,0 +1,199 @@
+"""
+Effectiveness rollups per (action_id, driver, band), kept next to the raw outcomes.
+
+Each row holds count, mean delta (post - pre), M2 for the variance (Welford)
+and the number of successes (delta <= -1, the MVP success criterion). The
+outcome writer applies every batch to the rollups in the same transaction as
+the inserts, so both always agree; reading one card's stats is a primary-key
+lookup.
+
+Offline rebuild from the raw rows (e.g. after a manual fix-up of outcomes):
+
+    PYTHONPATH=src python -m outcomes.rollups rebuild data/outcomes.db
+    PYTHONPATH=src python -m outcomes.rollups show data/outcomes.db --driver job_loss
+"""
+import argparse
+import math
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    action_id TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    band TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    successes INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (driver, band, action_id)
+) WITHOUT ROWID;
+"""
+
+SUCCESS_DELTA = -1
+
+Key = Tuple[str, str, str]  # (action_id, driver, band)
+
+
+@dataclass
+class Rollup:
+    action_id: str
+    driver: str
+    band: str
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    successes: int = 0
+
+    def add(self, delta: float) -> None:
+        # Welford's online update
+        self.n += 1
+        d = delta - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (delta - self.mean)
+        if delta <= SUCCESS_DELTA:
+            self.successes += 1
+
+    def merge(self, other: "Rollup") -> None:
+        # Chan et al. pairwise combination of two Welford states
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.successes = other.n, other.mean, other.m2, other.successes
+            return
+        n = self.n + other.n
+        d = other.mean - self.mean
+        self.mean += d * other.n / n
+        self.m2 += other.m2 + d * d * self.n * other.n / n
+        self.n = n
+        self.successes += other.successes
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of delta (nan below 2 results)."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.n if self.n else math.nan
+
+
+def _group(outcomes: Iterable[Tuple[str, str, str, int]]) -> Dict[Key, Rollup]:
+    groups: Dict[Key, Rollup] = {}
+    for action_id, driver, band, delta in outcomes:
+        key = (action_id, driver, band)
+        r = groups.get(key)
+        if r is None:
+            r = groups[key] = Rollup(action_id, driver, band)
+        r.add(delta)
+    return groups
+
+
+def _upsert(conn: sqlite3.Connection, rollups: Iterable[Rollup], now: float) -> None:
+    conn.executemany(
+        """
+        INSERT INTO rollups (action_id, driver, band, n, mean, m2, successes, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (driver, band, action_id) DO UPDATE SET
+            n = excluded.n, mean = excluded.mean, m2 = excluded.m2,
+            successes = excluded.successes, updated_at = excluded.updated_at
+        """,
+        [(r.action_id, r.driver, r.band, r.n, r.mean, r.m2, r.successes, now) for r in rollups],
+    )
+
+
+def apply_outcomes(conn: sqlite3.Connection, outcomes: Sequence[Tuple[str, str, str, int]]) -> None:
+    """
+    Fold (action_id, driver, band, delta) rows into the rollups. Runs inside
+    the caller's transaction: one read and one upsert per distinct key.
+    """
+    batch = _group(outcomes)
+    for key, r in batch.items():
+        current = get_rollup(conn, *key)
+        if current is not None:
+            current.merge(r)
+            batch[key] = current
+    _upsert(conn, batch.values(), time.time())
+
+
+def get_rollup(conn: sqlite3.Connection, action_id: str, driver: str, band: str) -> Optional[Rollup]:
+    row = conn.execute(
+        "SELECT n, mean, m2, successes FROM rollups WHERE driver = ? AND band = ? AND action_id = ?",
+        (driver, band, action_id),
+    ).fetchone()
+    if row is None:
+        return None
+    return Rollup(action_id, driver, band, *row)
+
+
+def list_rollups(conn: sqlite3.Connection, driver: Optional[str] = None, band: Optional[str] = None) -> List[Rollup]:
+    sql = "SELECT action_id, driver, band, n, mean, m2, successes FROM rollups"
+    where, args = [], []
+    if driver is not None:
+        where.append("driver = ?")
+        args.append(driver)
+    if band is not None:
+        where.append("band = ?")
+        args.append(band)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return [Rollup(*row) for row in conn.execute(sql + " ORDER BY driver, band, action_id", args)]
+
+
+def rebuild_rollups(conn: sqlite3.Connection, chunk_size: int = 10000) -> int:
+    """Recompute all rollups from the outcomes table in one transaction. Returns the number of keys."""
+    groups: Dict[Key, Rollup] = {}
+    with conn:
+        conn.execute("DELETE FROM rollups")
+        cur = conn.execute("SELECT action_id, driver, band, post - pre FROM outcomes ORDER BY id")
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for key, r in _group(rows).items():
+                if key in groups:
+                    groups[key].merge(r)
+                else:
+                    groups[key] = r
+        _upsert(conn, groups.values(), time.time())
+    return len(groups)
+
+
+def _fmt(x: float, spec: str) -> str:
+    return "n/a" if math.isnan(x) else format(x, spec)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Outcome rollups per intervention card.")
+    parser.add_argument("command", choices=("rebuild", "show"))
+    parser.add_argument("db", help="outcomes database (OUTCOMES_DB)")
+    parser.add_argument("--driver")
+    parser.add_argument("--band")
+    args = parser.parse_args(argv)
+
+    from outcomes.store import connect
+
+    conn = connect(args.db)
+    try:
+        if args.command == "rebuild":
+            t = time.perf_counter()
+            n = rebuild_rollups(conn)
+            print(f"rebuilt {n} rollups in {time.perf_counter() - t:.2f}s")
+            return 0
+        for r in list_rollups(conn, args.driver, args.band):
+            sd = math.sqrt(r.variance) if r.n > 1 else math.nan
+            print(
+                f"{r.driver:<14}{r.band:<5}{r.action_id:<24} n={r.n:<6} "
+                f"mean_delta={r.mean:+.2f} sd={_fmt(sd, '.2f')} success={_fmt(r.success_rate, '.0%')}"
+            )
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
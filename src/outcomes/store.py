@@ -0,0 +1,236 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, field, fields
+from typing import List, Optional, Union
+
+from outcomes.rollups import ROLLUP_SCHEMA, Rollup, apply_outcomes, get_rollup, list_rollups, rebuild_rollups
+
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    session_id TEXT NOT NULL,
+    action_id TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    band TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    pre INTEGER NOT NULL,
+    post INTEGER NOT NULL,
+    completed INTEGER NOT NULL,
+    role TEXT NOT NULL DEFAULT '',
+    request_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS outcomes_action ON outcomes (action_id, created_at);
+CREATE INDEX IF NOT EXISTS outcomes_route ON outcomes (driver, band, action_id);
+"""
+
+# One row per submission: a resubmitted (session, card, request) is ignored.
+# Rows from before version 3 have no request_id and are left as they are.
+_REQUEST_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS outcomes_request ON outcomes (session_id, action_id, request_id)
+WHERE request_id != '';
+"""
+
+
+@dataclass(frozen=True)
+class Outcome:
+    """One submitted pre/post result from Screen D."""
+
+    session_id: str
+    action_id: str
+    driver: str
+    band: str
+    dimension: str
+    pre: int
+    post: int
+    completed: bool
+    role: str = ""
+    request_id: str = ""  # identifies one submission; repeats of it are not recorded again
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def delta(self) -> int:
+        return self.post - self.pre
+
+
+_COLUMNS = tuple(f.name for f in fields(Outcome))
+_INSERT = f"INSERT OR IGNORE INTO outcomes ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: no fsync per commit; a power loss can drop the last few
+    # commits but never corrupts the file.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA + ROLLUP_SCHEMA)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 3:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(outcomes)")}
+        if "request_id" not in columns:
+            conn.execute("ALTER TABLE outcomes ADD COLUMN request_id TEXT NOT NULL DEFAULT ''")
+    conn.executescript(_REQUEST_INDEX)
+    if version < 2:
+        # rollups were added in version 2: backfill them from existing rows
+        rebuild_rollups(conn)
+    if version != SCHEMA_VERSION:
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class OutcomeStore:
+    """
+    Write-behind outcome log in SQLite (WAL). record() only enqueues, so the
+    Streamlit script thread never waits on disk; a writer thread drains the
+    queue and inserts up to `batch_size` rows per transaction. close() (also
+    run at interpreter exit) writes everything still queued.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 64, max_queue: int = 10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.last_error: Optional[str] = None
+        parent = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(parent, exist_ok=True)
+        connect(db_path).close()  # fail fast on a bad path; create schema
+        self._queue: "queue.Queue[Union[Outcome, _Flush, object]]" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="outcome-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, outcome: Outcome) -> bool:
+        """Queue one outcome; False if the store is closed or the queue is full."""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(outcome)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued before this call is committed."""
+        if self._closed or not self._thread.is_alive():
+            return False
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def by_action(self, action_id: str, limit: int = 100) -> List[Outcome]:
+        """Most recent committed outcomes for one action card."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM outcomes WHERE action_id = ? ORDER BY created_at DESC LIMIT ?",
+                (action_id, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [_from_row(row) for row in rows]
+
+    def rollup(self, action_id: str, driver: str, band: str) -> Optional[Rollup]:
+        """Committed effectiveness stats of one card for (driver, band)."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            return get_rollup(conn, action_id, driver, band)
+        finally:
+            conn.close()
+
+    def rollups(self, driver: Optional[str] = None, band: Optional[str] = None) -> List[Rollup]:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            return list_rollups(conn, driver, band)
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Outcome]) -> None:
+        if not batch:
+            return
+        try:
+            with conn:
+                # only rows that were actually inserted (not repeats) reach the rollups
+                inserted = [o for o in batch if conn.execute(_INSERT, astuple(o)).rowcount]
+                apply_outcomes(conn, [(o.action_id, o.driver, o.band, o.delta) for o in inserted])
+            self.written += len(inserted)
+            self.duplicates += len(batch) - len(inserted)
+        except sqlite3.Error as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.dropped += len(batch)
+
+    def _run(self) -> None:
+        conn = connect(self.db_path)
+        try:
+            while True:
+                item = self._queue.get()
+                batch: List[Outcome] = []
+                markers: List[_Flush] = []
+                stop = False
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, _Flush):
+                        markers.append(item)
+                    else:
+                        batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        self._write(conn, batch)
+                        batch = []
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._write(conn, batch)
+                for m in markers:
+                    m.done.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+
+def _from_row(row) -> Outcome:
+    values = dict(zip(_COLUMNS, row))
+    values["completed"] = bool(values["completed"])
+    return Outcome(**values)
+
+
+_STORE: Optional[OutcomeStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_outcome_store() -> OutcomeStore:
+    """Process-wide store at OUTCOMES_DB (default data/outcomes.db), flushed at exit."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = OutcomeStore(os.getenv("OUTCOMES_DB", "data/outcomes.db"))
+                atexit.register(_STORE.close)
+    return _STORE
@@ -0,0 +1,273 @@
+"""
+Opt-in profiling of Streamlit script reruns.
+
+The app calls begin_rerun() at the top of the script, lap("screen B") where
+a new top-level phase starts, wraps expensive calls in `with section(...)`,
+and calls end_rerun() before every st.rerun()/st.stop() and at the bottom.
+Time is attributed as self time to stacks like "rerun;screen C;chat call"
+and aggregated across reruns into folded-stack files that flamegraph.pl,
+speedscope or inferno read directly.
+
+Enabled for every session with PROFILE_RERUNS=1, or per session when the
+caller passes requested=True (the app does this for the admin user with
+?profile=1 in the URL). PROFILE_MODE adds detail on top of the timers:
+- "cprofile": cProfile per rerun, merged into rerun.pstats
+- "sample": a sampler thread records the Python stack of each profiled
+  rerun every PROFILE_SAMPLE_INTERVAL ms into samples.folded
+Files go to PROFILE_DIR (default data/profile) at most every
+PROFILE_FLUSH_INTERVAL seconds and at exit.
+
+When profiling is off, begin_rerun() is one env lookup and lap()/section()/
+end_rerun() are one thread-local lookup each.
+"""
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+_NULL = contextlib.nullcontext()
+_local = threading.local()
+
+
+class _Run:
+    __slots__ = ("started", "lap", "lap_started", "lap_child", "stack", "folded", "profile")
+
+    def __init__(self, profile: Optional[cProfile.Profile]):
+        now = time.perf_counter()
+        self.started = now
+        self.lap = "setup"
+        self.lap_started = now
+        self.lap_child = 0.0
+        self.stack: List[list] = []  # [name, started, child seconds]
+        self.folded: Dict[str, float] = {}
+        self.profile = profile
+
+    def path(self) -> str:
+        return ";".join(["rerun", self.lap] + [frame[0] for frame in self.stack])
+
+    def add(self, path: str, seconds: float) -> None:
+        self.folded[path] = self.folded.get(path, 0.0) + seconds
+
+    def close_lap(self, now: float) -> None:
+        self.add(f"rerun;{self.lap}", now - self.lap_started - self.lap_child)
+
+
+class _Section:
+    __slots__ = ("run", "name")
+
+    def __init__(self, run: _Run, name: str):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.run.stack.append([self.name, time.perf_counter(), 0.0])
+        return self
+
+    def __exit__(self, *exc):
+        run = self.run
+        path = run.path()
+        name, started, child = run.stack.pop()
+        elapsed = time.perf_counter() - started
+        run.add(path, elapsed - child)
+        if run.stack:
+            run.stack[-1][2] += elapsed
+        else:
+            run.lap_child += elapsed
+        return False
+
+
+class RerunProfiler:
+    def __init__(self, out_dir: str, mode: str = "", sample_interval: float = 0.005, flush_interval: float = 10.0):
+        self.out_dir = out_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._folded: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._stats: Optional[pstats.Stats] = None
+        self._active: Dict[int, _Run] = {}
+        self.reruns = 0
+        self.incomplete = 0
+        self._last_flush = 0.0
+        self._sampler: Optional[threading.Thread] = None
+        if mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="rerun-sampler", daemon=True)
+            self._sampler.start()
+
+    # ---- rerun lifecycle (called on the script thread) ----
+
+    def begin(self) -> None:
+        previous = getattr(_local, "run", None)
+        if previous is not None:
+            # the last run on this thread ended without end_rerun() (an exception)
+            self._discard(previous)
+        profile = None
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # another profiler owns the interpreter (Python 3.12+)
+                profile = None
+        run = _Run(profile)
+        _local.run = run
+        with self._lock:
+            self._active[threading.get_ident()] = run
+
+    def end(self, run: _Run) -> None:
+        now = time.perf_counter()
+        if run.profile is not None:
+            run.profile.disable()
+        while run.stack:  # sections left open by an exception
+            _Section(run, run.stack[-1][0]).__exit__(None, None, None)
+        run.close_lap(now)
+        _local.run = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            for path, seconds in run.folded.items():
+                self._folded[path] = self._folded.get(path, 0.0) + seconds
+            if run.profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(run.profile)
+                else:
+                    self._stats.add(run.profile)
+            self.reruns += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _discard(self, run: _Run) -> None:
+        if run.profile is not None:
+            run.profile.disable()
+        _local.run = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            self.incomplete += 1
+
+    # ---- sampling ----
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.sample_interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = []
+            for tid, run in active:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    if code.co_name == "<module>":
+                        break  # the script itself; everything below is Streamlit's runner
+                    frame = frame.f_back
+                stacks.append(run.path() + ";" + ";".join(reversed(names)))
+            with self._lock:
+                for stack in stacks:
+                    self._samples[stack] = self._samples.get(stack, 0) + 1
+
+    # ---- output ----
+
+    def flush(self) -> bool:
+        with self._lock:
+            folded = dict(self._folded)
+            samples = dict(self._samples)
+            summary = {"reruns": self.reruns, "incomplete": self.incomplete, "mode": self.mode or "timers"}
+            self._last_flush = time.monotonic()
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            # microseconds of self time per stack
+            self._write("rerun.folded", "".join(
+                f"{path} {int(seconds * 1e6)}\n" for path, seconds in sorted(folded.items()) if seconds > 0
+            ))
+            if samples:
+                self._write("samples.folded", "".join(f"{path} {n}\n" for path, n in sorted(samples.items())))
+            with self._lock:
+                if self._stats is not None:
+                    tmp = os.path.join(self.out_dir, "rerun.pstats.tmp")
+                    self._stats.dump_stats(tmp)
+                    os.replace(tmp, os.path.join(self.out_dir, "rerun.pstats"))
+            self._write("summary.json", json.dumps(summary) + "\n")
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        return True
+
+    def _write(self, name: str, text: str) -> None:
+        path = os.path.join(self.out_dir, name)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+_PROFILER: Optional[RerunProfiler] = None
+_PROFILER_LOCK = threading.Lock()
+
+
+def get_profiler() -> RerunProfiler:
+    """Process-wide profiler configured from PROFILE_* env vars; flushes at exit."""
+    global _PROFILER
+    if _PROFILER is None:
+        with _PROFILER_LOCK:
+            if _PROFILER is None:
+                profiler = RerunProfiler(
+                    os.getenv("PROFILE_DIR", "data/profile"),
+                    mode=os.getenv("PROFILE_MODE", "").strip().lower(),
+                    sample_interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL", "5")) / 1000,
+                    flush_interval=float(os.getenv("PROFILE_FLUSH_INTERVAL", "10")),
+                )
+                atexit.register(profiler.flush)
+                _PROFILER = profiler
+    return _PROFILER
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("PROFILE_RERUNS", "").strip().lower() in ("1", "true", "yes")
+
+
+def begin_rerun(requested: bool = False) -> bool:
+    """Start timing this script run if profiling is on (globally or for this session)."""
+    if not (requested or profiling_enabled()):
+        if getattr(_local, "run", None) is not None:
+            get_profiler()._discard(_local.run)
+        return False
+    get_profiler().begin()
+    return True
+
+
+def end_rerun() -> None:
+    run = getattr(_local, "run", None)
+    if run is not None:
+        get_profiler().end(run)
+
+
+def lap(name: str) -> None:
+    """Attribute time from here until the next lap() or end_rerun() to `name`."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    now = time.perf_counter()
+    run.close_lap(now)
+    run.lap = name
+    run.lap_started = now
+    run.lap_child = 0.0
+
+
+def section(name: str):
+    """Context manager timing a nested block under the current lap."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    return _Section(run, name)
@@ -0,0 +1,215 @@
+"""
+Thompson-sampling selection policy for route().
+
+Each (driver, band, card id) is a Bernoulli arm: success means the recorded
+post intensity dropped by at least 1 (delta <= -1). Posteriors are
+Beta(1 + successes, 1 + failures), kept as two float arrays per
+(driver, band). A selection draws one sample per candidate card and hands
+the samples to the MMR ranker as relevance, so the picks stay diverse.
+Nothing on the selection path does I/O: posteriors are written to a JSON
+checkpoint by a background thread, and loaded (or seeded from the outcome
+rollups) once at startup.
+
+Off by default; set ROUTE_POLICY=thompson to enable it in the app.
+"""
+import atexit
+import json
+import os
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from routing.ranking import CandidateSet, mmr_select
+
+SUCCESS_DELTA = -1
+
+Key = Tuple[str, str]  # (driver, band)
+
+
+class _Arms:
+    __slots__ = ("ids", "succ", "fail")
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.succ = np.zeros(8, dtype=np.float64)
+        self.fail = np.zeros(8, dtype=np.float64)
+
+    def index(self, card_id: str) -> int:
+        i = self.ids.get(card_id)
+        if i is None:
+            i = self.ids[card_id] = len(self.ids)
+            if i >= len(self.succ):
+                self.succ = np.concatenate([self.succ, np.zeros_like(self.succ)])
+                self.fail = np.concatenate([self.fail, np.zeros_like(self.fail)])
+        return i
+
+
+class ThompsonPolicy:
+    def __init__(self, seed: Optional[int] = None):
+        self._arms: Dict[Key, _Arms] = {}
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        # candidate set -> arm indices per (driver, band). Weak keys: the sets are
+        # owned by routing.personalize's per-library cache, so a reloaded library's
+        # sets (and their entries here) go away with it.
+        self._index_cache: "weakref.WeakKeyDictionary[CandidateSet, Dict[Key, np.ndarray]]" = weakref.WeakKeyDictionary()
+        self.version = 0  # bumps on every update; the checkpointer compares it
+
+    def _arms_for(self, driver: str, band: str) -> _Arms:
+        arms = self._arms.get((driver, band))
+        if arms is None:
+            arms = self._arms[(driver, band)] = _Arms()
+        return arms
+
+    def _indices(self, candidates: CandidateSet, driver: str, band: str) -> np.ndarray:
+        per_set = self._index_cache.get(candidates)
+        if per_set is None:
+            per_set = self._index_cache[candidates] = {}
+        idx = per_set.get((driver, band))
+        if idx is None:
+            arms = self._arms_for(driver, band)
+            idx = per_set[(driver, band)] = np.array([arms.index(card_id) for card_id in candidates.ids], dtype=np.intp)
+        return idx
+
+    def sample(self, candidates: CandidateSet, driver: str, band: str, seed: Optional[int] = None) -> np.ndarray:
+        """One posterior draw of the success probability per candidate."""
+        with self._lock:
+            idx = self._indices(candidates, driver, band)
+            arms = self._arms[(driver, band)]
+            a = 1.0 + arms.succ[idx]
+            b = 1.0 + arms.fail[idx]
+            rng = self._rng if seed is None else np.random.default_rng(seed)
+            return rng.beta(a, b)
+
+    def observe(self, driver: str, band: str, card_id: str, delta: int) -> None:
+        with self._lock:
+            arms = self._arms_for(driver, band)
+            i = arms.index(card_id)
+            if delta <= SUCCESS_DELTA:
+                arms.succ[i] += 1
+            else:
+                arms.fail[i] += 1
+            self.version += 1
+
+    def seed_counts(self, driver: str, band: str, card_id: str, successes: int, failures: int) -> None:
+        with self._lock:
+            arms = self._arms_for(driver, band)
+            i = arms.index(card_id)
+            arms.succ[i] = successes
+            arms.fail[i] = failures
+            self.version += 1
+
+    def to_dict(self) -> Dict[str, object]:
+        with self._lock:
+            arms = {}
+            for (driver, band), a in self._arms.items():
+                n = len(a.ids)
+                arms[f"{driver}|{band}"] = {
+                    "ids": list(a.ids),
+                    "succ": a.succ[:n].tolist(),
+                    "fail": a.fail[:n].tolist(),
+                }
+            return {"version": 1, "arms": arms}
+
+    def load_dict(self, data: Dict[str, object]) -> None:
+        for key, arm in (data.get("arms") or {}).items():
+            driver, _, band = key.partition("|")
+            for card_id, s, f in zip(arm["ids"], arm["succ"], arm["fail"]):
+                self.seed_counts(driver, band, card_id, s, f)
+
+
+class Checkpointer:
+    """Writes the policy to a JSON file every `interval` seconds when it changed."""
+
+    def __init__(self, policy: ThompsonPolicy, path: str, interval: float = 60.0):
+        self.policy = policy
+        self.path = path
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self._saved_version: Optional[int] = None
+        self._stop = threading.Event()
+        self._save_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="bandit-checkpoint", daemon=True)
+        self._thread.start()
+
+    def save(self) -> bool:
+        with self._save_lock:
+            version = self.policy.version
+            if version == self._saved_version:
+                return False
+            data = self.policy.to_dict()
+            tmp = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self._saved_version = version
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.save()
+
+
+def load_policy(path: str, seed_from_rollups: bool = True) -> ThompsonPolicy:
+    """Policy from the checkpoint at `path`; without one, seeded from the outcome rollups."""
+    policy = ThompsonPolicy()
+    try:
+        with open(path, encoding="utf-8") as f:
+            policy.load_dict(json.load(f))
+        return policy
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    if seed_from_rollups:
+        from outcomes.store import get_outcome_store
+
+        for r in get_outcome_store().rollups():
+            policy.seed_counts(r.driver, r.band, r.action_id, r.successes, r.n - r.successes)
+    return policy
+
+
+def pick(
+    policy: ThompsonPolicy,
+    candidates: CandidateSet,
+    driver: str,
+    band: str,
+    k: int = 2,
+    seed: Optional[int] = None,
+) -> List[int]:
+    theta = policy.sample(candidates, driver, band, seed=seed)
+    return mmr_select(candidates, k=k, band=band, relevance=theta, jitter=0.0)
+
+
+_POLICY: Optional[ThompsonPolicy] = None
+_CHECKPOINTER: Optional[Checkpointer] = None
+_POLICY_LOCK = threading.Lock()
+
+
+def get_route_policy() -> Optional[ThompsonPolicy]:
+    """
+    Process-wide policy when ROUTE_POLICY=thompson, else None (deterministic
+    routing). Checkpoints to BANDIT_CHECKPOINT every
+    BANDIT_CHECKPOINT_INTERVAL seconds and at exit.
+    """
+    global _POLICY, _CHECKPOINTER
+    if os.getenv("ROUTE_POLICY", "").strip().lower() != "thompson":
+        return None
+    if _POLICY is None:
+        with _POLICY_LOCK:
+            if _POLICY is None:
+                path = os.getenv("BANDIT_CHECKPOINT", "data/bandit.json")
+                policy = load_policy(path)
+                _CHECKPOINTER = Checkpointer(policy, path, float(os.getenv("BANDIT_CHECKPOINT_INTERVAL", "60")))
+                atexit.register(_CHECKPOINTER.close)
+                _POLICY = policy
+    return _POLICY
@@ -1,26 +1,89 @@
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+from routing.bandit import pick as bandit_pick
+from routing.ranking import CandidateSet, mmr_select
 
 DRIVERS = ("job_loss", "value_threat", "skill_erosion")
+BANDS = ("low", "mid", "high")
+
+def pick_two_actions(
+    candidates: Union[Sequence[Dict[str, Any]], CandidateSet],
+    band: Optional[str] = None,
+    seed: Optional[int] = None,
+    k: int = 2,
+) -> List[Dict[str, Any]]:
+    """
+    Top-k cards by maximal marginal relevance: fit to the user's band and
+    time budget, diversified by tag overlap. Deterministic for a given seed.
+    """
+    if not isinstance(candidates, CandidateSet):
+        if len(candidates) <= 1:
+            return list(candidates)
+        candidates = CandidateSet(candidates)
+    return [candidates.cards[i] for i in mmr_select(candidates, k=k, band=band, seed=seed)]
 
-def pick_two_actions(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    # MVP: deterministic pick first two; later can diversify by tags
-    return candidates[:2] if len(candidates) >= 2 else candidates
+# Candidate sets of the library seen last, per (driver, band). Only one
+# library is cached at a time: a hot reload replaces it, so the old library
+# and its cards are not kept alive by this cache.
+_CANDIDATES: Dict[Tuple[str, str], CandidateSet] = {}
+_CANDIDATES_OWNER: Tuple[Any, Any] = (None, None)
+_CANDIDATES_LOCK = threading.Lock()
 
-def route(driver: str, band: str, library_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _candidates(library, driver: str, band: str) -> CandidateSet:
+    """
+    Candidates for (driver, band) with the fallback chain already applied and
+    ranking features precomputed. Cached until a different library object or
+    stamp shows up.
+    """
+    global _CANDIDATES_OWNER
+    owner = (library, library.stamp)
+    with _CANDIDATES_LOCK:
+        if _CANDIDATES_OWNER[0] is not library or _CANDIDATES_OWNER[1] != owner[1]:
+            _CANDIDATES.clear()
+            _CANDIDATES_OWNER = owner
+        cached = _CANDIDATES.get((driver, band))
+    if cached is not None:
+        return cached
+
+    candidates = library.filter(driver, band)
+    # Fallback 1: mid band same driver
+    if not candidates and band != "mid":
+        candidates = library.filter(driver, "mid")
+    # Fallback 2: any intervention
+    if not candidates:
+        candidates = library.interventions
+    result = CandidateSet(candidates)
+    with _CANDIDATES_LOCK:
+        if _CANDIDATES_OWNER[0] is library:
+            _CANDIDATES[(driver, band)] = result
+    return result
+
+def route(driver: str, band: str, library_data, seed: Optional[int] = None, policy=None) -> List[Dict[str, Any]]:
     """
     Inputs:
       driver: job_loss | value_threat | skill_erosion
       band: low | mid | high
-      library_data: loaded from src/interventions/library.json
+      library_data: library from interventions.loader.get_library (JSON or
+        SQLite store), or the raw dict loaded from src/interventions/library.json
+      seed: optional; varies the pick among near-equal cards, reproducibly
+      policy: optional routing.bandit.ThompsonPolicy; picks by sampled
+        success rate instead of the fixed ranking
 
     Output:
       list of 0..2 intervention dicts
     """
     if driver not in DRIVERS:
         raise ValueError(f"Invalid driver: {driver}")
-    if band not in ("low", "mid", "high"):
+    if band not in BANDS:
         raise ValueError(f"Invalid band: {band}")
 
+    if not isinstance(library_data, dict):
+        candidates = _candidates(library_data, driver, band)
+        if policy is not None and len(candidates) > 1:
+            return [candidates.cards[i] for i in bandit_pick(policy, candidates, driver, band, seed=seed)]
+        return pick_two_actions(candidates, band=band, seed=seed)
+
     from interventions.loader import filter_interventions
 
     candidates = filter_interventions(library_data, driver=driver, band=band)
@@ -33,4 +96,7 @@ def route(driver: str, band: str, library_data: Dict[str, Any]) -> List[Dict[str
     if not candidates:
         candidates = library_data.get("interventions", [])
 
-    return pick_two_actions(candidates)
+    if policy is not None and len(candidates) > 1:
+        candidates = CandidateSet(candidates)
+        return [candidates.cards[i] for i in bandit_pick(policy, candidates, driver, band, seed=seed)]
+    return pick_two_actions(candidates, band=band, seed=seed)
@@ -0,0 +1,113 @@
+"""
+Diversity-aware top-k selection of intervention cards (maximal marginal relevance).
+
+Relevance of a card for the user: how well its neuroticism band and
+time_minutes fit the user's band, plus a small prior for its position in the
+library (curated order). Similarity between cards: Jaccard overlap of tags.
+Each pick maximizes
+
+    lam * relevance - (1 - lam) * max similarity to the cards already picked
+
+Card features are encoded once per candidate set as NumPy arrays, so a pick
+over thousands of cards is a few vector operations.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+BAND_ORDER = {"low": 0, "mid": 1, "high": 2}
+# Preferred effort per band: anxious users get the lighter exercises.
+TARGET_MINUTES = {"low": 10.0, "mid": 10.0, "high": 5.0}
+
+W_BAND = 0.5
+W_TIME = 0.3
+W_ORDER = 0.2
+
+
+class CandidateSet:
+    """Cards plus their precomputed features (tag matrix, tag counts, minutes, bands)."""
+
+    def __init__(self, cards: Sequence[Mapping[str, Any]]):
+        self.cards = tuple(cards)
+        self.ids = tuple(str(card.get("id", i)) for i, card in enumerate(self.cards))
+        n = len(self.cards)
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        minutes = np.zeros(n, dtype=np.float32)
+        bands = np.full(n, -1, dtype=np.int8)
+        for i, card in enumerate(self.cards):
+            for tag in set(card.get("tags") or ()):
+                rows.append(i)
+                cols.append(vocab.setdefault(tag, len(vocab)))
+            try:
+                minutes[i] = float(card.get("time_minutes") or 0)
+            except (TypeError, ValueError):
+                minutes[i] = 0.0
+            bands[i] = BAND_ORDER.get(card.get("neuroticism_band"), -1)
+        self.tags = np.zeros((n, max(1, len(vocab))), dtype=np.float32)
+        self.tags[rows, cols] = 1.0
+        self.tag_counts = self.tags.sum(axis=1)
+        self.minutes = minutes
+        self.bands = bands
+        self.order_prior = 1.0 - np.arange(n, dtype=np.float32) / max(1, n)
+        self._relevance: Dict[Optional[str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def relevance(self, band: Optional[str]) -> np.ndarray:
+        rel = self._relevance.get(band)
+        if rel is None:
+            rel = self._relevance[band] = self._compute_relevance(band)
+        return rel
+
+    def _compute_relevance(self, band: Optional[str]) -> np.ndarray:
+        if band not in BAND_ORDER:
+            return W_ORDER * self.order_prior
+        distance = np.abs(self.bands.astype(np.float32) - BAND_ORDER[band])
+        band_fit = np.where(self.bands < 0, 0.0, 1.0 - distance / 2.0)
+        target = TARGET_MINUTES[band]
+        time_fit = np.where(self.minutes > 0, 1.0 / (1.0 + np.abs(self.minutes - target) / target), 0.0)
+        return (W_BAND * band_fit + W_TIME * time_fit + W_ORDER * self.order_prior).astype(np.float32)
+
+    def similarity_to(self, i: int) -> np.ndarray:
+        """Jaccard tag overlap of every card with card i."""
+        inter = self.tags @ self.tags[i]
+        union = self.tag_counts + self.tag_counts[i] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def mmr_select(
+    candidates: CandidateSet,
+    k: int = 2,
+    band: Optional[str] = None,
+    lam: float = 0.7,
+    seed: Optional[int] = None,
+    jitter: float = 0.05,
+    relevance: Optional[np.ndarray] = None,
+) -> List[int]:
+    """
+    Indices of the k picked cards, in pick order. Without a seed ties go to
+    the earlier card; with a seed, near-ties (within `jitter`) are broken by
+    a seeded draw, so the same seed always yields the same picks.
+    `relevance` replaces the band/time relevance (e.g. sampled by a policy).
+    """
+    n = len(candidates)
+    if n <= 1 or k <= 0:
+        return list(range(min(n, max(k, 0))))
+    rel = candidates.relevance(band) if relevance is None else relevance
+    if seed is not None and jitter > 0:
+        rel = rel + np.random.default_rng(seed).uniform(0.0, jitter, n).astype(np.float32)
+
+    picked: List[int] = []
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(k, n)):
+        score = lam * rel - (1.0 - lam) * max_sim
+        score[~available] = -np.inf
+        i = int(np.argmax(score))
+        picked.append(i)
+        available[i] = False
+        np.maximum(max_sim, candidates.similarity_to(i), out=max_sim)
+    return picked
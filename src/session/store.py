@@ -0,0 +1,270 @@
+"""
+Session state outside the Streamlit process.
+
+A SessionSync mirrors a whitelist of JSON-serializable st.session_state keys
+into a SessionBackend under a random session token, so a session can resume
+on another replica or after a restart. Each persist() writes only keys whose
+encoded value changed since the last write (tracked by digest), and deletes
+keys that left the state.
+
+A token alone grants nothing: the app claims it at login with
+owner_proof(token, username, password), a digest kept in the backend and
+never in the URL. State is restored only when the same credentials claim
+the token again, so a leaked ?sid= link does not resume someone's session.
+
+Backends implement three calls (load, save, delete); SQLiteSessionBackend
+suits a single host or tests, MemorySessionBackend is for tests. A shared
+store (Redis, Postgres) only needs the same three calls.
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, MutableMapping, Optional, Protocol, Sequence
+
+# values larger than this are zlib-compressed
+COMPRESS_OVER = 512
+
+_TOKEN = re.compile(r"^[0-9a-f]{32}$")
+_DIGESTS = "_session_digests"
+_ATTACHED = "_session_token"
+# stored next to the whitelisted keys; never restored into the session state
+OWNER_KEY = "_owner"
+
+
+def new_token() -> str:
+    return secrets.token_hex(16)
+
+
+def valid_token(token: Optional[str]) -> bool:
+    return bool(token) and bool(_TOKEN.match(token))
+
+
+def owner_proof(token: str, username: str, password: str) -> str:
+    """Binds a session token to the credentials that logged in with it (salted by the token)."""
+    secret = f"{username}\x00{password}".encode("utf-8")
+    return hashlib.pbkdf2_hmac("sha256", secret, token.encode("ascii"), 100_000).hex()
+
+
+def encode_value(value: Any) -> bytes:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    if len(raw) > COMPRESS_OVER:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def decode_value(blob: bytes) -> Any:
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw.decode("utf-8"))
+
+
+def _digest(blob: bytes) -> str:
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class SessionBackend(Protocol):
+    def load(self, token: str) -> Dict[str, bytes]: ...
+
+    def save(self, token: str, changed: Dict[str, bytes], deleted: Sequence[str]) -> None: ...
+
+    def delete(self, token: str) -> None: ...
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._data: Dict[str, Dict[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, token: str) -> Dict[str, bytes]:
+        with self._lock:
+            return dict(self._data.get(token, {}))
+
+    def save(self, token: str, changed: Dict[str, bytes], deleted: Sequence[str]) -> None:
+        with self._lock:
+            data = self._data.setdefault(token, {})
+            data.update(changed)
+            for key in deleted:
+                data.pop(key, None)
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._data.pop(token, None)
+
+
+class SQLiteSessionBackend:
+    """One row per (token, key); sessions idle longer than `ttl` seconds are purged."""
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600):
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, touched_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched_at);
+                CREATE TABLE IF NOT EXISTS session_kv (
+                    token TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY (token, key)
+                ) WITHOUT ROWID;
+                """
+            )
+        self.purge_expired()
+
+    def load(self, token: str) -> Dict[str, bytes]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT kv.key, kv.value FROM session_kv kv JOIN sessions s ON s.token = kv.token
+                WHERE kv.token = ? AND s.touched_at >= ?
+                """,
+                (token, time.time() - self.ttl),
+            ).fetchall()
+        return {key: value for key, value in rows}
+
+    def save(self, token: str, changed: Dict[str, bytes], deleted: Sequence[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (token, touched_at) VALUES (?, ?) "
+                "ON CONFLICT (token) DO UPDATE SET touched_at = excluded.touched_at",
+                (token, time.time()),
+            )
+            if changed:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO session_kv (token, key, value) VALUES (?, ?, ?)",
+                    [(token, key, value) for key, value in changed.items()],
+                )
+            if deleted:
+                self._conn.executemany(
+                    "DELETE FROM session_kv WHERE token = ? AND key = ?", [(token, key) for key in deleted]
+                )
+
+    def delete(self, token: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM session_kv WHERE token = ?", (token,))
+            self._conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM session_kv WHERE token IN (SELECT token FROM sessions WHERE touched_at < ?)", (cutoff,)
+            )
+            return self._conn.execute("DELETE FROM sessions WHERE touched_at < ?", (cutoff,)).rowcount
+
+
+class SessionSync:
+    def __init__(self, backend: SessionBackend, keys: Iterable[str]):
+        self.backend = backend
+        self.keys = tuple(keys)
+
+    def claim(self, state: MutableMapping[str, Any], token: str, owner: str) -> bool:
+        """
+        Attach `state` to `token` on behalf of `owner` (an owner_proof()).
+        A new token is claimed for the owner; a token claimed by someone else
+        is refused and nothing is restored. Returns False when refused.
+        """
+        stored = self.backend.load(token)
+        if OWNER_KEY in stored:
+            if decode_value(stored[OWNER_KEY]) != owner:
+                return False
+        else:
+            self.backend.save(token, {OWNER_KEY: encode_value(owner)}, ())
+        state.pop(_ATTACHED, None)
+        self.attach(state, token, stored)
+        return True
+
+    def attached_token(self, state: MutableMapping[str, Any]) -> Optional[str]:
+        return state.get(_ATTACHED)
+
+    def attach(self, state: MutableMapping[str, Any], token: str, stored: Optional[Dict[str, bytes]] = None) -> bool:
+        """
+        Restore the stored keys into `state` once per Streamlit session (keys
+        already present win). Returns True if anything was restored. Call it
+        through claim() unless the caller has checked ownership itself.
+        """
+        if state.get(_ATTACHED) == token:
+            return False
+        if stored is None:
+            stored = self.backend.load(token)
+        digests: Dict[str, str] = {}
+        for key, blob in stored.items():
+            if key not in self.keys:
+                continue
+            if key not in state:
+                state[key] = decode_value(blob)
+            digests[key] = _digest(blob)
+        state[_DIGESTS] = digests
+        state[_ATTACHED] = token
+        return bool(digests)
+
+    def persist(self, state: MutableMapping[str, Any], token: str) -> int:
+        """
+        Write keys changed since the last persist; returns how many were
+        written or deleted. `state` must already be attached to `token`.
+        """
+        if state.get(_ATTACHED) != token:
+            raise ValueError("session state is not attached to this token")
+        digests: Dict[str, str] = state.get(_DIGESTS) or {}
+        changed: Dict[str, bytes] = {}
+        for key in self.keys:
+            if key not in state:
+                continue
+            try:
+                blob = encode_value(state[key])
+            except (TypeError, ValueError):
+                continue
+            d = _digest(blob)
+            if digests.get(key) != d:
+                changed[key] = blob
+                digests[key] = d
+        deleted = [key for key in digests if key not in state]
+        for key in deleted:
+            del digests[key]
+        if changed or deleted:
+            self.backend.save(token, changed, deleted)
+        state[_DIGESTS] = digests
+        return len(changed) + len(deleted)
+
+    def clear(self, token: str) -> None:
+        self.backend.delete(token)
+
+
+_BACKEND: Optional[SessionBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_session_backend() -> Optional[SessionBackend]:
+    """
+    Process-wide backend from SESSION_BACKEND: "sqlite" (SESSION_DB,
+    default data/sessions.db; idle sessions expire after SESSION_TTL
+    seconds), "memory", or unset to keep state in the process only.
+    """
+    global _BACKEND
+    kind = os.getenv("SESSION_BACKEND", "").strip().lower()
+    if not kind:
+        return None
+    if _BACKEND is None:
+        with _BACKEND_LOCK:
+            if _BACKEND is None:
+                if kind == "sqlite":
+                    _BACKEND = SQLiteSessionBackend(
+                        os.getenv("SESSION_DB", "data/sessions.db"),
+                        ttl=float(os.getenv("SESSION_TTL", str(7 * 24 * 3600))),
+                    )
+                elif kind == "memory":
+                    _BACKEND = MemorySessionBackend()
+                else:
+                    raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+    return _BACKEND
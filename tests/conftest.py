@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tools"))
+
+from fake_openai import FakeConfig, start_in_thread  # noqa: E402
+
+
+@pytest.fixture
+def fake_llm():
+    """Starts tools/fake_openai.py in a thread; call with FakeConfig fields."""
+    servers = []
+
+    def start(**config):
+        server = start_in_thread(FakeConfig(**config))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,52 @@
+import pytest
+
+import ai.analyzer as analyzer
+from ai.analysis_cache import analysis_key, get_analysis_cache
+from ai.llm_client import LLMClient, LLMConfig
+from ai.providers import ProviderConfig
+
+MESSAGES = [{"role": "user", "content": "我担心AI会取代我"}, {"role": "assistant", "content": "我听到了。"}]
+
+
+@pytest.fixture
+def use_client(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "1")
+    get_analysis_cache().clear()
+
+    def use(*providers: ProviderConfig) -> LLMClient:
+        first = providers[0]
+        client = LLMClient(LLMConfig(first.base_url, "test", first.model, 5, providers=providers))
+        monkeypatch.setattr(analyzer, "get_client", lambda: client)
+        return client
+
+    yield use
+    get_analysis_cache().clear()
+
+
+def test_primary_answer_is_cached_with_its_model(fake_llm, use_client):
+    server = fake_llm(seed=1)
+    use_client(ProviderConfig("main", server.base_url, "test", "analyzer-main"))
+    first = analyzer.analyze_chat(MESSAGES)
+    assert first["_model"] == "analyzer-main"
+    assert analyzer.analyze_chat(MESSAGES) == first
+    assert server.stats.snapshot()["requests"] == 1
+
+
+def test_fallback_answer_is_not_cached(fake_llm, use_client):
+    down = fake_llm(errors={503: 1.0})
+    up = fake_llm(seed=1)
+    use_client(
+        ProviderConfig("main", down.base_url, "test", "analyzer-main"),
+        ProviderConfig("backup", up.base_url, "test", "analyzer-backup", priority=1),
+    )
+    result = analyzer.analyze_chat(MESSAGES)
+    assert result["_model"] == "analyzer-backup"
+    assert result["_llm_error"] is None
+    assert get_analysis_cache().stats()["size"] == 0
+
+
+def test_key_changes_with_the_provider_list():
+    main = ProviderConfig("main", "https://a.example", "k", "model-a")
+    backup = ProviderConfig("backup", "https://b.example", "k", "model-b", priority=1)
+    assert analysis_key(MESSAGES, (main,)) != analysis_key(MESSAGES, (main, backup))
+    assert analysis_key(MESSAGES, (main,)) != analysis_key(MESSAGES, (backup,))
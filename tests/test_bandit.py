@@ -0,0 +1,85 @@
+import gc
+import weakref
+from pathlib import Path
+
+from interventions.loader import InterventionLibrary, load_interventions
+from routing.bandit import ThompsonPolicy, pick
+from routing.personalize import route
+from routing.ranking import CandidateSet
+
+LIBRARY_JSON = Path(__file__).resolve().parent.parent / "src" / "interventions" / "library.json"
+
+CARDS = [
+    {"id": "a", "driver": "job_loss", "neuroticism_band": "mid", "tags": ["x"]},
+    {"id": "b", "driver": "job_loss", "neuroticism_band": "mid", "tags": ["y"]},
+    {"id": "c", "driver": "job_loss", "neuroticism_band": "mid", "tags": ["z"]},
+]
+
+
+def _counts(policy, card_id, driver="job_loss", band="mid"):
+    arms = policy._arms[(driver, band)]
+    i = arms.ids[card_id]
+    return arms.succ[i], arms.fail[i]
+
+
+def test_observe_counts_success_and_failure():
+    policy = ThompsonPolicy(seed=1)
+    policy.observe("job_loss", "mid", "a", -2)
+    policy.observe("job_loss", "mid", "a", -1)
+    policy.observe("job_loss", "mid", "a", 0)
+    policy.observe("job_loss", "mid", "b", 1)
+    assert _counts(policy, "a") == (2, 1)
+    assert _counts(policy, "b") == (0, 1)
+    assert policy.version == 4
+
+
+def test_arms_grow_past_initial_capacity():
+    policy = ThompsonPolicy(seed=1)
+    for i in range(20):
+        policy.observe("job_loss", "mid", f"card{i}", -1)
+    assert all(_counts(policy, f"card{i}") == (1, 0) for i in range(20))
+
+
+def test_posterior_favours_the_successful_card():
+    policy = ThompsonPolicy(seed=1)
+    for _ in range(50):
+        policy.observe("job_loss", "mid", "b", -2)
+        policy.observe("job_loss", "mid", "a", 1)
+        policy.observe("job_loss", "mid", "c", 1)
+    candidates = CandidateSet(CARDS)
+    theta = policy.sample(candidates, "job_loss", "mid", seed=3)
+    assert theta[1] > theta[0] and theta[1] > theta[2]
+    assert pick(policy, candidates, "job_loss", "mid", k=1, seed=3) == [1]
+
+
+def test_round_trip_through_dict():
+    policy = ThompsonPolicy(seed=1)
+    policy.observe("job_loss", "mid", "a", -1)
+    policy.observe("value_threat", "high", "b", 2)
+    restored = ThompsonPolicy()
+    restored.load_dict(policy.to_dict())
+    assert restored.to_dict() == policy.to_dict()
+
+
+def test_index_cache_does_not_pin_candidate_sets():
+    policy = ThompsonPolicy(seed=1)
+    candidates = CandidateSet(CARDS)
+    policy.sample(candidates, "job_loss", "mid", seed=1)
+    ref = weakref.ref(candidates)
+    del candidates
+    gc.collect()
+    assert ref() is None
+    assert len(policy._index_cache) == 0
+
+
+def test_reloaded_library_is_released_by_the_policy():
+    data = load_interventions(str(LIBRARY_JSON))
+    policy = ThompsonPolicy(seed=1)
+    old = InterventionLibrary(data, stamp=(1, 1))
+    route("job_loss", "mid", old, seed=1, policy=policy)
+    ref = weakref.ref(old)
+
+    route("job_loss", "mid", InterventionLibrary(data, stamp=(2, 1)), seed=1, policy=policy)
+    del old
+    gc.collect()
+    assert ref() is None
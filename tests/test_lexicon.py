@@ -0,0 +1,33 @@
+from ai.lexicon import DRIVER_LEXICON, Lexicon, classify_driver, classify_drivers
+
+TEXTS = [
+    "我担心AI会取代我",
+    "我觉得自己越来越不重要了",
+    "总用AI写东西，我怕自己变笨",
+    "今天天气不错",
+    "岗位消失业务也没了，我觉得没价值",
+    "",
+]
+
+
+def test_classify_driver_priority():
+    assert classify_driver("最近在裁员，我也觉得自己不重要") == "job_loss"
+    assert classify_driver("我怕自己变笨") == "skill_erosion"
+    assert classify_driver("今天天气不错") == "value_threat"
+
+
+def test_match_many_agrees_with_match():
+    assert DRIVER_LEXICON.match_many(TEXTS) == [DRIVER_LEXICON.match(t) for t in TEXTS]
+    assert classify_drivers(TEXTS) == [classify_driver(t) for t in TEXTS]
+
+
+def test_match_many_offsets_survive_lowercasing():
+    # "İ".lower() is two code points, which shifts everything after it
+    texts = ["İ" * 10, "我担心AI会取代我", "İİ", "我觉得自己不重要"]
+    assert DRIVER_LEXICON.match_many(texts) == [set(), {"job_loss"}, set(), {"value_threat"}]
+
+
+def test_partly_overlapping_keywords_are_all_found():
+    lexicon = Lexicon((("a", ("ab",)), ("b", ("bc",))))
+    assert lexicon.match_many(["xabcx", "bc"]) == [{"a", "b"}, {"b"}]
+    assert lexicon.match("xabcx") == {"a", "b"}
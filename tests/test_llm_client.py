@@ -0,0 +1,60 @@
+from ai.llm_client import LLMClient, LLMConfig
+from ai.metrics import get_metrics
+from ai.providers import ProviderConfig
+from ai.resilience import get_breaker
+
+MESSAGES = [{"role": "user", "content": "我担心AI会取代我"}]
+
+
+def _client(server, model: str) -> LLMClient:
+    provider = ProviderConfig("fake", server.base_url, "test", model)
+    return LLMClient(LLMConfig(server.base_url, "test", model, 5, providers=(provider,)))
+
+
+def _outcomes(model: str):
+    series = get_metrics().snapshot().get("llm_request_seconds", [])
+    return [s["labels"]["outcome"] for s in series if s["labels"].get("model") == model]
+
+
+def _counter(name: str, model: str, **labels: str) -> float:
+    series = get_metrics().snapshot().get(name, [])
+    return sum(
+        s["value"] for s in series
+        if s["labels"].get("model") == model and all(s["labels"].get(k) == v for k, v in labels.items())
+    )
+
+
+def test_stream_ok(fake_llm):
+    server = fake_llm(seed=1)
+    client = _client(server, "stream-ok")
+    reply = "".join(client.chat_stream(MESSAGES))
+    assert reply
+    assert client.last_error is None
+    assert _outcomes("stream-ok") == ["ok"]
+    assert _counter("llm_tokens_total", "stream-ok", kind="completion") > 0
+    assert _counter("llm_tokens_total", "stream-ok", kind="prompt") > 0
+
+
+def test_stream_cut_is_an_error(fake_llm):
+    server = fake_llm(stream_cut_rate=1.0, seed=1)
+    client = _client(server, "stream-cut")
+    pieces = list(client.chat_stream(MESSAGES))
+    assert pieces  # the text received before the cut is kept
+    assert client.last_error
+    assert _outcomes("stream-cut") == ["stream_error"]
+    assert get_breaker(server.base_url)._failures == 1
+
+
+def test_failover_is_not_counted_as_a_retry(fake_llm, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "1")
+    down = fake_llm(errors={503: 1.0})
+    up = fake_llm(seed=1)
+    providers = (
+        ProviderConfig("down", down.base_url, "test", "failover"),
+        ProviderConfig("up", up.base_url, "test", "failover", priority=1),
+    )
+    client = LLMClient(LLMConfig(down.base_url, "test", "failover", 5, providers=providers))
+    assert "".join(client.chat_stream(MESSAGES))
+    assert client.last_error is None
+    assert _counter("llm_failovers_total", "failover") == 1
+    assert _counter("llm_retries_total", "failover") == 0
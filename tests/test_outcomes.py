@@ -0,0 +1,57 @@
+import sqlite3
+
+from outcomes.store import Outcome, OutcomeStore, connect
+
+
+def _outcome(**kw):
+    values = dict(
+        session_id="s1", action_id="a1", driver="job_loss", band="mid", dimension="J",
+        pre=7, post=5, completed=True, request_id="r1",
+    )
+    values.update(kw)
+    return Outcome(**values)
+
+
+def test_resubmitted_outcome_is_recorded_once(tmp_path):
+    store = OutcomeStore(str(tmp_path / "outcomes.db"))
+    try:
+        store.record(_outcome())
+        store.record(_outcome(post=4))  # same submission clicked again
+        assert store.flush(5)
+        store.record(_outcome())
+        store.record(_outcome(request_id="r2"))  # a new round counts
+        assert store.flush(5)
+
+        assert len(store.by_action("a1")) == 2
+        rollup = store.rollup("a1", "job_loss", "mid")
+        assert rollup.n == 2 and rollup.successes == 2
+        assert store.written == 2 and store.duplicates == 2
+    finally:
+        store.close()
+
+
+def test_version_2_database_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE outcomes (
+            id INTEGER PRIMARY KEY, created_at REAL NOT NULL, session_id TEXT NOT NULL,
+            action_id TEXT NOT NULL, driver TEXT NOT NULL, band TEXT NOT NULL,
+            dimension TEXT NOT NULL, pre INTEGER NOT NULL, post INTEGER NOT NULL,
+            completed INTEGER NOT NULL, role TEXT NOT NULL DEFAULT ''
+        );
+        INSERT INTO outcomes VALUES (1, 0, 's0', 'a1', 'job_loss', 'mid', 'J', 6, 6, 1, '');
+        PRAGMA user_version=2;
+        """
+    )
+    conn.close()
+
+    connect(path).close()
+    store = OutcomeStore(path)
+    try:
+        store.record(_outcome())
+        assert store.flush(5)
+        assert [o.request_id for o in store.by_action("a1")] == ["r1", ""]
+    finally:
+        store.close()
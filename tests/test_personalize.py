@@ -0,0 +1,30 @@
+import gc
+import weakref
+from pathlib import Path
+
+from interventions.loader import InterventionLibrary, load_interventions
+from routing.personalize import route
+
+LIBRARY_JSON = Path(__file__).resolve().parent.parent / "src" / "interventions" / "library.json"
+
+
+def test_route_picks_from_the_library():
+    library = InterventionLibrary(load_interventions(str(LIBRARY_JSON)), stamp=(1, 1))
+    picked = route("job_loss", "high", library, seed=1)
+    assert 1 <= len(picked) <= 2
+    assert all(card in library.interventions for card in picked)
+
+
+def test_reloaded_library_is_not_kept_alive():
+    data = load_interventions(str(LIBRARY_JSON))
+    old = InterventionLibrary(data, stamp=(1, 1))
+    route("job_loss", "mid", old, seed=1)
+    ref = weakref.ref(old)
+
+    new = InterventionLibrary(data, stamp=(2, 1))
+    picked = route("job_loss", "mid", new, seed=1)
+    assert all(any(card is c for c in new.interventions) for card in picked)
+
+    del old
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+import urllib.error
+
+import pytest
+
+from ai.llm_client import LLMClient, LLMConfig
+from ai.providers import ProviderConfig
+from ai.resilience import CircuitBreaker, RetryPolicy, acall_with_retry, call_with_retry, get_breaker, stream_with_retry
+
+COOLDOWN = 0.05
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=COOLDOWN)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_in() <= COOLDOWN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=COOLDOWN)
+    breaker.record_failure()
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # the probe is still in flight
+
+
+def test_half_open_probe_outcome():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=COOLDOWN)
+    breaker.record_failure()
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_request_errors_do_not_count():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=COOLDOWN)
+    breaker.record(urllib.error.HTTPError("http://x", 400, "Bad Request", None, None))
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(urllib.error.HTTPError("http://x", 503, "Unavailable", None, None))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_stops_calling_an_open_provider(fake_llm, monkeypatch):
+    monkeypatch.setenv("LLM_BREAKER_THRESHOLD", "2")
+    monkeypatch.setenv("LLM_BREAKER_COOLDOWN", "60")
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "1")
+    server = fake_llm(errors={503: 1.0})
+    provider = ProviderConfig("fake", server.base_url, "test", "breaker")
+    client = LLMClient(LLMConfig(server.base_url, "test", "breaker", 5, providers=(provider,)))
+    messages = [{"role": "user", "content": "我担心AI会取代我"}]
+
+    for _ in range(2):
+        assert client.chat(messages)  # mock fallback reply
+        assert client.last_error
+    assert get_breaker(server.base_url).state == CircuitBreaker.OPEN
+
+    requests = server.stats.snapshot()["requests"]
+    client.chat(messages)
+    assert server.stats.snapshot()["requests"] == requests
+
+
+def _half_open() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=COOLDOWN)
+    breaker.record_failure()
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.allow()  # this caller now holds the probe
+    return breaker
+
+
+def test_malformed_reply_fails_the_probe_without_retrying():
+    breaker = _half_open()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return json.loads("{truncated")
+
+    with pytest.raises(json.JSONDecodeError):
+        call_with_retry(fn, breaker, RetryPolicy(max_attempts=3, base_delay=0))
+    assert len(calls) == 1
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.allow()
+
+
+def test_cancelled_probe_is_released():
+    breaker = _half_open()
+
+    async def fn():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(acall_with_retry(fn, breaker, RetryPolicy()))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_malformed_stream_fails_the_probe():
+    breaker = _half_open()
+
+    def make():
+        raise KeyError("choices")
+        yield ""
+
+    with pytest.raises(KeyError):
+        list(stream_with_retry(make, breaker, RetryPolicy()))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_abandoned_stream_leaves_the_breaker_usable():
+    breaker = _half_open()
+    stream = stream_with_retry(lambda: iter(["a", "b", "c"]), breaker, RetryPolicy())
+    assert next(stream) == "a"
+    stream.close()  # GeneratorExit inside stream_with_retry
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
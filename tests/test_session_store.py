@@ -0,0 +1,45 @@
+import pytest
+
+from session.store import OWNER_KEY, MemorySessionBackend, SessionSync, new_token, owner_proof
+
+KEYS = ("step", "chat_messages")
+
+
+def _login(sync, token, username, password):
+    state = {}
+    return state, sync.claim(state, token, owner_proof(token, username, password))
+
+
+def test_same_credentials_resume_the_session():
+    sync = SessionSync(MemorySessionBackend(), KEYS)
+    token = new_token()
+    state, ok = _login(sync, token, "alice", "pw")
+    assert ok
+    state["step"] = "C"
+    state["chat_messages"] = [{"role": "user", "content": "我担心AI会取代我"}]
+    sync.persist(state, token)
+
+    resumed, ok = _login(sync, token, "alice", "pw")
+    assert ok
+    assert resumed["step"] == "C"
+    assert resumed["chat_messages"] == state["chat_messages"]
+    assert OWNER_KEY not in resumed
+
+
+@pytest.mark.parametrize("username, password", [("mallory", "pw"), ("alice", "guess")])
+def test_token_alone_does_not_resume(username, password):
+    sync = SessionSync(MemorySessionBackend(), KEYS)
+    token = new_token()
+    state, _ = _login(sync, token, "alice", "pw")
+    state["step"] = "C"
+    sync.persist(state, token)
+
+    other, ok = _login(sync, token, username, password)
+    assert not ok
+    assert other == {}
+
+
+def test_persist_requires_a_claimed_token():
+    sync = SessionSync(MemorySessionBackend(), KEYS)
+    with pytest.raises(ValueError):
+        sync.persist({"step": "B"}, new_token())
@@ -0,0 +1,39 @@
+import time
+
+from ai.llm_client import get_config, reset_config
+from ai.resilience import CircuitBreaker, get_breaker
+from ai.speculative import SummaryPrefetcher
+
+COOLDOWN = 0.05
+
+
+def _transcript(turn: int):
+    return [
+        {"role": "user", "content": f"我担心AI会取代我（第{turn}轮）"},
+        {"role": "assistant", "content": "谢谢你愿意说出来。"},
+    ]
+
+
+def test_cancel_during_probe_keeps_the_provider_usable(fake_llm, monkeypatch):
+    server = fake_llm(latency="fixed:300")
+    monkeypatch.delenv("LLM_PROVIDERS", raising=False)
+    monkeypatch.setenv("LLM_BASE_URL", server.base_url)
+    monkeypatch.setenv("LLM_API_KEY", "test")
+    monkeypatch.setenv("LLM_MODEL", "prefetch")
+    reset_config()
+    try:
+        breaker = get_breaker(get_config().providers[0].base_url)
+        breaker.cooldown = COOLDOWN
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        time.sleep(COOLDOWN * 1.5)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        prefetcher = SummaryPrefetcher()
+        prefetcher.schedule(_transcript(1))  # takes the half-open probe
+        time.sleep(0.1)
+        prefetcher.cancel()  # a new turn arrived mid-request
+        time.sleep(0.1)
+        assert breaker.allow()
+    finally:
+        reset_config()
@@ -0,0 +1,127 @@
+import asyncio
+import socket
+import socketserver
+import threading
+import urllib.error
+from urllib.parse import urlsplit
+
+import pytest
+
+from ai.async_transport import AsyncHTTPTransport
+from ai.transport import HTTPTransport, proxy_for, route_for
+
+PAYLOAD = {"messages": [{"role": "user", "content": "hi"}], "stream": True}
+
+
+def _read_stream(transport, server):
+    with transport.stream_lines(server.base_url + "/v1/chat/completions", PAYLOAD, {}, timeout=5) as lines:
+        return b"".join(lines)
+
+
+def test_complete_stream_is_pooled(fake_llm):
+    server = fake_llm(seed=1)
+    transport = HTTPTransport()
+    body = _read_stream(transport, server)
+    assert body.rstrip().endswith(b"data: [DONE]")
+    assert transport.idle_count() == 1
+
+
+def test_cut_stream_raises_and_is_not_pooled(fake_llm):
+    server = fake_llm(stream_cut_rate=1.0, seed=1)
+    transport = HTTPTransport()
+    with pytest.raises(urllib.error.URLError):
+        _read_stream(transport, server)
+    assert transport.idle_count() == 0
+    assert server.stats.snapshot()["stream_cut"] == 1
+
+
+class _ForwardProxy(socketserver.ThreadingTCPServer):
+    """Plain-http forward proxy that records the request lines it relays."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ProxyHandler)
+        self.seen = []
+
+
+class _ProxyHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            head = [line]
+            while head[-1] not in (b"\r\n", b""):
+                head.append(self.rfile.readline())
+            method, target, version = line.decode("latin-1").split()
+            self.server.seen.append((method, target, b"".join(head)))
+            parts = urlsplit(target)
+            length = 0
+            for h in head[1:]:
+                name, _, value = h.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = self.rfile.read(length)
+            origin = f"{method} {parts.path} {version}\r\n".encode("latin-1")
+            with socket.create_connection((parts.hostname, parts.port)) as upstream:
+                upstream.sendall(origin + b"".join(head[1:]) + body)
+                upstream.shutdown(socket.SHUT_WR)
+                while True:
+                    chunk = upstream.recv(65536)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+            return
+
+
+@pytest.fixture
+def proxy(monkeypatch):
+    server = _ForwardProxy()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for name in ("http_proxy", "HTTP_PROXY", "no_proxy", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("http_proxy", f"http://user:pw@127.0.0.1:{server.server_address[1]}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_go_through_http_proxy(fake_llm, proxy):
+    server = fake_llm(seed=1)
+    url = server.base_url + "/v1/chat/completions"
+    body = HTTPTransport().post_json(url, {**PAYLOAD, "stream": False}, {}, timeout=5)
+    assert b"choices" in body
+    method, target, head = proxy.seen[0]
+    assert (method, target) == ("POST", url)
+    assert b"Proxy-Authorization: Basic dXNlcjpwdw==" in head
+
+
+def test_async_requests_go_through_http_proxy(fake_llm, proxy):
+    server = fake_llm(seed=1)
+    url = server.base_url + "/v1/chat/completions"
+    body = asyncio.run(AsyncHTTPTransport().post_json(url, {**PAYLOAD, "stream": False}, {}, timeout=5))
+    assert b"choices" in body
+    assert [(m, t) for m, t, _ in proxy.seen] == [("POST", url)]
+
+
+def test_no_proxy_hosts_connect_directly(fake_llm, proxy, monkeypatch):
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+    server = fake_llm(seed=1)
+    HTTPTransport().post_json(server.base_url + "/v1/chat/completions", {**PAYLOAD, "stream": False}, {}, timeout=5)
+    assert proxy.seen == []
+    assert server.stats.snapshot()["requests"] == 1
+
+
+def test_https_goes_through_a_connect_tunnel(monkeypatch):
+    for name in ("http_proxy", "HTTP_PROXY", "HTTPS_PROXY", "no_proxy", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("https_proxy", "proxy.internal:3128")
+    route, path = route_for("https://api.example.com/v1/chat/completions")
+    assert route == (("https", "api.example.com", 443), ("proxy.internal", 3128, None))
+    assert path == "/v1/chat/completions"
+    conn, _ = HTTPTransport()._acquire(route, timeout=5)
+    assert (conn.host, conn.port) == ("proxy.internal", 3128)
+    assert (conn._tunnel_host, conn._tunnel_port) == ("api.example.com", 443)
+    assert proxy_for(("http", "api.example.com", 80)) is None
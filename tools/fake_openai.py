@@ -0,0 +1,350 @@
+"""
+Local OpenAI-compatible stand-in for load and failure testing of LLMClient.
+
+Implements POST /v1/chat/completions (JSON and SSE streaming) with
+injectable latency, token rate and faults:
+
+    python tools/fake_openai.py --port 8700 --latency lognormal:300:0.5 \\
+        --tokens-per-sec 40 --errors 429=0.05,503=0.02 --duplicate-rate 0.05
+
+Then point the app at it:
+
+    LLM_BASE_URL=http://127.0.0.1:8700 LLM_API_KEY=x LLM_MODEL=fake streamlit run app_streamlit.py
+
+Faults, each drawn independently per request:
+- --errors CODE=RATE,...   HTTP errors (402, 429, 5xx); 429/503 carry Retry-After
+- --reject-response-format RATE   400 "response_format ... not supported" when
+                                  the request sets response_format
+                                  (LLMClient retries without it)
+- --truncate-json-rate RATE       JSON replies cut off mid-object
+- --duplicate-rate RATE           reply repeats the last assistant message
+                                  (LLMClient dedupe falls back to the mock)
+- --stream-cut-rate RATE          streaming replies drop the connection midway
+
+Latency specs: fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA, exp:MEAN.
+GET /_stats returns request/fault counters; POST /_config with a JSON body
+of the same option names (underscored) changes settings at runtime.
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+REPLIES = [
+    "我听到你在担心 AI 会影响你的工作，这种不安很真实。你最害怕的结果是什么？",
+    "谢谢你愿意说出来。我们把它拆小一点：这件事里哪一部分是你现在能做点什么的？",
+    "这种担心很常见。如果只看接下来一周，有哪一个小步骤能让你感觉更有掌控感？",
+    "你提到的感受说明你很在意自己的价值。能说说最近一次有这种感觉是在什么情境下吗？",
+]
+
+ANALYSIS = {
+    "driver": "job_loss",
+    "intensity_guess_0_10": 6,
+    "unhelpful_thoughts": ["灾难化：把可能的变化想成必然失业"],
+    "reframe": "岗位会变化，但你积累的判断力和协作能力可以迁移。",
+    "suggested_actions": ["列出工作中3个难以被替代的环节"],
+}
+
+RETRY_AFTER_CODES = (429, 503)
+
+
+def parse_latency(spec: str):
+    """'fixed:200' | 'uniform:100:300' | 'lognormal:200:0.5' | 'exp:200' -> rng -> seconds."""
+    kind, _, rest = spec.partition(":")
+    args = [float(x) for x in rest.split(":") if x]
+    if kind == "fixed":
+        return lambda rng: args[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1]) / 1000
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / args[0]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def parse_errors(spec: str) -> Dict[int, float]:
+    out: Dict[int, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        code, _, rate = part.partition("=")
+        out[int(code)] = float(rate)
+    return out
+
+
+@dataclass
+class FakeConfig:
+    latency: str = "fixed:0"
+    tokens_per_sec: float = 0.0  # 0 = no generation delay
+    errors: Dict[int, float] = field(default_factory=dict)
+    retry_after: float = 1.0
+    reject_response_format: float = 0.0
+    truncate_json_rate: float = 0.0
+    duplicate_rate: float = 0.0
+    stream_cut_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self._latency = parse_latency(self.latency)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            if key == "errors" and isinstance(value, str):
+                value = parse_errors(value)
+            elif key == "errors":
+                value = {int(k): float(v) for k, v in value.items()}
+            if key in self.__dataclass_fields__:
+                setattr(self, key, value)
+        self._latency = parse_latency(self.latency)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        return max(0.0, self._latency(rng))
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+def _tokens(text: str) -> List[str]:
+    # roughly one token per CJK character, per ASCII word otherwise
+    out, word = [], ""
+    for ch in text:
+        if ch.isascii() and not ch.isspace():
+            word += ch
+            continue
+        if word:
+            out.append(word)
+            word = ""
+        out.append(ch)
+    if word:
+        out.append(word)
+    return out
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # ---- helpers ----
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_body(self) -> Dict[str, Any]:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw or b"{}")
+
+    # ---- routes ----
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            self._send(200, self.server.stats.snapshot())
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        try:
+            req = self._read_body()
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid JSON body"}})
+            return
+        if self.path == "/_config":
+            self.server.config.update(req)
+            self._send(200, {"ok": True})
+            return
+        if self.path not in ("/v1/chat/completions", "/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        self._chat(req)
+
+    def _chat(self, req: Dict[str, Any]) -> None:
+        cfg: FakeConfig = self.server.config
+        stats: Stats = self.server.stats
+        rng = self.server.rng()
+        stats.add("requests")
+
+        time.sleep(cfg.sample_latency(rng))
+
+        for code, rate in sorted(cfg.errors.items()):
+            if rng.random() < rate:
+                stats.add(f"error_{code}")
+                headers = {"Retry-After": f"{cfg.retry_after:g}"} if code in RETRY_AFTER_CODES else None
+                self._send(code, {"error": {"message": f"injected {code}", "type": "fake"}}, headers)
+                return
+
+        wants_json = bool(req.get("response_format"))
+        if wants_json and rng.random() < cfg.reject_response_format:
+            stats.add("rejected_response_format")
+            self._send(400, {"error": {"message": "response_format json_object is not supported by this model"}})
+            return
+
+        messages = req.get("messages") or []
+        content = self._reply(messages, wants_json, rng)
+        usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages), "completion_tokens": len(_tokens(content))}
+        if req.get("stream"):
+            include_usage = bool((req.get("stream_options") or {}).get("include_usage"))
+            if not self._stream(content, rng, usage if include_usage else None):
+                return
+        else:
+            if cfg.tokens_per_sec > 0:
+                time.sleep(len(_tokens(content)) / cfg.tokens_per_sec)
+            self._send(200, {
+                "id": "fake-1",
+                "object": "chat.completion",
+                "model": req.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        stats.add("ok")
+
+    def _reply(self, messages: List[Dict[str, Any]], wants_json: bool, rng: random.Random) -> str:
+        cfg: FakeConfig = self.server.config
+        stats: Stats = self.server.stats
+        asks_json = wants_json or any("JSON" in str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        if asks_json:
+            text = json.dumps(ANALYSIS, ensure_ascii=False)
+            if rng.random() < cfg.truncate_json_rate:
+                stats.add("truncated_json")
+                text = text[: rng.randint(1, len(text) - 2)]
+            return text
+        if rng.random() < cfg.duplicate_rate:
+            for m in reversed(messages):
+                if m.get("role") == "assistant":
+                    stats.add("duplicate")
+                    return str(m.get("content", ""))
+        turn = sum(1 for m in messages if m.get("role") == "user")
+        return REPLIES[turn % len(REPLIES)]
+
+    def _stream(self, content: str, rng: random.Random, usage: Optional[Dict[str, int]] = None) -> bool:
+        """SSE reply (with a final usage chunk if asked for); False if the connection was cut on purpose."""
+        cfg: FakeConfig = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens = _tokens(content)
+        cut_at = rng.randint(1, max(1, len(tokens) - 1)) if rng.random() < cfg.stream_cut_rate else None
+        delay = 1 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+        for i, tok in enumerate(tokens):
+            if cut_at is not None and i == cut_at:
+                self.server.stats.add("stream_cut")
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return False
+            event = {"choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}]}
+            self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            if delay:
+                time.sleep(delay)
+        if usage is not None:
+            event = {"choices": [], "usage": usage}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+        return True
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address: Tuple[str, int], config: Optional[FakeConfig] = None):
+        self.config = config or FakeConfig()
+        self.stats = Stats()
+        self._seed = random.Random(self.config.seed)
+        self._seed_lock = threading.Lock()
+        super().__init__(address, Handler)
+
+    def rng(self) -> random.Random:
+        # per-request generator drawn from one seeded sequence
+        with self._seed_lock:
+            return random.Random(self._seed.getrandbits(64))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0) -> FakeOpenAIServer:
+    server = FakeOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA | exp:MEAN")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--errors", default="", help="e.g. 402=0.01,429=0.05,500=0.02")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--reject-response-format", type=float, default=0.0)
+    parser.add_argument("--truncate-json-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--stream-cut-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        errors=parse_errors(args.errors),
+        retry_after=args.retry_after,
+        reject_response_format=args.reject_response_format,
+        truncate_json_rate=args.truncate_json_rate,
+        duplicate_rate=args.duplicate_rate,
+        stream_cut_rate=args.stream_cut_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer((args.host, args.port), config_from_args(args))
+    print(f"fake OpenAI server on {server.base_url}  config: {json.dumps(asdict(server.config), default=str)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Drive N concurrent simulated chat sessions through LLMClient and report
+latency percentiles.
+
+    python tools/loadgen.py --spawn --sessions 50 --turns 4 --stream \\
+        --latency lognormal:300:0.5 --tokens-per-sec 60 --errors 429=0.05,503=0.02
+    python tools/loadgen.py --base-url http://127.0.0.1:8700 --sessions 20 --summary
+
+--spawn starts tools/fake_openai.py in-process (all its fault options are
+accepted here); otherwise --base-url points at a running server, fake or
+real. Each session sends --turns user messages, feeding every reply back
+into the transcript the way the app does, and with --summary ends with the
+analyzer's JSON request (force_json, so response_format rejection and
+truncated JSON take the real fallback paths).
+
+Reported per call kind: p50/p90/p99/max latency, time to first chunk when
+streaming, and how many replies were a mock fallback (provider failure or
+duplicate reply) or an unparseable analysis.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from fake_openai import add_arguments, config_from_args, start_in_thread  # noqa: E402
+
+from ai.analyzer import _analyzer_messages, _parse_analysis, _user_text  # noqa: E402
+from ai.llm_client import LLMClient, LLMConfig  # noqa: E402
+from ai.prompts import SYSTEM_CHAT_STYLE  # noqa: E402
+from ai.providers import ProviderConfig, normalize_base_url  # noqa: E402
+
+USER_LINES = [
+    "我担心AI会取代我，觉得很不安。",
+    "最近公司在讨论裁员，我怕自己的岗位消失。",
+    "我觉得自己越来越不重要了，好像没人需要我。",
+    "用AI写东西太方便了，我担心自己会变笨。",
+    "今天开会的时候又想到这些事情，整个人都很焦虑。",
+]
+
+DEDUPE_MARK = "LLM重复回复"
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.ttft: Dict[str, List[float]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, kind: str, seconds: float, ttft: Optional[float] = None, **flags: bool) -> None:
+        with self._lock:
+            self.latency[kind].append(seconds)
+            if ttft is not None:
+                self.ttft[kind].append(ttft)
+            self.counts[f"{kind}.calls"] += 1
+            for flag, hit in flags.items():
+                if hit:
+                    self.counts[f"{kind}.{flag}"] += 1
+
+    def error(self, text: str) -> None:
+        with self._lock:
+            self.errors[text[:80]] += 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    s = sorted(values)
+    if not s:
+        return 0.0
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def make_client(base_url: str, api_key: str, model: str, timeout: int) -> LLMClient:
+    base_url = normalize_base_url(base_url)
+    provider = ProviderConfig("loadgen", base_url, api_key, model)
+    return LLMClient(LLMConfig(base_url, api_key, model, timeout, providers=(provider,)))
+
+
+def run_session(client: LLMClient, rec: Recorder, index: int, turns: int, stream: bool, summary: bool) -> None:
+    messages = [{"role": "system", "content": SYSTEM_CHAT_STYLE["mid"]}]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": USER_LINES[(index + turn) % len(USER_LINES)]})
+        started = time.perf_counter()
+        ttft = None
+        if stream:
+            parts = []
+            for piece in client.chat_stream(messages):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(piece)
+            reply = "".join(parts)
+        else:
+            reply = client.chat(messages)
+        elapsed = time.perf_counter() - started
+        rec.add(
+            "chat",
+            elapsed,
+            ttft,
+            fallback=client.last_error is not None,
+            deduped=DEDUPE_MARK in reply,
+        )
+        if client.last_error:
+            rec.error(client.last_error)
+        messages.append({"role": "assistant", "content": reply})
+
+    if summary:
+        transcript = messages[1:]
+        started = time.perf_counter()
+        raw = client.chat(_analyzer_messages(transcript), temperature=0.2, force_json=True)
+        elapsed = time.perf_counter() - started
+        _, parsed = _parse_analysis(raw, _user_text(transcript), client.last_error)
+        rec.add("summary", elapsed, fallback=client.last_error is not None, unparsed=not parsed)
+        if client.last_error:
+            rec.error(client.last_error)
+
+
+def report(rec: Recorder, wall: float) -> None:
+    total = sum(len(v) for v in rec.latency.values())
+    print(f"{total} calls in {wall:.2f}s ({total / wall:.1f} calls/s)")
+    header = f"{'kind':<14}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+    print(header)
+    rows = [(kind, values) for kind, values in rec.latency.items()]
+    rows += [(f"{kind} ttft", values) for kind, values in rec.ttft.items()]
+    for name, values in rows:
+        cells = "".join(f"{percentile(values, q) * 1000:>8.0f}ms" for q in (0.5, 0.9, 0.99, 1.0))
+        print(f"{name:<14}{len(values):>6}{cells}")
+    for key in sorted(rec.counts):
+        if not key.endswith(".calls"):
+            print(f"{key}: {rec.counts[key]}")
+    if rec.errors:
+        print("errors:")
+        for text, n in sorted(rec.errors.items(), key=lambda kv: -kv[1]):
+            print(f"  {n:>5}  {text}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="server to load; omit with --spawn")
+    parser.add_argument("--api-key", default="loadgen")
+    parser.add_argument("--model", default="fake")
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument("--spawn", action="store_true", help="run the fake server in this process")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, help="sessions in flight at once (default: all)")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--stream", action="store_true", help="use chat_stream and report time to first chunk")
+    parser.add_argument("--summary", action="store_true", help="finish each session with the JSON analysis call")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server = start_in_thread(config_from_args(args))
+        args.base_url = server.base_url
+    if not args.base_url:
+        parser.error("--base-url or --spawn is required")
+
+    # the pool is per process; size it for the offered concurrency
+    concurrency = args.concurrency or args.sessions
+    os.environ.setdefault("LLM_POOL_SIZE", str(concurrency))
+    client = make_client(args.base_url, args.api_key, args.model, args.timeout)
+    rec = Recorder()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_session, client, rec, i, args.turns, args.stream, args.summary)
+            for i in range(args.sessions)
+        ]
+        for f in futures:
+            f.result()
+    report(rec, time.perf_counter() - started)
+
+    if server is not None:
+        print(f"server: {server.stats.snapshot()}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()